@@ -1,5 +1,7 @@
 from .model import Qreg, Reference, Gate, GateType, GatelistMacro, MultiQubitGate, Measure, Prob, PauliMeasure, PauliProb, Barrier, Reset, IfClause
 from .gatelist import GateList, dump
+from .parameter import Parameter, ParameterExpression, has_parameters, bind_gate_type
+from .pauli_term_groups import PauliTermGroup, group_pauli_terms
 from .directive import ClauseBegin, ClauseEnd, NewQreg, ReleaseQreg, Join, Separate
 from .preprocessor import Preprocessor
 from . import gate_type
@@ -0,0 +1,6 @@
+def parity(values) :
+    """ returns parity of bits of int64 values, given as a scalar or a numpy array. """
+    values = values ^ (values >> 32)
+    for shift in [16, 8, 4, 2, 1] :
+        values ^= values >> shift
+    return values & 1
@@ -0,0 +1,185 @@
+from . import model
+from . import directive
+from . import gate_type as gtype
+from .gate_fusion import _gate_matrix
+from .parameter import ParameterExpression, has_parameters
+import numbers
+import numpy as np
+
+
+# rotations merged by adding angles.  U(theta).Adj == U(-theta) for these gate types.
+_rotation_types = (gtype.RX, gtype.RY, gtype.RZ, gtype.U1, gtype.ExpiI, gtype.ExpiZ)
+# gate types whose matrices are diagonal or commute with X.
+_z_types = (gtype.ID, gtype.Z, gtype.S, gtype.T, gtype.RZ, gtype.U1, gtype.ExpiI, gtype.ExpiZ)
+_x_types = (gtype.X, gtype.RX)
+
+
+def _angle(gate) :
+    theta = gate.gate_type.args[0]
+    return - theta if gate.adjoint else theta
+
+def _add_angles(theta0, theta1) :
+    # returns None if the sum is not an affine expression of one parameter.
+    if isinstance(theta0, numbers.Number) or isinstance(theta1, numbers.Number) :
+        return theta0 + theta1
+    if theta0.parameter is theta1.parameter :
+        return ParameterExpression(theta0.parameter,
+                                   theta0.scale + theta1.scale, theta0.offset + theta1.offset)
+    return None
+
+def _is_zero(theta) :
+    return isinstance(theta, numbers.Number) and theta == 0.
+
+def _target_role(gate) :
+    # 'z' for diagonal, 'x' for gates commuting with X, None for others.
+    if isinstance(gate.gate_type, _z_types) :
+        return 'z'
+    if isinstance(gate.gate_type, _x_types) :
+        return 'x'
+    if has_parameters(gate.gate_type) :
+        return None
+    mat = _gate_matrix(gate)
+    if mat[0, 1] == 0. and mat[1, 0] == 0. :
+        return 'z'
+    if mat[0, 0] == mat[1, 1] and mat[0, 1] == mat[1, 0] :
+        return 'x'
+    return None
+
+def _roles(gate) :
+    # key: qreg, value: role of a gate on the qreg.  Control qregs are diagonal.
+    roles = dict()
+    for ctrlreg in gate.ctrllist or [] :
+        roles[ctrlreg] = 'z'
+    roles[gate.qreg] = _target_role(gate)
+    return roles
+
+def _commutes(roles0, roles1) :
+    # gates commute if they act on shared qregs with the same commuting algebra, {I, Z} or {I, X}.
+    for qreg, role in roles0.items() :
+        if qreg in roles1 and (role is None or role != roles1[qreg]) :
+            return False
+    return True
+
+def _is_inverse(gate0, gate1) :
+    type0, type1 = gate0.gate_type, gate1.gate_type
+    if type(type0) is type(type1) and gate0.adjoint != gate1.adjoint and \
+       all([arg0 is arg1 for arg0, arg1 in zip(type0.args, type1.args)]) :
+        # gate.Adj following gate.
+        return True
+    if has_parameters(type0) or has_parameters(type1) :
+        return False
+    product = np.matmul(_gate_matrix(gate1), _gate_matrix(gate0))
+    return np.allclose(product, np.identity(2))
+
+
+class CircuitOptimizer :
+    """ Removing gates by peephole optimization.
+    Gates are cancelled with preceding inverse gates such as X.X, H.H, CX.CX and gate.gate.Adj,
+    and rotations of the same axis such as Rz.Rz, U1.U1 and ExpiZ.ExpiZ are merged.  Preceding gates
+    are searched over gates commuting with a given gate, e.g. diagonal gates on control qregs.
+    Barriers, if clauses, measurements and other operators are not passed over.
+    """
+    # the max number of preceding ops searched for a gate.
+    max_lookback = 32
+
+    def __init__(self) :
+        self.reset()
+
+    def reset(self) :
+        self.n_gates_in = 0
+        self.n_gates_out = 0
+        self.n_cancelled = 0
+        self.n_merged = 0
+
+    def get_stats(self) :
+        return { 'n_gates_in' : self.n_gates_in,
+                 'n_gates_out' : self.n_gates_out,
+                 'n_cancelled' : self.n_cancelled,
+                 'n_merged' : self.n_merged }
+
+    def optimize(self, ops) :
+        optimized = list()
+        # key: qreg, value: indices of ops touching qreg in optimized.
+        touched = dict()
+        # indices of ops that gates are not moved over.
+        fences = set()
+
+        for op in ops :
+            if isinstance(op, (model.Gate, model.MultiQubitGate)) :
+                self.n_gates_in += 1
+            if isinstance(op, model.Gate) :
+                if self._cancel_or_merge(optimized, touched, fences, op) :
+                    continue
+                qregs = [op.qreg] + (op.ctrllist or [])
+            elif isinstance(op, model.MultiQubitGate) :
+                qregs = op.qreglist + (op.ctrllist or [])
+            elif isinstance(op, (model.Measure, model.Prob, model.Reset, directive.NewQreg,
+                                 directive.ReleaseQreg, directive.Separate)) :
+                qregs = [op.qreg]
+            elif isinstance(op, (directive.Join, directive.ClauseBegin, directive.ClauseEnd)) :
+                # not changing states.
+                optimized.append(op)
+                continue
+            else :
+                # Barrier, IfClause and others.
+                if isinstance(op, model.IfClause) :
+                    op = model.IfClause(op.refs, op.cond, self.optimize(op.clause))
+                optimized.append(op)
+                touched = dict()
+                continue
+
+            if not isinstance(op, model.Gate) :
+                fences.add(len(optimized))
+            for qreg in qregs :
+                touched.setdefault(qreg, list()).append(len(optimized))
+            optimized.append(op)
+
+        optimized = [op for op in optimized if op is not None]
+        self.n_gates_out += sum([1 for op in optimized if isinstance(op, (model.Gate, model.MultiQubitGate))])
+        return optimized
+
+    def _cancel_or_merge(self, optimized, touched, fences, gate) :
+        # returns True if gate is cancelled or merged into a preceding gate.
+        qregs = [gate.qreg] + (gate.ctrllist or [])
+        candidates = set()
+        # ops older than oldest may be dropped from windows of some qregs, so not searched.
+        oldest = 0
+        for qreg in qregs :
+            indices = touched.get(qreg, [])
+            candidates.update(indices[- self.max_lookback:])
+            if self.max_lookback <= len(indices) :
+                oldest = max(oldest, indices[- self.max_lookback])
+        roles = None
+        ctrlset = frozenset(gate.ctrllist or [])
+        for idx in sorted(candidates, reverse = True) :
+            if idx < oldest :
+                return False
+            prev = optimized[idx]
+            if prev is None :
+                continue
+            if idx in fences :
+                return False
+            if prev.qreg == gate.qreg and frozenset(prev.ctrllist or []) == ctrlset :
+                if _is_inverse(prev, gate) :
+                    optimized[idx] = None
+                    self.n_cancelled += 1
+                    return True
+                if type(prev.gate_type) is type(gate.gate_type) and \
+                   isinstance(gate.gate_type, _rotation_types) :
+                    theta = _add_angles(_angle(prev), _angle(gate))
+                    if theta is not None :
+                        if _is_zero(theta) :
+                            optimized[idx] = None
+                        else :
+                            merged = model.Gate(type(gate.gate_type)(theta))
+                            if gate.ctrllist is not None :
+                                merged.set_ctrllist(list(gate.ctrllist))
+                            merged.set_qreg(gate.qreg)
+                            optimized[idx] = merged
+                        self.n_merged += 1
+                        return True
+            if roles is None :
+                roles = _roles(gate)
+            if not _commutes(roles, _roles(prev)) :
+                return False
+        return False
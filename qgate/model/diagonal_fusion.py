@@ -0,0 +1,141 @@
+from . import model
+from . import directive
+from . import gate_type as gtype
+from .gate_fusion import _gate_matrix
+from .parameter import has_parameters
+import numpy as np
+
+
+def _diagonal(op) :
+    # returns diagonal elements of a gate if its matrix is diagonal, otherwise None.
+    if not isinstance(op, model.Gate) or has_parameters(op.gate_type) :
+        return None
+    mat = _gate_matrix(op)
+    if mat[0, 1] != 0. or mat[1, 0] != 0. :
+        return None
+    return mat[0, 0], mat[1, 1]
+
+def _op_qregs(op) :
+    # qregs touched by an op, None for ops that touch all qregs.
+    if isinstance(op, model.Gate) :
+        return [op.qreg] + (op.ctrllist or [])
+    if isinstance(op, model.MultiQubitGate) :
+        return op.qreglist + (op.ctrllist or [])
+    if isinstance(op, directive.Join) :
+        return op.qreglist
+    if isinstance(op, (model.Measure, model.Prob, model.Reset, directive.NewQreg,
+                       directive.ReleaseQreg, directive.Separate)) :
+        return [op.qreg]
+    if isinstance(op, (directive.ClauseBegin, directive.ClauseEnd)) :
+        return []
+    return None
+
+
+class _DiagonalRun :
+    # diagonal gates fused into a phase table, placed at pos of the last gate in fused ops.
+    def __init__(self, pos, gate, diag) :
+        self.pos = pos
+        self.qregs = list()
+        self.gates = list()
+        self.add(gate, diag)
+
+    def add(self, gate, diag) :
+        for qreg in _op_qregs(gate) :
+            if not qreg in self.qregs :
+                self.qregs.append(qreg)
+        self.gates.append((gate, diag))
+
+    def phase_table(self) :
+        # the i-th qreg in qregs corresponds to the i-th bit of table indices.
+        keys = np.arange(1 << len(self.qregs), dtype = np.int64)
+        phases = np.ones([len(keys)], np.complex128)
+        for gate, (d0, d1) in self.gates :
+            target = (keys >> self.qregs.index(gate.qreg)) & 1
+            control_mask = 0
+            for ctrlreg in gate.ctrllist or [] :
+                control_mask |= 1 << self.qregs.index(ctrlreg)
+            controlled = (keys & control_mask) == control_mask
+            phases *= np.where(controlled, np.where(target == 1, d1, d0), 1.)
+        return phases
+
+# the max number of qregs of phase tables applied by runtimes.
+max_table_qregs = 16
+
+
+class DiagonalGateFusion :
+    """ Fusing successive diagonal gates into phase tables.
+    Diagonal gates, controlled or not, whose qregs overlap are collected while no other operators
+    touch these qregs.  Collected gates on up to max_qregs qregs are replaced with one multi qubit
+    gate of DIAGN gate type placed at the last gate, which applies a phase table indexed by bits
+    of its qregs in one pass.  Join directives do not change states, so gates are fused over them.
+    """
+    def __init__(self, max_qregs = 10) :
+        self.max_qregs = max_qregs
+        self.reset()
+
+    def reset(self) :
+        self.n_gates_in = 0
+        self.n_gates_out = 0
+        self.n_phase_tables = 0
+
+    def get_stats(self) :
+        return { 'n_gates_in' : self.n_gates_in,
+                 'n_gates_out' : self.n_gates_out,
+                 'n_phase_tables' : self.n_phase_tables }
+
+    def fuse(self, ops) :
+        fused = list()
+        # runs not closed yet.
+        runs = list()
+
+        for op in ops :
+            if isinstance(op, (model.Gate, model.MultiQubitGate)) :
+                self.n_gates_in += 1
+            diag = _diagonal(op)
+            qregs = _op_qregs(op)
+            if diag is not None :
+                overlapped = [run for run in runs if any([qreg in run.qregs for qreg in qregs])]
+                if len(overlapped) == 1 :
+                    run = overlapped[0]
+                    n_added = len([qreg for qreg in qregs if not qreg in run.qregs])
+                    if len(run.qregs) + n_added <= self.max_qregs :
+                        # gates in a run are moved to the last gate.
+                        run.add(op, diag)
+                        fused[run.pos] = None
+                        run.pos = len(fused)
+                        fused.append(op)
+                        continue
+                for run in overlapped :
+                    self._close(fused, runs, run)
+                if len(qregs) <= self.max_qregs :
+                    runs.append(_DiagonalRun(len(fused), op, diag))
+                fused.append(op)
+                continue
+
+            if qregs is None :
+                # Barrier, IfClause and others.
+                for run in list(runs) :
+                    self._close(fused, runs, run)
+            elif not isinstance(op, directive.Join) :
+                for run in [run for run in runs if any([qreg in run.qregs for qreg in qregs])] :
+                    self._close(fused, runs, run)
+            if isinstance(op, model.IfClause) :
+                op = model.IfClause(op.refs, op.cond, self.fuse(op.clause))
+            fused.append(op)
+
+        for run in list(runs) :
+            self._close(fused, runs, run)
+        # gates moved to the last gates of runs are removed.
+        fused = [op for op in fused if op is not None]
+        self.n_gates_out += sum([1 for op in fused if isinstance(op, (model.Gate, model.MultiQubitGate))])
+
+        return fused
+
+    def _close(self, fused, runs, run) :
+        runs.remove(run)
+        if len(run.gates) == 1 :
+            return
+        gate = model.MultiQubitGate(gtype.DIAGN(run.phase_table()))
+        gate.set_qreglist(list(run.qregs))
+        fused[run.pos] = gate
+        self.n_phase_tables += 1
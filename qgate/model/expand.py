@@ -2,6 +2,9 @@ from . import model
 from . import gate_type as gtype
 from .pauli_gates_diagonalizer import PauliGatesDiagonalizer
 from .gate_factory import cx, expiI, expiZ
+from .parameter import ParameterExpression
+import numpy as np
+import math
 
 def adjoint(gates) :
     adj = list()
@@ -13,7 +16,53 @@ def adjoint(gates) :
 
 def expand_swap(op) :
     qreg0, qreg1 = op.qreglist[0], op.qreglist[1]
-    return [cx(qreg0, qreg1), cx(qreg1, qreg0), cx(qreg0, qreg1)]
+    expanded = [cx(qreg0, qreg1), cx(qreg1, qreg0), cx(qreg0, qreg1)]
+    if op.ctrllist is not None :
+        for gate in expanded :
+            gate.set_ctrllist(gate.ctrllist + op.ctrllist)
+    return expanded
+
+_pauli_mats = {
+    gtype.ID : np.array([[1, 0], [0, 1]], np.complex128),
+    gtype.X : np.array([[0, 1], [1, 0]], np.complex128),
+    gtype.Y : np.array([[0, -1j], [1j, 0]], np.complex128),
+    gtype.Z : np.array([[1, 0], [0, -1]], np.complex128)
+}
+
+# max number of qregs for Expi gates converted to MultiQubitGate.
+max_n_exp_qregs = 4
+
+def exp_to_multi_qubit_gate(exp) :
+    """ convert Expi gate to MultiQubitGate of MATN gate type, or ExpiN gate type if
+    Expi gate has a parameter.  Returns None if Expi gate is not able to be converted. """
+    qreglist, mats = list(), list()
+    for gate in exp.gatelist :
+        if isinstance(gate.gate_type, gtype.ID) :
+            continue
+        if gate.qreg in qreglist :
+            return None
+        qreglist.append(gate.qreg)
+        mats.append(_pauli_mats[gate.gate_type.__class__])
+    if len(qreglist) == 0 or max_n_exp_qregs < len(qreglist) :
+        return None
+
+    # exp(i theta P) = cos(theta) I + i sin(theta) P
+    pauli = np.ones((1, 1), np.complex128)
+    for mat in mats :
+        # the i-th qreg corresponds to the i-th bit.
+        pauli = np.kron(mat, pauli)
+    theta = exp.gate_type.args[0]
+    if exp.adjoint :
+        theta = - theta
+    if isinstance(theta, ParameterExpression) :
+        gate = model.MultiQubitGate(gtype.ExpiN(theta, pauli))
+    else :
+        mat = math.cos(theta) * np.identity(pauli.shape[0], np.complex128) + 1.j * math.sin(theta) * pauli
+        gate = model.MultiQubitGate(gtype.MATN(mat))
+    if exp.ctrllist is not None :
+        gate.set_ctrllist(list(exp.ctrllist))
+    gate.set_qreglist(qreglist)
+    return gate
 
 def expand_exp(exp) :
     diag = PauliGatesDiagonalizer(exp.gatelist)
@@ -24,11 +73,13 @@ def expand_exp(exp) :
         raise RuntimeError('cannot expand, {}.'.format(repr(exp)))
     assert abs(diag.get_phase_coef()) == 1
 
-    phase = diag.get_phase_coef() * exp.gate_type.args[0]
+    # phase offset is 0 or pi, and angles are numbers or parameter expressions.
+    sign = 1. if diag.phase_offset_in_pi_2 == 0 else -1.
+    phase = sign * exp.gate_type.args[0]
     if is_z_based :
-        expgate = expiZ(phase.real, diag.op_qreg)
+        expgate = expiZ(phase, diag.op_qreg)
     else :
-        expgate = expiI(phase.real, diag.op_qreg)
+        expgate = expiI(phase, diag.op_qreg)
 
     expanded = pcx + [expgate] + adjoint(pcx)
 
@@ -42,12 +93,110 @@ def expand_exp(exp) :
             # FIXME: remove later.
             assert not gate.qreg in merged, 'control bits must not overlap targets.'
 
+    expanded.reverse()
     if exp.adjoint :
-        for gate in expgates :
-            expgates.set_adjoint(True)
-    else :
-        expanded.reverse()
+        expanded = adjoint(expanded)
+
+    return expanded
 
+class _TrotterTerm :
+    # exp(i theta P) = V.exp(i theta' Z).V+, V = basis + ladder.
+    def __init__(self, exp) :
+        diag = PauliGatesDiagonalizer(exp.gatelist)
+        is_z_based = diag.diagonalize()
+        if diag.phase_offset_in_pi_2 % 2 != 0:
+            raise RuntimeError('cannot expand, {}.'.format(repr(exp)))
+
+        theta = exp.gate_type.args[0]
+        if exp.adjoint :
+            theta = - theta
+        # phase offset is 0 or pi.
+        sign = 1. if diag.phase_offset_in_pi_2 == 0 else -1.
+        phase = sign * theta
+        if not is_z_based :
+            # exp(i theta I) commutes with all gates.
+            self.basis, self.ladder = None, None
+            self.expgate = expiI(phase, diag.op_qreg)
+            return
+        # key: qreg, value: gate changing basis of qreg to Z.
+        self.basis = dict()
+        for p in diag.plist :
+            self.basis[p.qreg] = adjoint([p])[0]
+        self.ladder = diag.cxchain
+        self.expgate = expiZ(phase, diag.op_qreg)
+
+def _basis_key(gate) :
+    return None if gate is None else (gate.gate_type.__class__, gate.adjoint)
+
+def _cx_key(gate) :
+    return gate.ctrllist[0], gate.qreg
+
+def _basis_delta(basis0, ladder0, basis1, ladder1) :
+    # gates equivalent to (basis0 + ladder0)+ followed by basis1 + ladder1.
+    changed = [qreg for qreg in set(basis0) | set(basis1)
+               if _basis_key(basis0.get(qreg)) != _basis_key(basis1.get(qreg))]
+    changed.sort(key = lambda qreg : qreg.id)
+    # cx gates on unchanged qregs commute with basis gates, and cancel if they are the same.
+    n_shared = 0
+    for cx0, cx1 in zip(ladder0, ladder1) :
+        qregs = _cx_key(cx0)
+        if qregs != _cx_key(cx1) or any([qreg in changed for qreg in qregs]) :
+            break
+        n_shared += 1
+
+    delta = adjoint(ladder0[n_shared:])
+    for qreg in changed :
+        if qreg in basis0 :
+            delta += adjoint([basis0[qreg]])
+        if qreg in basis1 :
+            delta.append(basis1[qreg].copy())
+    delta += [gate.copy() for gate in ladder1[n_shared:]]
+    return delta
+
+def _terms_commute(term0, term1) :
+    # pauli strings commute if they have different paulis on an even number of qregs.
+    if term0.basis is None or term1.basis is None :
+        return True
+    qregs0 = set(term0.basis) | set([qreg for cx in term0.ladder for qreg in _cx_key(cx)]) | set([term0.expgate.qreg])
+    qregs1 = set(term1.basis) | set([qreg for cx in term1.ladder for qreg in _cx_key(cx)]) | set([term1.expgate.qreg])
+    n_anticommuting = 0
+    for qreg in qregs0 & qregs1 :
+        if _basis_key(term0.basis.get(qreg)) != _basis_key(term1.basis.get(qreg)) :
+            n_anticommuting += 1
+    return n_anticommuting % 2 == 0
+
+def _order_terms(terms) :
+    # successive terms commuting with each other are reordered to share basis changes.
+    ordered = list()
+    group = list()
+    basis, ladder = dict(), list()
+    for term in terms + [None] :
+        if term is not None and all([_terms_commute(term, other) for other in group]) :
+            group.append(term)
+            continue
+        while len(group) != 0 :
+            costs = [0 if other.basis is None else len(_basis_delta(basis, ladder, other.basis, other.ladder))
+                     for other in group]
+            picked = group.pop(costs.index(min(costs)))
+            ordered.append(picked)
+            if picked.basis is not None :
+                basis, ladder = picked.basis, picked.ladder
+        group = [term]
+    return ordered
+
+def expand_exp_sequence(exps) :
+    """ expand a sequence of Expi gates without control qregs, such as trotter steps.
+    Commuting terms are reordered to share basis changes, and only gates that differ between
+    basis changes of successive terms are emitted. """
+    terms = _order_terms([_TrotterTerm(exp) for exp in exps])
+    expanded = list()
+    basis, ladder = dict(), list()
+    for term in terms :
+        if term.basis is not None :
+            expanded += _basis_delta(basis, ladder, term.basis, term.ladder)
+            basis, ladder = term.basis, term.ladder
+        expanded.append(term.expgate)
+    expanded += _basis_delta(basis, ladder, dict(), list())
     return expanded
 
 def expand_pmeasure(pmeasure) :
@@ -77,7 +226,7 @@ def expand_pprob(pprob) :
     return expanded
 
 def expand(op) :
-    # simply decompose to 3 cx gates, since runtimes does not have 2 qubit gate operations now.
+    # simply decompose to 3 cx gates for runtimes that do not have multi qubit gate operations.
     if isinstance(op, model.PauliMeasure) :
         return expand_pmeasure(op)
     elif isinstance(op, model.PauliProb) :
@@ -86,5 +235,7 @@ def expand(op) :
         return expand_swap(op)
     elif isinstance(op.gate_type, gtype.Expi) :
         return expand_exp(op)
+    elif isinstance(op.gate_type, (gtype.MATN, gtype.ExpiN)) :
+        raise RuntimeError('{} is not able to be expanded.'.format(repr(op)))
 
     assert False, 'Unknown composed gate, {}.'.format(repr(op.gate_type))
@@ -0,0 +1,174 @@
+from . import model
+from . import directive
+from . import gate_type as gtype
+from .parameter import has_parameters
+import numpy as np
+
+
+def _gate_matrix(gate) :
+    # pymat() is attached to gate types in qgate.simulator.pymatrix.
+    mat = gate.gate_type.pymat()
+    if gate.adjoint :
+        mat = np.conjugate(mat.T)
+    return mat
+
+def _embed(mat, bits, n_bits) :
+    # expand a matrix applied to given bits to a 2^n_bits x 2^n_bits matrix.
+    dim = 1 << n_bits
+    n_targets = len(bits)
+    # axes of identity are ordered from the most significant bit.
+    axes = [n_bits - bit - 1 for bit in reversed(bits)]
+    ident = np.identity(dim, np.complex128).reshape([2] * n_bits + [dim])
+    ident = np.moveaxis(ident, axes, list(range(n_targets)))
+    tensor = mat.reshape([2] * (2 * n_targets))
+    product = np.tensordot(tensor, ident,
+                           axes = (list(range(n_targets, 2 * n_targets)), list(range(n_targets))))
+    product = np.moveaxis(product, list(range(n_targets)), axes)
+    return product.reshape(dim, dim)
+
+def _fusable(op) :
+    # matrices of gates with parameters are not known until bound.
+    return not has_parameters(op.gate_type)
+
+def _ctrlset(gate) :
+    if gate.ctrllist is None :
+        return None
+    return frozenset(gate.ctrllist)
+
+
+class GateFusion :
+    """ Fusing successive 1 qubit gates.
+    Gates that have the same target qreg and the same control qregs are multiplied into
+    one gate of MAT gate type when no other operators touch these qregs between them.
+    Uncontrolled gates adjacent to an uncontrolled multi qubit gate are multiplied into
+    one multi qubit gate of MATN gate type.
+    """
+    def __init__(self) :
+        self.reset()
+
+    def reset(self) :
+        self.n_gates_in = 0
+        self.n_gates_out = 0
+        self.n_fused_runs = 0
+
+    def get_stats(self) :
+        return { 'n_gates_in' : self.n_gates_in,
+                 'n_gates_out' : self.n_gates_out,
+                 'n_fused_runs' : self.n_fused_runs }
+
+    def fuse(self, ops) :
+        fused = list()
+        # key: qreg, value: index of the last op touching qreg in fused.
+        last = dict()
+        # key: index in fused, value: list of matrices of gates in a run.
+        runs = dict()
+        # key: index in fused, value: matrix of an uncontrolled multi qubit gate.
+        blocks = dict()
+        # indices of blocks that other gates are multiplied into.
+        fused_blocks = set()
+
+        for op in ops :
+            if isinstance(op, model.Gate) :
+                self.n_gates_in += 1
+                qregs = [op.qreg]
+                if op.ctrllist is not None :
+                    qregs += op.ctrllist
+                candidates = set([last.get(qreg, None) for qreg in qregs])
+                if len(candidates) == 1 and _fusable(op) :
+                    idx = candidates.pop()
+                    if idx is not None :
+                        prev = fused[idx]
+                        if isinstance(prev, model.Gate) and prev.qreg == op.qreg \
+                           and _ctrlset(prev) == _ctrlset(op) and _fusable(prev) :
+                            runs.setdefault(idx, [_gate_matrix(prev)]).append(_gate_matrix(op))
+                            continue
+                        if idx in blocks and op.ctrllist is None :
+                            # uncontrolled gate following a block.
+                            bit = prev.qreglist.index(op.qreg)
+                            mat = _embed(_gate_matrix(op), [bit], len(prev.qreglist))
+                            blocks[idx] = np.matmul(mat, blocks[idx])
+                            fused_blocks.add(idx)
+                            continue
+                idx = len(fused)
+                fused.append(op)
+                for qreg in qregs :
+                    last[qreg] = idx
+            elif isinstance(op, model.MultiQubitGate) :
+                self.n_gates_in += 1
+                if op.ctrllist is not None or not _fusable(op) :
+                    idx = len(fused)
+                    fused.append(op)
+                    for qreg in op.qreglist + (op.ctrllist or []) :
+                        last[qreg] = idx
+                    continue
+                candidates = set([last.get(qreg, None) for qreg in op.qreglist])
+                if len(candidates) == 1 :
+                    idx = candidates.pop()
+                    if idx in blocks :
+                        # multi qubit gate applied to a subset of qregs of a block.
+                        prev = fused[idx]
+                        bits = [prev.qreglist.index(qreg) for qreg in op.qreglist]
+                        mat = _embed(_gate_matrix(op), bits, len(prev.qreglist))
+                        blocks[idx] = np.matmul(mat, blocks[idx])
+                        fused_blocks.add(idx)
+                        continue
+                # new block, preceding uncontrolled gates are multiplied.
+                n_bits = len(op.qreglist)
+                mat = _gate_matrix(op)
+                for bit, qreg in enumerate(op.qreglist) :
+                    idx = last.get(qreg, None)
+                    if idx is None :
+                        continue
+                    prev = fused[idx]
+                    if isinstance(prev, model.Gate) and prev.ctrllist is None and _fusable(prev) :
+                        gmat = np.identity(2, np.complex128)
+                        for m in runs.pop(idx, [_gate_matrix(prev)]) :
+                            gmat = np.matmul(m, gmat)
+                        mat = np.matmul(mat, _embed(gmat, [bit], n_bits))
+                        fused[idx] = None
+                        fused_blocks.add(len(fused))
+                idx = len(fused)
+                fused.append(op)
+                blocks[idx] = mat
+                for qreg in op.qreglist :
+                    last[qreg] = idx
+            elif isinstance(op, (directive.ClauseBegin, directive.ClauseEnd)) :
+                fused.append(op)
+            elif isinstance(op, model.IfClause) :
+                clause = self.fuse(op.clause)
+                fused.append(model.IfClause(op.refs, op.cond, clause))
+                last = dict()
+            elif isinstance(op, (model.Measure, model.Prob, model.Reset, directive.NewQreg,
+                                 directive.ReleaseQreg, directive.Separate)) :
+                last[op.qreg] = len(fused)
+                fused.append(op)
+            elif isinstance(op, directive.Join) :
+                for qreg in op.qreglist :
+                    last[qreg] = len(fused)
+                fused.append(op)
+            else :
+                # Barrier and others.
+                fused.append(op)
+                last = dict()
+
+        # replace runs with fused gates.
+        for idx, mats in runs.items() :
+            mat = mats[0]
+            for m in mats[1:] :
+                mat = np.matmul(m, mat)
+            first = fused[idx]
+            gate = model.Gate(gtype.MAT(np.ascontiguousarray(mat, np.complex128)))
+            if first.ctrllist is not None :
+                gate.set_ctrllist(list(first.ctrllist))
+            gate.set_qreg(first.qreg)
+            fused[idx] = gate
+        for idx in fused_blocks :
+            gate = model.MultiQubitGate(gtype.MATN(np.ascontiguousarray(blocks[idx], np.complex128)))
+            gate.set_qreglist(list(fused[idx].qreglist))
+            fused[idx] = gate
+        # gates multiplied into blocks are removed.
+        fused = [op for op in fused if op is not None]
+        self.n_fused_runs += len(runs) + len(fused_blocks)
+        self.n_gates_out += sum([1 for op in fused if isinstance(op, (model.Gate, model.MultiQubitGate))])
+
+        return fused
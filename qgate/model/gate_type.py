@@ -22,6 +22,14 @@ def _exp_gate_constraints(self, exp) :
         if len(in_qregset & set(exp.ctrllist)) != 0 :
             raise RuntimeError('control bit and target should not overlap.')
     
+def _multi_qubit_gate_constraints(self, gate) :
+    qregset = set(gate.qreglist)
+    if len(qregset) != len(gate.qreglist) :
+        raise RuntimeError('duplicated qregs in operands.')
+    if gate.ctrllist is not None :
+        if len(qregset & set(gate.ctrllist)) != 0 :
+            raise RuntimeError('control bit and target should not overlap.')
+
 def _attach(gate_type, constraints) :
     gate_type.constraints = constraints
     
@@ -117,6 +125,12 @@ class ExpiZ(GateType) :
         GateType.__init__(self, theta)
 _attach(ExpiZ, _1_bit_gate_constraints)
 
+# 2x2 unitary matrix.  Used to hold a product of 1 qubit gates made by gate fusion.
+class MAT(GateType) :
+    def __init__(self, mat) :
+        GateType.__init__(self, mat)
+_attach(MAT, _1_bit_gate_constraints)
+
 # composed gate
 
 class Expi(GateType) :
@@ -128,3 +142,24 @@ _attach(Expi, _exp_gate_constraints)
 class SWAP(GateType) :
     def __init__(self) :
         GateType.__init__(self)
+_attach(SWAP, _multi_qubit_gate_constraints)
+
+# 2^n x 2^n unitary matrix applied to n qregs.
+# The i-th qreg in qreglist corresponds to the i-th bit of row/column indices.
+class MATN(GateType) :
+    def __init__(self, mat) :
+        GateType.__init__(self, mat)
+_attach(MATN, _multi_qubit_gate_constraints)
+
+# diagonal of a 2^n x 2^n matrix applied to n qregs.  Used to hold diagonal gates fused into a phase table.
+# The i-th qreg in qreglist corresponds to the i-th bit of indices.
+class DIAGN(GateType) :
+    def __init__(self, phases) :
+        GateType.__init__(self, phases)
+_attach(DIAGN, _multi_qubit_gate_constraints)
+
+# exp(i theta P) for a matrix of pauli string, P.  Used for Expi gates with parameters.
+class ExpiN(GateType) :
+    def __init__(self, theta, pauli) :
+        GateType.__init__(self, theta, pauli)
+_attach(ExpiN, _multi_qubit_gate_constraints)
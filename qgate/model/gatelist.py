@@ -104,6 +104,57 @@ class GateListIterator :
             self.op_iter = self.op_iter_stack[-1];
             return self.next()
 
+
+class LinearOps :
+    """ operators linearized in execution order.
+    Operators in an if clause follow the IfClause operator, and n_skips of the IfClause is the number
+    of these operators, which is used to jump over the clause.  Nested clauses are traversed
+    without recursion.
+    """
+    def __init__(self, ops) :
+        self.ops = list()
+        # number of operators to skip when the if clause at the same position is not taken.
+        self.n_skips = list()
+        # frames of (operator iterator, position of IfClause or None)
+        stack = [ (iter(ops), None) ]
+        while len(stack) != 0 :
+            op_iter, if_pos = stack[-1]
+            op = next(op_iter, None)
+            if op is None :
+                stack.pop()
+                if if_pos is not None :
+                    self.n_skips[if_pos] = len(self.ops) - if_pos - 1
+                continue
+            if isinstance(op, GateList) :
+                stack.append((iter(op.ops), None))
+                continue
+            self.ops.append(op)
+            self.n_skips.append(0)
+            if isinstance(op, model.IfClause) :
+                stack.append((iter(op.clause), len(self.ops) - 1))
+
+    def __len__(self) :
+        return len(self.ops)
+
+
+class OpCursor :
+    """ index-based cursor to traverse LinearOps. """
+    def __init__(self, linear, pos = 0) :
+        self._ops = linear.ops
+        self._n_skips = linear.n_skips
+        self.pos = pos
+
+    def next(self) :
+        if self.pos == len(self._ops) :
+            return None
+        op = self._ops[self.pos]
+        self.pos += 1
+        return op
+
+    def skip_clause(self) :
+        # skip operators in the if clause returned by the last next().
+        self.pos += self._n_skips[self.pos - 1]
+
 import sys
         
 def dump(ops, file, indent = 0) :
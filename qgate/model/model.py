@@ -119,16 +119,22 @@ class GatelistMacro(Operator) :
         return obj
 
     
-# Currently only SWAP gate uses this.
+# Gates applied to 2 or more qregs, SWAP and MATN.
 class MultiQubitGate(Operator) :
     def __init__(self, gate_type) :
+        Operator.__init__(self)
         self.gate_type = gate_type
         self.adjoint = False
         self.qreglist = None
+        self.ctrllist = None
 
     def set_adjoint(self, adjoint) :
         self.adjoint = adjoint
 
+    def set_ctrllist(self, ctrllist) :
+        self.ctrllist = [ctrllist] if isinstance(ctrllist, Qreg) else ctrllist
+        assert all([isinstance(qreg, Qreg) for qreg in self.ctrllist]), 'arguments must be Qreg.'
+
     def set_qreglist(self, qreglist) :
         assert self.qreglist is None, 'qreglist already set.'
         self.qreglist = qreglist
@@ -139,6 +145,8 @@ class MultiQubitGate(Operator) :
     def copy(self) :
         obj = MultiQubitGate(self.gate_type)
         obj.set_adjoint(self.adjoint)
+        if self.ctrllist is not None :
+            obj.set_ctrllist(list(self.ctrllist))
         obj.set_qreglist(list(self.qreglist))
         return obj
     
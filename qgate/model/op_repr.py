@@ -103,7 +103,11 @@ model.GatelistMacro.__repr__ = gatelist_macro_repr
 
 def multi_qubit_gate_repr(self) :
     name = self.gate_type.__class__.__name__
-    return '{}({})'.format(name, format_qreg(self.qreglist))
+    adjoint = '.Adj' if self.adjoint else ''
+    ctrllist = ''
+    if self.ctrllist is not None :
+        ctrllist = 'ctrl(' + format_qreg(self.ctrllist) + ').'
+    return '{}{}{}({})'.format(ctrllist, name, adjoint, format_qreg(self.qreglist))
 
 model.MultiQubitGate.__repr__ = multi_qubit_gate_repr
 
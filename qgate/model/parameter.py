@@ -0,0 +1,89 @@
+import numbers
+import copy
+
+
+class ParameterExpression :
+    """ affine expression of a parameter, scale * parameter + offset. """
+    def __init__(self, parameter, scale = 1., offset = 0.) :
+        self.parameter = parameter
+        self.scale = scale
+        self.offset = offset
+
+    def evaluate(self, bindings) :
+        value = bindings.get(self.parameter, None)
+        if value is None :
+            raise RuntimeError('{} is not bound.'.format(str(self.parameter)))
+        return self.scale * value + self.offset
+
+    def __neg__(self) :
+        return ParameterExpression(self.parameter, - self.scale, - self.offset)
+
+    def __mul__(self, other) :
+        if not isinstance(other, numbers.Number) :
+            return NotImplemented
+        return ParameterExpression(self.parameter, self.scale * other, self.offset * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other) :
+        if not isinstance(other, numbers.Number) :
+            return NotImplemented
+        return self * (1. / other)
+
+    __div__ = __truediv__
+
+    def __add__(self, other) :
+        if not isinstance(other, numbers.Number) :
+            return NotImplemented
+        return ParameterExpression(self.parameter, self.scale, self.offset + other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other) :
+        return self + (- other)
+
+    def __rsub__(self, other) :
+        return (- self) + other
+
+    def __str__(self) :
+        return '{}*{}+{}'.format(self.scale, str(self.parameter), self.offset)
+
+
+class Parameter(ParameterExpression) :
+    """ symbolic gate parameter, whose value is given by bindings when running circuits. """
+    count = 0
+
+    def __init__(self, name = None) :
+        ParameterExpression.__init__(self, self)
+        self.id = Parameter.count
+        Parameter.count += 1
+        self.name = name
+
+    def __hash__(self) :
+        return self.id
+
+    def __eq__(self, other) :
+        return self is other
+
+    def __ne__(self, other) :
+        return not self is other
+
+    def __str__(self) :
+        if self.name is not None :
+            return self.name
+        return 'param{}'.format(self.id)
+
+
+def has_parameters(gate_type) :
+    for arg in gate_type.args :
+        if isinstance(arg, ParameterExpression) :
+            return True
+    return False
+
+def bind_gate_type(gate_type, bindings) :
+    """ returns a copy of gate_type whose parameters are replaced with bound values. """
+    args = [arg.evaluate(bindings) if isinstance(arg, ParameterExpression) else arg
+            for arg in gate_type.args]
+    bound = copy.copy(gate_type)
+    bound.args = tuple(args)
+    return bound
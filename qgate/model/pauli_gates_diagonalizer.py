@@ -93,8 +93,11 @@ class PauliGatesDiagonalizer :
         return sign, d, p
             
 
-    def diagonalize(self) :
-        
+    def diagonalize_lanes(self) :
+        """ diagonalize pauli gates in each lane.
+        returns (phase offset in pi/2, z-based lanes, ids), z-based lanes is a list of (qreg, p),
+        where p is a gate to diagonalize the lane or None if the lane is already z-based.
+        """
         # creating gate list for each qreg.
         gmap = dict()
         for gate in self.gatelist :
@@ -105,8 +108,7 @@ class PauliGatesDiagonalizer :
             glist.append(gate)
             
         # compose pauli gates
-        paulis, ids = list(), list()
-        self.plist = list()
+        zlanes, ids = list(), list()
         sign = 0
         gmapitems = list(gmap.items())
         gmapitems.sort(key = lambda item:item[0].id)
@@ -114,13 +116,16 @@ class PauliGatesDiagonalizer :
             _sign, d, p = self.expand_in_lane(glist, qreg)
             sign += _sign
             if d : # d is True when z-based.
-                paulis.append(qreg)
-                if p is not None :
-                    self.plist.append(p)
+                zlanes.append((qreg, p))
             else :
                 ids.append(qreg)
 
-        self.phase_offset_in_pi_2 = sign % 4
+        return sign % 4, zlanes, ids
+
+    def diagonalize(self) :
+        self.phase_offset_in_pi_2, zlanes, ids = self.diagonalize_lanes()
+        paulis = [qreg for qreg, p in zlanes]
+        self.plist = [p for qreg, p in zlanes if p is not None]
             
         self.cxchain = []
         if len(paulis) == 0 :
@@ -0,0 +1,113 @@
+from . import model
+from . import gate_type as gtype
+from .pauli_gates_diagonalizer import PauliGatesDiagonalizer
+from .expand import adjoint
+from .bitops import parity
+import numpy as np
+
+
+def _basis_key(p) :
+    # pauli operator of a lane, identified by its diagonalizing gate.
+    if p is None :
+        return 'Z'
+    if isinstance(p.gate_type, gtype.H) :
+        return 'X'
+    return 'Y'
+
+
+class PauliTermGroup :
+    """ qubit-wise commuting pauli terms diagonalized by one basis change.
+    Expectation values of all terms in a group are calculated from one probability vector
+    of qregs in the group after applying the basis change.
+    """
+    def __init__(self) :
+        # key: qreg, value: gate to diagonalize the lane or None for z-based lanes.
+        self.bases = dict()
+        # list of (term index, coefficient * phase, z-based qregs)
+        self.terms = list()
+
+    @property
+    def qregs(self) :
+        return sorted(self.bases.keys(), key = lambda qreg : qreg.id)
+
+    @property
+    def term_indices(self) :
+        return [term_idx for term_idx, _, _ in self.terms]
+
+    def commutes(self, zlanes) :
+        for qreg, p in zlanes :
+            if qreg in self.bases and _basis_key(self.bases[qreg]) != _basis_key(p) :
+                return False
+        return True
+
+    def add(self, term_idx, coef, phase, zlanes) :
+        for qreg, p in zlanes :
+            if not qreg in self.bases :
+                self.bases[qreg] = p
+        self.terms.append((term_idx, coef * 1.j ** phase, [qreg for qreg, _ in zlanes]))
+
+    def get_basis_change(self, qregs = None) :
+        """ returns a gate list for the basis change.
+        If qregs is given, gates are created only for qregs in it. """
+        gates = [self.bases[qreg] for qreg in self.qregs if self.bases[qreg] is not None]
+        if qregs is not None :
+            gates = [gate for gate in gates if gate.qreg in qregs]
+        # basis change is the adjoint of diagonalizing gates.
+        return adjoint(gates)
+
+    def calc_expectations(self, prob, qreg_ordering) :
+        """ returns an array of weighted expectation values of terms in this group.
+        prob is a probability vector after the basis change, whose bits are ordered by qreg_ordering.
+        qregs in the group and not in qreg_ordering are regarded as |0> before the basis change.
+        """
+        prob = np.asarray(prob, np.float64)
+        idx = np.arange(len(prob), dtype = np.int64)
+        values = np.zeros([len(self.terms)], np.complex128)
+        for pos, (_, coef, zqregs) in enumerate(self.terms) :
+            mask = 0
+            is_zero = False
+            for qreg in zqregs :
+                if qreg in qreg_ordering :
+                    mask |= 1 << qreg_ordering.index(qreg)
+                elif self.bases[qreg] is not None :
+                    # <0|X|0> = <0|Y|0> = 0
+                    is_zero = True
+            if is_zero :
+                continue
+            signs = 1 - 2 * parity(idx & mask)
+            values[pos] = coef * np.dot(signs, prob)
+        return values.real
+
+
+def group_pauli_terms(terms) :
+    """ partition pauli terms into qubit-wise commuting groups.
+    terms is a list of pauli terms, each of which is (coefficient, gatelist) or gatelist.
+    Gate lists consist of ID, X, Y and Z gates as accepted by PauliObserver.
+    Returns a list of PauliTermGroup.
+    """
+    groups = list()
+    for term_idx, term in enumerate(terms) :
+        if isinstance(term, tuple) :
+            coef, gatelist = term
+        else :
+            coef, gatelist = 1., term
+        if isinstance(gatelist, model.Gate) :
+            gatelist = [gatelist]
+        for gate in gatelist :
+            if not isinstance(gate, model.Gate) or \
+               not isinstance(gate.gate_type, (gtype.ID, gtype.X, gtype.Y, gtype.Z)) :
+                raise RuntimeError('pauli terms only accept ID, X, Y and Z gates, but {} passed.'.format(repr(gate)))
+            if gate.ctrllist is not None :
+                raise RuntimeError('control qreg(s) should not be set for pauli operators.')
+
+        phase, zlanes, _ = PauliGatesDiagonalizer(gatelist).diagonalize_lanes()
+        # first fit, terms are added to the first group that commutes qubit-wise.
+        for group in groups :
+            if group.commutes(zlanes) :
+                break
+        else :
+            group = PauliTermGroup()
+            groups.append(group)
+        group.add(term_idx, coef, phase, zlanes)
+
+    return groups
@@ -8,3 +8,42 @@ circuit_prep = 'circuit_prep'
 dynamic = 'dynamic'
 static = 'static'
 one_static = 'one_static'
+
+optimize = 'optimize'
+
+#  True: inverse gates such as X.X, H.H, CX.CX and gate.gate.Adj are cancelled, and successive rotations
+#  such as Rz.Rz, U1.U1 and ExpiZ.ExpiZ are merged.  Gates are moved over commuting gates to find
+#  partners, but not over barriers, if clauses, measurements and multi qubit gates.
+#  False: gates are applied as given.  (default)
+
+gate_fusion = 'gate_fusion'
+
+#  True: successive 1 qubit gates on the same qreg (and the same control qregs) are fused into one gate.
+#  False: gates are applied as given.  (default)
+
+diagonal_fusion = 'diagonal_fusion'
+
+#  True or integer: successive diagonal gates, controlled or not, on overlapping qregs are fused into
+#  one phase table applied in one pass over state vectors.  The number of qregs of a table is limited
+#  by the given integer (10 if True), and clamped to 16.  Enabled when multi qubit gates are enabled.
+#  False: diagonal gates are applied as given.  (default)
+
+trotter_expansion = 'trotter_expansion'
+
+#  True: successive Expi gates without control qregs, such as trotter steps, are expanded together.
+#  Commuting terms are reordered to share basis changes, and only H/SH and CX gates that differ
+#  between basis changes of successive terms are applied.  Expi gates converted to multi qubit gates
+#  are not expanded.
+#  False: each Expi gate is expanded separately.  (default)
+
+multi_qubit_gate = 'multi_qubit_gate'
+
+#  True: SWAP and Expi gates are applied as multi qubit gates, each costs one pass over state vectors.
+#  False: SWAP and Expi gates are expanded to 1 qubit gates and CX gates.
+#  Default is given by runtimes.  (True for py and cpu)
+
+random_generator = 'random_generator'
+
+#  numpy.random.Generator, SeedSequence or integer seed for random numbers of measurements and sampling.
+#  Each simulator has its own random number stream.
+#  None: numpy global random state is used.  (default)
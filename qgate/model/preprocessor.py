@@ -1,20 +1,64 @@
 from . import model
 from . import directive
+from . import gate_type as gtype
 from . import gatelist
 from .qreg_aggregator import QregAggregator
-from .expand import expand
+from .expand import expand, exp_to_multi_qubit_gate, expand_exp_sequence
+from .circuit_optimizer import CircuitOptimizer
+from .gate_fusion import GateFusion
+from .diagonal_fusion import DiagonalGateFusion, max_table_qregs
 from . import prefs
 
 class Preprocessor :
     def __init__(self, **prefdict) :
         self.circ_prep = prefdict.get(prefs.circuit_prep, prefs.dynamic)
         self.dynamic = self.circ_prep == prefs.dynamic
+        self.multi_qubit_gate = prefdict.get(prefs.multi_qubit_gate, False)
+        self.trotter_expansion = prefdict.get(prefs.trotter_expansion, False)
         self.aggregator = QregAggregator()
+        self.optimizer = None
+        if prefdict.get(prefs.optimize, False) :
+            self.optimizer = CircuitOptimizer()
+        self.gate_fusion = None
+        if prefdict.get(prefs.gate_fusion, False) :
+            self.gate_fusion = GateFusion()
+        self.diagonal_fusion = None
+        diagonal_fusion = prefdict.get(prefs.diagonal_fusion, False)
+        if diagonal_fusion and self.multi_qubit_gate :
+            max_qregs = 10 if diagonal_fusion is True else diagonal_fusion
+            max_qregs = min(max_qregs, max_table_qregs)
+            self.diagonal_fusion = DiagonalGateFusion(max_qregs)
         self.reset()
     
     def reset(self) :
         self.aggregator.reset()
+        if self.optimizer is not None :
+            self.optimizer.reset()
+        if self.gate_fusion is not None :
+            self.gate_fusion.reset()
+        if self.diagonal_fusion is not None :
+            self.diagonal_fusion.reset()
         self._refset = set()
+
+    def snapshot(self) :
+        # qregsets and references, used to continue preprocessing from a restored state.
+        return list(self.aggregator.qregsetlist), set(self.aggregator.qregset), set(self._refset)
+
+    def restore(self, snapshot) :
+        qregsetlist, qregset, refset = snapshot
+        self.aggregator.qregsetlist = list(qregsetlist)
+        self.aggregator.qregset = set(qregset)
+        self._refset = set(refset)
+
+    def get_stats(self) :
+        stats = dict()
+        if self.optimizer is not None :
+            stats['optimize'] = self.optimizer.get_stats()
+        if self.gate_fusion is not None :
+            stats['gate_fusion'] = self.gate_fusion.get_stats()
+        if self.diagonal_fusion is not None :
+            stats['diagonal_fusion'] = self.diagonal_fusion.get_stats()
+        return stats
         
     def get_qregset(self) :
         return self.aggregator.qregset
@@ -71,6 +115,20 @@ class Preprocessor :
         elif isinstance(op, model.Barrier) :
             # barrier
             preprocessed.append(op)
+        elif isinstance(op, model.MultiQubitGate) and self.multi_qubit_gate :
+            # Multi qubit gate, all qregs are joined.
+            all_qregs = list(op.qreglist)
+            if op.ctrllist is not None :
+                all_qregs += op.ctrllist
+            joined = self.aggregator.aggregate(all_qregs)
+            if joined is not None and self.dynamic :
+                preprocessed.append(directive.Join(joined))
+            preprocessed.append(op)
+        elif isinstance(op, model.GatelistMacro) and self.multi_qubit_gate :
+            # Expi gate on a small number of qregs is converted to a multi qubit gate.
+            gate = exp_to_multi_qubit_gate(op)
+            expanded = expand(op) if gate is None else [gate]
+            preprocessed += self.preprocess_operator_list(expanded)
         elif isinstance(op, (model.MultiQubitGate, model.GatelistMacro,
                              model.PauliMeasure, model.PauliProb)) :
             # PauliMeasure, PauliProb, MultiQubitGate, GatelistMacro
@@ -92,15 +150,50 @@ class Preprocessor :
 
         return preprocessed
 
-    def preprocess_operator_list(self, oplist) :
-        preprocessed = list()
+    def preprocess_operator_list(self, oplist, preprocessed = None) :
+        # preprocessed operators are appended to preprocessed without intermediate lists.
+        if preprocessed is None :
+            preprocessed = list()
+        exps = list()
         for op in oplist :
-            preprocessed += self.preprocess_operator(op)
+            if self.trotter_expansion and self._is_expanded_exp(op) :
+                # successive Expi gates are expanded together.
+                exps.append(op)
+                continue
+            if len(exps) != 0 :
+                self.preprocess_operator_list(expand_exp_sequence(exps), preprocessed)
+                exps = list()
+            if isinstance(op, gatelist.GateList) :
+                self.preprocess_clause(op, preprocessed)
+            else :
+                preprocessed += self.preprocess_operator(op)
+        if len(exps) != 0 :
+            self.preprocess_operator_list(expand_exp_sequence(exps), preprocessed)
         return preprocessed
 
-    def preprocess_clause(self, clause) :
-        preprocessed = [ directive.ClauseBegin() ]
-        preprocessed += self.preprocess_operator_list(clause.ops)
+    def _is_expanded_exp(self, op) :
+        if not isinstance(op, model.GatelistMacro) or not isinstance(op.gate_type, gtype.Expi) :
+            return False
+        if op.ctrllist is not None :
+            return False
+        return not self.multi_qubit_gate or exp_to_multi_qubit_gate(op) is None
+
+    def _flatten(self, ops) :
+        # nested gate lists are flattened to find successive Expi gates.
+        flattened = list()
+        for op in ops :
+            if isinstance(op, gatelist.GateList) :
+                flattened += self._flatten(op.ops)
+            else :
+                flattened.append(op)
+        return flattened
+
+    def preprocess_clause(self, clause, preprocessed = None) :
+        if preprocessed is None :
+            preprocessed = list()
+        preprocessed.append(directive.ClauseBegin())
+        ops = self._flatten(clause.ops) if self.trotter_expansion else clause.ops
+        self.preprocess_operator_list(ops, preprocessed)
         preprocessed.append(directive.ClauseEnd())
         return preprocessed
 
@@ -125,18 +218,20 @@ class Preprocessor :
 
             ops = prologue + ops
 
-        # set execution order of operators
-        it = gatelist.GateListIterator(ops)
-        idx = 0
-        while True :
-            op = it.next()
-            if op is None :
-                break
+        if self.optimizer is not None :
+            ops = self.optimizer.optimize(ops)
+        if self.gate_fusion is not None :
+            ops = self.gate_fusion.fuse(ops)
+        if self.diagonal_fusion is not None :
+            ops = self.diagonal_fusion.fuse(ops)
+
+        # linearize operators, and set execution order of operators
+        linear = gatelist.LinearOps(ops)
+        for idx, op in enumerate(linear.ops) :
             op.set_idx(idx)
-            idx += 1
-            if isinstance(op, model.IfClause) :
-                it.prepend(op.clause)
 
         preprocessed = gatelist.GateList()
         preprocessed.ops = ops
+        # linearized operators traversed by simulators.
+        preprocessed.linear = linear
         return preprocessed
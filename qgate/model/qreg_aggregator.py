@@ -1,28 +1,61 @@
 
 class QregAggregator :
-    
+    """ Tracking qregsets, groups of qregs entangled by gates, on a disjoint-set forest.
+    Each qreg refers to a node, and nodes of a qregset are linked to one root node that holds qregs
+    in the qregset.  Separated qregs refer to new nodes, and old nodes are left in trees as
+    links, so that separation does not require rebuilding trees.
+    """
+
     def __init__(self) :
         self.reset()
 
     def reset(self) :
-        self.qregsetlist = list()
         self.qregset = set()
+        # key: qreg, value: node the qreg currently refers to.
+        self._nodes = dict()
+        # key: node, value: parent node.  Root nodes are their own parents.
+        self._parents = list()
+        # key: root node, value: qregs in qregset.  Ordered by creation of qregsets.
+        self._members = dict()
+
+    @property
+    def qregsetlist(self) :
+        return [frozenset(members) for members in self._members.values()]
+
+    @qregsetlist.setter
+    def qregsetlist(self, qregsetlist) :
+        self.reset()
+        for qregset in qregsetlist :
+            root = self._new_node()
+            for qreg in qregset :
+                self.qregset.add(qreg)
+                self._nodes[qreg] = root
+            self._members[root] = set(qregset)
+
+    def _new_node(self) :
+        node = len(self._parents)
+        self._parents.append(node)
+        return node
+
+    def _find_root(self, qreg) :
+        node = self._nodes[qreg]
+        parents = self._parents
+        while parents[node] != node :
+            # path halving.
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
 
     def find_qregset(self, qreg) :
-        for qregset in self.qregsetlist :
-            if qreg in qregset :
-                return qregset
-        # for debug
-        print('qreg {}'.format(qreg.id))
-        for qregset in self.qregsetlist :
-            ids = ['{}'.format(qreg.id) for qreg in qregset]
-            print(' '.join(ids))
-        assert False, 'Must not reach.'
-        
+        assert qreg in self._nodes, 'qreg {} is not added.'.format(qreg.id)
+        return frozenset(self._members[self._find_root(qreg)])
+
     def add_qreg(self, qreg) :
         if not qreg in self.qregset :
             self.qregset.add(qreg)
-            self.qregsetlist.append(frozenset([qreg]))
+            node = self._new_node()
+            self._nodes[qreg] = node
+            self._members[node] = set([qreg])
             return True
         return False
 
@@ -31,35 +64,38 @@ class QregAggregator :
         for qreg in qreglist :
             if not qreg in self.qregset :
                 self.add_qreg(qreg)
-        # collect qregsets that contain qregs in the given qreglist
-        qsset = set()
-        for qreg in qreglist :
-            qregset = self.find_qregset(qreg)
-            qsset.add(qregset)
+        # collect roots of qregsets that contain qregs in the given qreglist
+        roots = set([self._find_root(qreg) for qreg in qreglist])
         # already aggregated.
-        if len(qsset) == 1 :
+        if len(roots) == 1 :
             return None
 
-        # merge qregset, and update qregsetlist.
-        merged = set()
-        for qs in qsset :
-            self.qregsetlist.remove(qs)
-            merged |= qs
-        self.qregsetlist.append(frozenset(merged))
-        
-        return merged
+        # link roots to the root of the largest qregset.
+        roots = sorted(roots, key = lambda root : len(self._members[root]), reverse = True)
+        merged_root = roots[0]
+        merged = self._members.pop(merged_root)
+        for root in roots[1:] :
+            self._parents[root] = merged_root
+            merged |= self._members.pop(root)
+        # merged qregset is placed at the end of qregsetlist.
+        self._members[merged_root] = merged
+
+        return set(merged)
 
     def separate_qreg(self, qreg) :
-        # get qregset that contains the given qreg.
-        qregset = self.find_qregset(qreg)
-        # remove qregset from qregsetlist.
-        self.qregsetlist.remove(qregset)
-        # remove qreg from qregset.
-        qregset = set(qregset)
-        qregset.remove(qreg)
+        # remove qreg from qregset that contains the given qreg.
+        root = self._find_root(qreg)
+        if len(self._members[root]) == 1 :
+            # already separated.
+            return
+        self._members[root].remove(qreg)
+        # qreg refers to a new node, and the old node is left as a link.
+        node = self._new_node()
+        self._nodes[qreg] = node
+        members = self._members.pop(root)
         # append 2 separated qregsets.
-        self.qregsetlist.append(frozenset(qregset))
-        self.qregsetlist.append(frozenset([qreg]))
+        self._members[root] = members
+        self._members[node] = set([qreg])
 
     # for debug
     def validate(self) :
@@ -68,4 +104,3 @@ class QregAggregator :
         n_qregs_0 = np.sum([len(qregset) for qregset in self.qregsetlist])
         n_qregs_1 = len(self.qregset)
         assert n_qregs_0 == n_qregs_1
-
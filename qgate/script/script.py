@@ -10,9 +10,10 @@ def _expand_args(args) :
         expanded.append(args)
     return expanded
 
-def _assert_is_number(obj) :
-    if not isinstance(obj, numbers.Number) :
-        raise RuntimeError('{} is not a number'.format(str(obj)))
+def _assert_is_angle(obj) :
+    # angles are numbers or parameters.
+    if not isinstance(obj, (numbers.Number, model.ParameterExpression)) :
+        raise RuntimeError('{} is not a number or a parameter'.format(str(obj)))
 
 def new_gatelist() :
     return model.GateList()
@@ -32,6 +33,12 @@ def new_reference() :
 def new_references(count) :
     return [model.Reference() for _ in range(count)]
 
+def new_parameter(name = None) :
+    return model.Parameter(name)
+
+def new_parameters(count) :
+    return [model.Parameter() for _ in range(count)]
+
 # functions to instantiate operators
 
 def measure(outref, args) :
@@ -135,19 +142,19 @@ this.Z = ConstGateFactory(gtype.Z())
 # // Rotation around X-axis
 # gate rx(theta) a { u3(theta,-pi/2,pi/2) a; }
 def Rx(theta) :
-    _assert_is_number(theta)
+    _assert_is_angle(theta)
     return GateFactory(gtype.RX(theta))
 
 # // rotation around Y-axis
 # gate ry(theta) a { u3(theta,0,0) a; }
 def Ry(theta) :
-    _assert_is_number(theta)
+    _assert_is_angle(theta)
     return GateFactory(gtype.RY(theta))
 
 # // rotation around Z axis
 # gate rz(phi) a { u1(phi) a; }
 def Rz(theta) :
-    _assert_is_number(theta)
+    _assert_is_angle(theta)
     return GateFactory(gtype.RZ(theta))
 
 # 1 parameeter
@@ -155,7 +162,7 @@ def Rz(theta) :
 # // 1-parameter 0-pulse single qubit gate
 # gate u1(lambda) q { U(0,0,lambda) q; }
 def U1(_lambda) :
-    _assert_is_number(_lambda)
+    _assert_is_angle(_lambda)
     return GateFactory(gtype.U1(_lambda))
 
 # 2 parameeters
@@ -163,7 +170,7 @@ def U1(_lambda) :
 # // 2-parameter 1-pulse single qubit gate
 # gate u2(phi,lambda) q { U(pi/2,phi,lambda) q; }
 def U2(phi, _lambda) :
-    _assert_is_number(_lambda)
+    _assert_is_angle(_lambda)
     return GateFactory(gtype.U2(phi, _lambda))
 
 # 3 parameeters
@@ -172,18 +179,18 @@ def U2(phi, _lambda) :
 # // 3-parameter 2-pulse single qubit gate
 # gate u3(theta,phi,lambda) q { U(theta,phi,lambda) q; }
 def U3(theta, phi, _lambda) :
-    _assert_is_number(theta)
-    _assert_is_number(phi)
-    _assert_is_number(_lambda)
+    _assert_is_angle(theta)
+    _assert_is_angle(phi)
+    _assert_is_angle(_lambda)
     return GateFactory(gtype.U(theta, phi, _lambda))
 
 # exp
 def Expii(theta) :
-    _assert_is_number(theta)
+    _assert_is_angle(theta)
     return GateFactory(gtype.ExpiI(theta))
 
 def Expiz(theta) :
-    _assert_is_number(theta)
+    _assert_is_angle(theta)
     return GateFactory(gtype.ExpiZ(theta))
 
 # utility
@@ -207,6 +214,7 @@ class GatelistMacroFactory :
 
 # multi qubit gate
 def Expi(theta) :
+    _assert_is_angle(theta)
     return GatelistMacroFactory(gtype.Expi(theta))
 
 
@@ -251,30 +259,30 @@ class ControlledGateFactory :
         return self.create(gtype.Z())
     
     def Rx(self, theta) :
-        _assert_is_number(theta)
+        _assert_is_angle(theta)
         return self.create(gtype.RX(theta))
 
     def Ry(self, theta) :
-        _assert_is_number(theta)
+        _assert_is_angle(theta)
         return self.create(gtype.RY(theta))
 
     def Rz(self, theta) :
-        _assert_is_number(theta)
+        _assert_is_angle(theta)
         return self.create(gtype.RZ(theta))
     
     def U1(self, _lambda) :
-        _assert_is_number(_lambda)
+        _assert_is_angle(_lambda)
         return self.create(gtype.U1(_lambda))
 
     def U2(self, phi, _lambda) :
-        _assert_is_number(phi)
-        _assert_is_number(_lambda)
+        _assert_is_angle(phi)
+        _assert_is_angle(_lambda)
         return self.create(gtype.U2(phi, _lambda))
 
     def U3(self, theta, phi, _lambda) :
-        _assert_is_number(theta)
-        _assert_is_number(phi)
-        _assert_is_number(_lambda)
+        _assert_is_angle(theta)
+        _assert_is_angle(phi)
+        _assert_is_angle(_lambda)
         return self.create(gtype.U(theta, phi, _lambda))
 
     # multi qubit gate
@@ -284,9 +292,11 @@ class ControlledGateFactory :
         return factory
     
     def Expii(self, theta) :
+        _assert_is_angle(theta)
         return self.create(gtype.ExpiI(theta))
     
     def Expiz(self, theta) :
+        _assert_is_angle(theta)
         return self.create(gtype.ExpiZ(theta))
 
     # utility
@@ -295,6 +305,7 @@ class ControlledGateFactory :
         return self.create(gtype.SH())
     
     def Expi(self, theta) :
+        _assert_is_angle(theta)
         return self.create_gatelistmacro(gtype.Expi(theta))
 
     
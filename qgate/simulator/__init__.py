@@ -3,6 +3,8 @@ from . import pymatrix   # python matrix definitions.
 from . import cpumatrix  # cpu matrix definitions.
 from . import pyruntime
 from . import cpuruntime
+from . import mmapruntime
+from . import distruntime
 from . import utils
 import numpy as np
 
@@ -23,6 +25,18 @@ def cpu(**prefs) :
     sim = simulator.Simulator(cpuruntime, **prefs)
     return sim
 
+def mmap(**prefs) :
+    """ CPU simulator whose large qubit states are placed in memory-mapped files.
+    Directories and chunk size are given by mmapruntime.set_preference(). """
+    sim = simulator.Simulator(mmapruntime, **prefs)
+    return sim
+
+def dist(**prefs) :
+    """ CPU simulator whose large qubit states are distributed across worker processes.
+    The number of processes and chunk size are given by distruntime.set_preference(). """
+    sim = simulator.Simulator(distruntime, **prefs)
+    return sim
+
 def cuda(**prefs) :
     sim = simulator.Simulator(cudaruntime, **prefs)
     return sim
@@ -18,3 +18,5 @@ gtype.ExpiI.cmatf = glue.register_matrix_factory('ExpiI')
 gtype.ExpiZ.cmatf = glue.register_matrix_factory('ExpiZ')
 # Utility
 gtype.SH.cmatf = glue.register_matrix_factory('SH')
+# Fused gate
+gtype.MAT.cmatf = glue.register_matrix_factory('MAT')
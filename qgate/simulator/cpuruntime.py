@@ -4,6 +4,9 @@ from .native_qubit_processor import NativeQubitProcessor
 from .native_qubit_states import NativeQubitStates
 from .native_qubits_states_getter import NativeQubitsStatesGetter
 
+# runtime has multi qubit gate operations.
+multi_qubit_gate = True
+
 def create_qubit_states(dtype) :
     processor = NativeQubitProcessor(dtype, cpuext.qubit_processor_new(dtype))
     ptr = cpuext.qubit_states_new(dtype)
@@ -22,3 +25,26 @@ class CPUQubitsStatesGetter(NativeQubitsStatesGetter) :
                              sampling_pool_factory = None) :
         return self._create_sampling_pool(qreg_ordering, n_lanes, n_hidden_lanes, lane_trans,
                                           empty_lanes, False, sampling_pool_factory)
+
+
+def set_n_workers(n_workers) :
+    """ set the number of worker threads.  Default is used if n_workers <= 0. """
+    cpuext.parallel_set_n_workers(n_workers)
+
+def get_n_workers() :
+    return cpuext.parallel_get_n_workers()
+
+def set_pin_workers(pin) :
+    """ pin worker threads to cpus sorted by NUMA node, so that each worker touches
+    qubit states on its own node.  Default is given by QGATE_PIN_WORKERS. """
+    cpuext.parallel_set_pinning(pin)
+
+def get_pin_workers() :
+    return cpuext.parallel_get_pinning()
+
+def shutdown_workers() :
+    """ join worker threads.  Worker threads are created again when required. """
+    cpuext.parallel_shutdown()
+
+import atexit
+atexit.register(shutdown_workers)
@@ -13,6 +13,8 @@ from .native_qubit_states import NativeQubitStates
 from .native_qubits_states_getter import NativeQubitsStatesGetter
 from .native_sampling_pool import NativeSamplingPool
 from . import glue
+from . import qubits
+from . import lanes
 
 import sys
 this = sys.modules[__name__]
@@ -71,6 +73,26 @@ class CUDAQubitsStatesGetter(NativeQubitsStatesGetter) :
         return self._create_sampling_pool(qreg_ordering, n_lanes, n_hidden_lanes, lane_trans,
                                           empty_lanes, True, sampling_pool_factory)
 
+    def calc_pauli_expectations(self, qstates, x_mask, z_masks) :
+        # states are copied to host, and expectations are calculated by numpy.
+        n_states = 1 << qstates.get_n_lanes()
+        dtype = np.complex64 if self.dtype == np.float32 else np.complex128
+        states = np.empty([n_states], dtype)
+        lane_trans = lanes.create_local_lane_transformation(qstates)
+        self.get_states(states, 0, qubits.null, lane_trans, [], n_states, 0, 1)
+        return qubits.pauli_expectations(states, x_mask, z_masks)
+
+def set_n_workers(n_workers) :
+    """ set the number of worker threads.  Default is used if n_workers <= 0. """
+    cudaext.parallel_set_n_workers(n_workers)
+
+def get_n_workers() :
+    return cudaext.parallel_get_n_workers()
+
+def shutdown_workers() :
+    """ join worker threads.  Worker threads are created again when required. """
+    cudaext.parallel_shutdown()
+
 def module_init() :
     cudaext.devices_initialize(this.device_ids, this.max_po2idx_per_chunk, this.memory_store_size)
     this.initialized = True
@@ -82,6 +104,7 @@ def module_finalize() :
     if this.initialized :
         cudaext.devices_clear()
     this.initialized = False
+    shutdown_workers()
 
 import atexit
 atexit.register(module_finalize)
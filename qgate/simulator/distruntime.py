@@ -0,0 +1,417 @@
+import numpy as np
+import os
+from . import pyruntime
+from .pyruntime import QubitStates, PyQubitProcessor, PyQubitsStatesGetter, adjoint
+
+# CPU runtime whose large qubit states are split into power-of-two chunks in shared memory.
+# Chunks are distributed across worker processes, and gates on lanes within a chunk are applied
+# by the worker owning the chunk.  Gates on higher lanes are applied to pairs of chunks.
+# Other operations such as join and measurement are done in the main process on shared memory.
+
+# runtime has multi qubit gate operations.
+multi_qubit_gate = True
+
+import sys
+this = sys.modules[__name__]
+
+# initialization flag.
+this.initialized = False
+this.n_processes = -1
+this.max_po2idx_per_chunk = -1
+this.pool = None
+# pid of the process owning the worker pool.
+this.pid = -1
+
+
+def set_preference(n_processes = -1, max_po2idx_per_chunk = -1) :
+    """ set the number of worker processes and the size of chunks.
+    Qubit states of 2**max_po2idx_per_chunk or less are not distributed.
+    """
+    if this.initialized :
+        raise RuntimeError('already initialized.')
+    if n_processes != -1 :
+        this.n_processes = n_processes
+    if max_po2idx_per_chunk != -1 :
+        this.max_po2idx_per_chunk = max_po2idx_per_chunk
+
+def reset_preference() :
+    this.n_processes = -1
+    this.max_po2idx_per_chunk = -1
+
+
+# chunk operations executed in worker processes.
+
+def _chunk_qstates(chunk, n_lanes) :
+    # wrap a chunk to use lane views of pyruntime.
+    qstates = QubitStates(None)
+    qstates.n_lanes = n_lanes
+    qstates.states = chunk
+    return qstates
+
+def _select_controlled(chunk, n_lanes, control_mask) :
+    # view chunk as a tensor of (2, ..., 2), and select states whose control bits are 1.
+    tensor = chunk.reshape([2] * n_lanes)
+    key = [slice(None)] * n_lanes
+    for lane in range(n_lanes) :
+        if (control_mask >> lane) & 1 :
+            key[n_lanes - lane - 1] = 1
+    return tensor[tuple(key)]
+
+def _apply_local_records(chunk, chunk_idx, chunk_bits, records) :
+    local_mask = (1 << chunk_bits) - 1
+    for mat, control_mask, target_lane in records :
+        control_mask, target_lane = int(control_mask), int(target_lane)
+        high_mask = control_mask & ~local_mask
+        if ((chunk_idx << chunk_bits) & high_mask) != high_mask :
+            continue
+        low_mask = control_mask & local_mask
+        qstates = _chunk_qstates(chunk, chunk_bits)
+        if low_mask == 0 :
+            view = pyruntime._lane_view(qstates, target_lane)
+            pyruntime._apply_matrix(mat, view[:, 0, :], view[:, 1, :])
+        else :
+            control_lanes = [lane for lane in range(chunk_bits) if (low_mask >> lane) & 1]
+            view = pyruntime._controlled_lane_view(qstates, control_lanes, target_lane)
+            pyruntime._apply_matrix(mat, view[0, ...], view[1, ...])
+
+def _apply_pair_records(chunk0, chunk1, chunk_idx0, chunk_bits, records) :
+    # chunk0 and chunk1 differ in the bit of target lane.
+    local_mask = (1 << chunk_bits) - 1
+    for mat, control_mask, target_lane in records :
+        control_mask = int(control_mask)
+        high_mask = control_mask & ~local_mask
+        if ((chunk_idx0 << chunk_bits) & high_mask) != high_mask :
+            continue
+        low_mask = control_mask & local_mask
+        qs0 = _select_controlled(chunk0, chunk_bits, low_mask)
+        qs1 = _select_controlled(chunk1, chunk_bits, low_mask)
+        pyruntime._apply_matrix(mat, qs0, qs1)
+
+def _worker_attach(blocks, name, n_states) :
+    block = blocks.get(name, None)
+    if block is None :
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name)
+        states = np.ndarray([n_states], np.complex128, buffer = shm.buf)
+        block = (shm, states)
+        blocks[name] = block
+    return block[1]
+
+def _worker_release(blocks, name) :
+    block = blocks.pop(name, None)
+    if block is not None :
+        shm, states = block
+        del states
+        shm.close()
+
+def _worker_initialize(blocks, name, n_states, chunk_bits, chunks, reset) :
+    # first touch, worker processes initialize their own chunks.
+    states = _worker_attach(blocks, name, n_states)
+    chunk_size = 1 << chunk_bits
+    for chunk_idx in chunks :
+        states[chunk_idx * chunk_size : (chunk_idx + 1) * chunk_size] = 0.
+        if reset and chunk_idx == 0 :
+            states[0] = 1.
+
+def _worker_apply_local(blocks, name, n_states, chunk_bits, chunks, records) :
+    states = _worker_attach(blocks, name, n_states)
+    chunk_size = 1 << chunk_bits
+    for chunk_idx in chunks :
+        chunk = states[chunk_idx * chunk_size : (chunk_idx + 1) * chunk_size]
+        _apply_local_records(chunk, chunk_idx, chunk_bits, records)
+
+def _worker_apply_pairs(blocks, name, n_states, chunk_bits, pairs, records) :
+    states = _worker_attach(blocks, name, n_states)
+    chunk_size = 1 << chunk_bits
+    for chunk_idx0, chunk_idx1 in pairs :
+        chunk0 = states[chunk_idx0 * chunk_size : (chunk_idx0 + 1) * chunk_size]
+        chunk1 = states[chunk_idx1 * chunk_size : (chunk_idx1 + 1) * chunk_size]
+        _apply_pair_records(chunk0, chunk1, chunk_idx0, chunk_bits, records)
+
+def _worker_calc_probability(blocks, name, n_states, chunk_bits, chunks, local_lane) :
+    states = _worker_attach(blocks, name, n_states)
+    chunk_size = 1 << chunk_bits
+    prob = 0.
+    for chunk_idx in chunks :
+        chunk = states[chunk_idx * chunk_size : (chunk_idx + 1) * chunk_size]
+        if local_lane < chunk_bits :
+            qs = pyruntime._lane_view(_chunk_qstates(chunk, chunk_bits), local_lane)[:, 0, :]
+        elif ((chunk_idx << chunk_bits) >> local_lane) & 1 == 0 :
+            qs = chunk
+        else :
+            continue
+        prob += np.sum(qs.real ** 2 + qs.imag ** 2)
+    return prob
+
+_worker_commands = {
+    'release' : _worker_release,
+    'initialize' : _worker_initialize,
+    'apply_local' : _worker_apply_local,
+    'apply_pairs' : _worker_apply_pairs,
+    'calc_probability' : _worker_calc_probability,
+}
+
+def _worker_loop(conn) :
+    # key: shared memory name, value: (SharedMemory, states)
+    blocks = dict()
+    while True :
+        msg = conn.recv()
+        if msg is None :
+            break
+        command, args = msg
+        try :
+            result = _worker_commands[command](blocks, *args)
+            conn.send((True, result))
+        except Exception as e :
+            conn.send((False, repr(e)))
+    for name in list(blocks.keys()) :
+        _worker_release(blocks, name)
+    conn.close()
+
+
+class WorkerPool :
+    """ worker processes connected by pipes. """
+    def __init__(self, n_processes) :
+        import multiprocessing
+        from multiprocessing import resource_tracker
+        # workers share the resource tracker of the main process to track shared memory.
+        resource_tracker.ensure_running()
+        # workers are forked to inherit the module state.
+        ctx = multiprocessing.get_context('fork')
+        self.conns = list()
+        self.processes = list()
+        for idx in range(n_processes) :
+            conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target = _worker_loop, args = (child_conn, ))
+            process.daemon = True
+            process.start()
+            child_conn.close()
+            self.conns.append(conn)
+            self.processes.append(process)
+
+    @property
+    def n_processes(self) :
+        return len(self.processes)
+
+    def run(self, command, args_list) :
+        """ run command in workers with args in args_list, and returns a list of results. """
+        for conn, args in zip(self.conns, args_list) :
+            conn.send((command, args))
+        results = list()
+        errors = list()
+        for conn in self.conns[:len(args_list)] :
+            succeeded, result = conn.recv()
+            if succeeded :
+                results.append(result)
+            else :
+                errors.append(result)
+        if len(errors) != 0 :
+            raise RuntimeError('worker error, {}'.format(errors[0]))
+        return results
+
+    def broadcast(self, command, args) :
+        return self.run(command, [args] * self.n_processes)
+
+    def terminate(self) :
+        for conn in self.conns :
+            try :
+                conn.send(None)
+                conn.close()
+            except (IOError, OSError) :
+                pass
+        for process in self.processes :
+            process.join()
+        self.conns, self.processes = [], []
+
+
+class DistributedQubitStates(QubitStates) :
+    """ qubit states split into chunks in shared memory if larger than a chunk. """
+    def __init__(self, processor) :
+        QubitStates.__init__(self, processor)
+        self.shm = None
+
+    def __del__(self) :
+        self.deallocate()
+
+    def allocate(self, n_lanes) :
+        self.n_lanes = n_lanes
+        _get_pool()
+        if n_lanes <= this.chunk_bits :
+            self.states = np.empty([1 << n_lanes], np.complex128)
+            return
+        from multiprocessing import shared_memory
+        n_states = 1 << n_lanes
+        self.shm = shared_memory.SharedMemory(create = True, size = n_states * 16)
+        self.states = np.ndarray([n_states], np.complex128, buffer = self.shm.buf)
+
+    def deallocate(self) :
+        shm = getattr(self, 'shm', None)
+        if shm is None :
+            return
+        self.shm = None
+        self.states = None
+        if this.pid != os.getpid() :
+            # copies in forked processes do not own shared memory.
+            shm.close()
+            return
+        if this.pool is not None :
+            this.pool.broadcast('release', (shm.name, ))
+        shm.close()
+        shm.unlink()
+
+    @property
+    def is_distributed(self) :
+        return self.shm is not None
+
+
+def _chunk_owner(chunk_idx, n_chunks, n_processes) :
+    # chunks are assigned to workers in blocks.
+    return chunk_idx * n_processes // n_chunks
+
+
+class DistributedQubitProcessor(PyQubitProcessor) :
+
+    def _chunks_per_worker(self, qstates) :
+        n_processes = _get_pool().n_processes
+        n_chunks = 1 << (qstates.n_lanes - this.chunk_bits)
+        chunks_list = [list() for _ in range(n_processes)]
+        for chunk_idx in range(n_chunks) :
+            chunks_list[_chunk_owner(chunk_idx, n_chunks, n_processes)].append(chunk_idx)
+        return chunks_list
+
+    def _pairs_per_worker(self, qstates, target_lane) :
+        # pairs of chunks whose indices differ in the bit of target lane.
+        n_processes = _get_pool().n_processes
+        n_chunks = 1 << (qstates.n_lanes - this.chunk_bits)
+        bit = 1 << (target_lane - this.chunk_bits)
+        pairs_list = [list() for _ in range(n_processes)]
+        pair_idx = 0
+        for chunk_idx0 in range(n_chunks) :
+            if chunk_idx0 & bit :
+                continue
+            chunk_idx1 = chunk_idx0 | bit
+            # owners of lower and higher chunks process pairs alternately for load balancing.
+            owned = chunk_idx0 if pair_idx % 2 == 0 else chunk_idx1
+            pairs_list[_chunk_owner(owned, n_chunks, n_processes)].append((chunk_idx0, chunk_idx1))
+            pair_idx += 1
+        return pairs_list
+
+    def _shm_args(self, qstates) :
+        return (qstates.shm.name, 1 << qstates.n_lanes, this.chunk_bits)
+
+    def initialize_qubit_states(self, qstates, n_lanes) :
+        PyQubitProcessor.initialize_qubit_states(self, qstates, n_lanes)
+        if qstates.is_distributed :
+            args_list = [self._shm_args(qstates) + (chunks, False)
+                         for chunks in self._chunks_per_worker(qstates)]
+            _get_pool().run('initialize', args_list)
+
+    def reset_qubit_states(self, qstates) :
+        if not qstates.is_distributed :
+            PyQubitProcessor.reset_qubit_states(self, qstates)
+            return
+        args_list = [self._shm_args(qstates) + (chunks, True)
+                     for chunks in self._chunks_per_worker(qstates)]
+        _get_pool().run('initialize', args_list)
+        qstates.reset_lane_states()
+
+    def calc_probability(self, qstates, local_lane) :
+        if not qstates.is_distributed :
+            return PyQubitProcessor.calc_probability(self, qstates, local_lane)
+        args_list = [self._shm_args(qstates) + (chunks, local_lane)
+                     for chunks in self._chunks_per_worker(qstates)]
+        return sum(_get_pool().run('calc_probability', args_list))
+
+    def apply_gate(self, gate_type, _adjoint, qstates, local_lane) :
+        self.apply_gates([(gate_type, _adjoint, None, local_lane)], qstates)
+
+    def apply_controlled_gate(self, gate_type, _adjoint,
+                              qstates, local_control_lanes, local_target_lane) :
+        self.apply_gates([(gate_type, _adjoint, local_control_lanes, local_target_lane)], qstates)
+
+    def apply_gates(self, gates, qstates) :
+        from .runtime_operator import gate_record
+        records = np.empty([len(gates)], gate_record)
+        for idx, (gate_type, _adjoint, local_control_lanes, local_target_lane) in enumerate(gates) :
+            mat = gate_type.pymat()
+            if _adjoint :
+                mat = adjoint(mat)
+            control_mask = 0
+            if local_control_lanes is not None :
+                for lane in local_control_lanes :
+                    control_mask |= 1 << lane
+            records[idx] = (mat, control_mask, local_target_lane)
+        self.apply_gate_records(records, qstates)
+
+    def apply_gate_records(self, records, qstates) :
+        if not qstates.is_distributed :
+            PyQubitProcessor.apply_gate_records(self, records, qstates)
+            return
+
+        # consecutive gates on lanes within chunks are applied in one round trip,
+        # and consecutive gates on the same high lane are applied to pairs of chunks.
+        begin = 0
+        while begin < len(records) :
+            target_lane = int(records[begin]['target_lane'])
+            is_local = target_lane < this.chunk_bits
+            end = begin + 1
+            while end < len(records) :
+                lane = int(records[end]['target_lane'])
+                if is_local and this.chunk_bits <= lane :
+                    break
+                if not is_local and lane != target_lane :
+                    break
+                end += 1
+            segment = records[begin:end]
+            if is_local :
+                args_list = [self._shm_args(qstates) + (chunks, segment)
+                             for chunks in self._chunks_per_worker(qstates)]
+                _get_pool().run('apply_local', args_list)
+            else :
+                args_list = [self._shm_args(qstates) + (pairs, segment)
+                             for pairs in self._pairs_per_worker(qstates, target_lane)]
+                _get_pool().run('apply_pairs', args_list)
+            begin = end
+
+
+def create_qubit_states(dtype) :
+    return DistributedQubitStates(DistributedQubitProcessor())
+
+def create_qubits_states_getter(dtype) :
+    return PyQubitsStatesGetter()
+
+def _get_pool() :
+    # workers are connected by pipes to the process that started them.  Forked processes have
+    # copies of the pipes, and their messages would be mixed with ones of the owner process.
+    if this.initialized and this.pid != os.getpid() :
+        raise RuntimeError('dist runtime is not usable in forked processes.')
+    if not this.initialized :
+        module_init()
+    return this.pool
+
+def module_init() :
+    import multiprocessing
+    if multiprocessing.current_process().daemon :
+        # daemonic processes are not allowed to start worker processes.
+        raise RuntimeError('dist runtime is not usable in daemonic processes.')
+    n_processes = this.n_processes
+    if n_processes <= 0 :
+        n_processes = multiprocessing.cpu_count()
+    chunk_bits = this.max_po2idx_per_chunk
+    if chunk_bits == -1 :
+        chunk_bits = 20
+    this.chunk_bits = chunk_bits
+    this.pool = WorkerPool(n_processes)
+    this.pid = os.getpid()
+    this.initialized = True
+
+def module_finalize() :
+    # workers are terminated only by the owner process.
+    if this.pool is not None and this.pid == os.getpid() :
+        this.pool.terminate()
+    this.pool = None
+    this.pid = -1
+    this.initialized = False
+
+import atexit
+atexit.register(module_finalize)
@@ -5,7 +5,7 @@ class EmptySamplingPool :
     def __init__(self, qreg_ordering) :
         self.qreg_ordering = qreg_ordering
 
-    def sample(self, n_samples) :
+    def sample(self, n_samples, randnum = None) :
         values = np.zeros([n_samples], dtype = np.int64)
         return observation.ObservationList(self.qreg_ordering, values, 0)
 
@@ -13,39 +13,87 @@ class Lane :
 
 
 class Lanes(dict) :
+    """ key: qreg, value: lane.
+    Lanes of each qubit states and external positions of qregs are indexed, so that lookups do not
+    scan all lanes.  Lanes should be moved to other qubit states by update_lane(). """
     def __init__(self) :
         super(Lanes, self).__init__()
+        # key: qstates, value: dict of lane -> qreg.
+        self._qstates_lanes = dict()
+        # key: qreg, value: external position given by set_external_layout().
+        self.external_positions = dict()
+
+    def __setitem__(self, qreg, lane) :
+        if qreg in self :
+            self._remove_index(qreg)
+        super(Lanes, self).__setitem__(qreg, lane)
+        self._qstates_lanes.setdefault(lane.qstates, dict())[lane] = qreg
+
+    def __delitem__(self, qreg) :
+        self._remove_index(qreg)
+        super(Lanes, self).__delitem__(qreg)
+
+    def pop(self, qreg, *args) :
+        if qreg in self :
+            self._remove_index(qreg)
+        return super(Lanes, self).pop(qreg, *args)
+
+    def clear(self) :
+        super(Lanes, self).clear()
+        self._qstates_lanes.clear()
+
+    def _remove_index(self, qreg) :
+        lane = self[qreg]
+        qslanes = self._qstates_lanes[lane.qstates]
+        del qslanes[lane]
+        if len(qslanes) == 0 :
+            del self._qstates_lanes[lane.qstates]
 
     def add_lane(self, qreg, qstates, local) :
         self[qreg] = Lane(qstates, local)
 
+    def update_lane(self, lane, qstates, local) :
+        qslanes = self._qstates_lanes[lane.qstates]
+        qreg = qslanes.pop(lane)
+        if len(qslanes) == 0 :
+            del self._qstates_lanes[lane.qstates]
+        lane.update(qstates, local)
+        self._qstates_lanes.setdefault(qstates, dict())[lane] = qreg
+
     def get_by_qubit_states(self, qs) :
-        lanes = list()
-        for qreg, lane in self.items() :
-            if lane.qstates == qs :
-                lanes.append(lane)
-        return lanes
-
-
-def create_lane_transformation(lanes, qreg_ordering) :
-    qsdict = dict()
-    for qreg, lane in lanes.items() :
-        lanelist = qsdict.get(lane.qstates)
-        if lanelist is None :
-            lanelist = list()
-            qsdict[lane.qstates] = lanelist
-        lane = Lane(qreg, lane.local)
-        if qreg in qreg_ordering :
-            external_idx = qreg_ordering.index(qreg)
-        else :
-            external_idx = -1
-        lane.set_external(external_idx)
-        lanelist.append(lane)
+        return list(self._qstates_lanes.get(qs, dict()).keys())
+
+    def set_external_layout(self, qreg_ordering) :
+        self.external_positions = dict([(qreg, idx) for idx, qreg in enumerate(qreg_ordering)])
+
+
+def create_lane_transformation(lanes, qreg_ordering = None) :
+    # external positions of lanes are given by qreg_ordering, or by the external layout of lanes
+    # if qreg_ordering is None.
+    if qreg_ordering is None :
+        positions = lanes.external_positions
+    else :
+        positions = dict([(qreg, idx) for idx, qreg in enumerate(qreg_ordering)])
 
     transformation = list()
-    for qs, lanelist in qsdict.items() :
-        lanelist.sort(key = lambda lane: lane.local)        
+    for qs, qslanes in lanes._qstates_lanes.items() :
+        lanelist = list()
+        for lane, qreg in qslanes.items() :
+            lane = Lane(qreg, lane.local)
+            lane.set_external(positions.get(qreg, -1))
+            lanelist.append(lane)
+        lanelist.sort(key = lambda lane: lane.local)
         transformation.append((qs, lanelist))
     transformation.sort(key = lambda tr: tr[1][0].local)
 
     return transformation
+
+
+def create_local_lane_transformation(qstates) :
+    # lane transformation whose external lanes are the same as local lanes of qstates.
+    lanelist = list()
+    for local in range(qstates.get_n_lanes()) :
+        lane = Lane(qstates, local)
+        lane.set_external(local)
+        lanelist.append(lane)
+    return [(qstates, lanelist)]
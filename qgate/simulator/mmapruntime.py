@@ -0,0 +1,64 @@
+from . import cpuext
+import numpy as np
+from .native_qubit_processor import NativeQubitProcessor
+from .native_qubit_states import NativeQubitStates
+from .cpuruntime import CPUQubitsStatesGetter, set_n_workers, get_n_workers, shutdown_workers
+
+# CPU runtime whose large qubit states are placed in chunks of memory-mapped files.
+
+# runtime has multi qubit gate operations.
+multi_qubit_gate = True
+
+import sys
+this = sys.modules[__name__]
+
+# initialization flag.
+this.initialized = False
+this.directories = []
+this.max_po2idx_per_chunk = -1
+
+def set_preference(directories = [], max_po2idx_per_chunk = -1) :
+    """ set directories for chunk files and the size of chunks.
+    Chunk files are created in directories in round-robin.
+    Qubit states of 2**max_po2idx_per_chunk or less are allocated in memory.
+    """
+    if this.initialized :
+        raise RuntimeError('already initialized.')
+    if len(directories) != 0 :
+        this.directories = list(directories)
+    if max_po2idx_per_chunk != -1 :
+        this.max_po2idx_per_chunk = max_po2idx_per_chunk
+
+def reset_preference() :
+    this.directories = []
+    this.max_po2idx_per_chunk = -1
+
+def create_qubit_states(dtype) :
+    if not this.initialized :
+        module_init()
+    processor = NativeQubitProcessor(dtype, cpuext.qubit_processor_new(dtype))
+    ptr = cpuext.qubit_states_new(dtype, True)
+    return NativeQubitStates(ptr, processor)
+
+def create_qubits_states_getter(dtype) :
+    ptr = cpuext.qubits_states_getter_new(dtype)
+    return CPUQubitsStatesGetter(dtype, ptr)
+
+def module_init() :
+    import tempfile
+    directories = this.directories
+    if len(directories) == 0 :
+        directories = [tempfile.gettempdir()]
+    po2idx = this.max_po2idx_per_chunk
+    if po2idx == -1 :
+        po2idx = 24
+    cpuext.mmap_chunk_store_initialize(directories, po2idx)
+    this.initialized = True
+
+def module_finalize() :
+    if this.initialized :
+        cpuext.mmap_chunk_store_finalize()
+    this.initialized = False
+
+import atexit
+atexit.register(module_finalize)
@@ -1,9 +1,9 @@
 import qgate.model as model
-from .runtime_operator import Observable, Gate, ControlledGate, Reset, Prob, Decohere
+from .runtime_operator import Observable, Gate, ControlledGate, MultiQubitGate, Reset, Prob, Decohere
 from .runtime_operator import Observer
 from .rop_executor import RopExecutor
 from .value_store import ValueStoreSetter
-import numpy.random as np_random
+from .random_numbers import RandomNumbers
 
 class ValueObserver(Observer) :
     def __init__(self) :
@@ -42,6 +42,11 @@ class ModelExecutor :
         self._qhandler = qubits_handler
         self._value_store = value_store
         self._rop_executor = RopExecutor()
+        # key: Measure op, value: random number used for the next measurement.
+        self._randnums = dict()
+        self._random_numbers = RandomNumbers()
+        # key: parameter, value: bound value.
+        self._bindings = dict()
 
     def value_observer(self) :
         return ValueObserver()
@@ -49,6 +54,16 @@ class ModelExecutor :
     def delegating_observer(self, value_setter) :
         return DelegatingObserver(value_setter)
 
+    def set_random_numbers(self, random_numbers) :
+        self._random_numbers = random_numbers
+
+    def set_bindings(self, bindings) :
+        self._bindings = bindings
+
+    def set_randnum(self, op, randnum) :
+        # given random number is used for the next dispatch of Measure op.
+        self._randnums[op] = randnum
+
     def enqueue(self, op) :
         if isinstance(op, model.Measure) :
             self._value_store.set(op.outref, op)
@@ -114,7 +129,9 @@ class ModelExecutor :
                 assert separate.qreg == op.qreg
                 fuse_separate = rop_prob.qstates.get_n_lanes() != 1
 
-            randnum = np_random.random_sample()
+            randnum = self._randnums.pop(op, None)
+            if randnum is None :
+                randnum = self._random_numbers.random()
             if fuse_separate :
                 # processed synchronously, not using observer.
                 self._rop_executor.wait_rop(rop_prob) # wait for prob observed.
@@ -154,17 +171,35 @@ class ModelExecutor :
             pass
         # Gate ops
         elif isinstance(op, model.Gate) :
+            gate_type = op.gate_type
+            if model.has_parameters(gate_type) :
+                gate_type = model.bind_gate_type(gate_type, self._bindings)
             target_lane = self._qhandler.lanes[op.qreg]
             if op.ctrllist is None :
-                rop = Gate(target_lane.qstates, op.gate_type, op.adjoint, target_lane.local)
+                rop = Gate(target_lane.qstates, gate_type, op.adjoint, target_lane.local)
             else :
                 local_control_lanes = [self._qhandler.lanes[ctrlreg].local for ctrlreg in op.ctrllist]
                 qstates = target_lane.qstates # lane.qstate must be the same for all control and target lanes.
                 rop = ControlledGate(qstates,
-                                     local_control_lanes, op.gate_type, op.adjoint, target_lane.local)
+                                     local_control_lanes, gate_type, op.adjoint, target_lane.local)
             # enqueue gate / controlled gate rop.
             self._rop_executor.enqueue(rop)
 
+        elif isinstance(op, model.MultiQubitGate) :
+            gate_type = op.gate_type
+            if model.has_parameters(gate_type) :
+                gate_type = model.bind_gate_type(gate_type, self._bindings)
+            lanes = self._qhandler.lanes
+            local_target_lanes = [lanes[qreg].local for qreg in op.qreglist]
+            local_control_lanes = None
+            if op.ctrllist is not None :
+                local_control_lanes = [lanes[ctrlreg].local for ctrlreg in op.ctrllist]
+            qstates = lanes[op.qreglist[0]].qstates # the same for all control and target lanes.
+            rop = MultiQubitGate(qstates, local_control_lanes, gate_type, op.adjoint,
+                                 local_target_lanes)
+            # enqueue multi qubit gate rop.
+            self._rop_executor.enqueue(rop)
+
         elif isinstance(op, model.Reset) :
             # FIXME: qregset
             lane = self._qhandler.lanes[op.qreg]
@@ -2,6 +2,7 @@ import numpy as np
 from . import qubits
 from . import glue
 from . import native_sampling_pool
+from .runtime_operator import gate_record
 
 class NativeQubitProcessor :
 
@@ -31,6 +32,10 @@ class NativeQubitProcessor :
         glue.qubit_processor_reset_qubit_states(self.ptr, qstates.ptr)
         qstates.reset_lane_states()
         
+    def set_states(self, qstates, values) :
+        # values should be contiguous.
+        glue.qubit_processor_set_states(self.ptr, qstates.ptr, values)
+
     def calc_probability(self, qstates, local_lane) :
         return glue.qubit_processor_calc_probability(self.ptr, qstates.ptr, local_lane)
     
@@ -57,3 +62,38 @@ class NativeQubitProcessor :
                               qstates, local_control_lanes, local_target_lane) :
         glue.qubit_processor_apply_controlled_gate(self.ptr, gate_type, _adjoint, qstates.ptr,
                                                    local_control_lanes, local_target_lane)
+
+    def apply_multi_qubit_gate(self, gate_type, _adjoint,
+                               qstates, local_control_lanes, local_target_lanes) :
+        mat = gate_type.pymat()
+        if _adjoint :
+            mat = np.conjugate(mat.T)
+        self.apply_multi_qubit_matrix(mat, qstates, local_control_lanes, local_target_lanes)
+
+    def apply_multi_qubit_matrix(self, mat, qstates, local_control_lanes, local_target_lanes) :
+        mat = np.ascontiguousarray(mat, np.complex128)
+        if local_control_lanes is None :
+            local_control_lanes = []
+        glue.qubit_processor_apply_multi_qubit_gate(self.ptr, mat, qstates.ptr,
+                                                    local_control_lanes, local_target_lanes)
+
+    def apply_diagonal_gate(self, phases, qstates, local_target_lanes) :
+        phases = np.ascontiguousarray(phases, np.complex128)
+        glue.qubit_processor_apply_diagonal_gate(self.ptr, phases, qstates.ptr, local_target_lanes)
+
+    def apply_gates(self, gates, qstates) :
+        records = np.empty([len(gates)], gate_record)
+        for idx, (gate_type, _adjoint, local_control_lanes, local_target_lane) in enumerate(gates) :
+            mat = gate_type.pymat()
+            if _adjoint :
+                mat = np.conjugate(mat.T)
+            control_mask = 0
+            if local_control_lanes is not None :
+                for lane in local_control_lanes :
+                    control_mask |= 1 << lane
+            records[idx] = (mat, control_mask, local_target_lane)
+        self.apply_gate_records(records, qstates)
+
+    def apply_gate_records(self, records, qstates) :
+        # records: array of gate_record with pre-built matrices.
+        glue.qubit_processor_apply_gates(self.ptr, records, qstates.ptr)
@@ -35,6 +35,13 @@ class NativeQubitsStatesGetter :
                                 lanepos_array_list, empty_lane_mask, qstates_ptrs, n_qregs,
                                 n_states, start, step)
         
+    def calc_pauli_expectations(self, qstates, x_mask, z_masks) :
+        z_masks = np.asarray(z_masks, np.int64)
+        values = np.empty([len(z_masks)], np.complex128)
+        glue.qubits_states_getter_calc_pauli_expectations(self.ptr, values, qstates.ptr,
+                                                          x_mask, z_masks)
+        return values
+
     def _create_sampling_pool(self, qreg_ordering,
                               n_lanes, n_hidden_lanes, lane_trans, empty_lanes,
                               hidden_lane_in_msb,
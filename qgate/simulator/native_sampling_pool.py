@@ -1,8 +1,12 @@
 import numpy as np
 from . import glue
 from . import observation
+from .random_numbers import RandomNumbers
 
 class NativeSamplingPool :
+    # replaced with random numbers of simulator in Qubits.create_sampling_pool().
+    random_numbers = RandomNumbers()
+
     def __init__(self, ptr, qreg_ordering, mask) :
         self.ptr = ptr
         self.qreg_ordering = qreg_ordering
@@ -19,6 +23,6 @@ class NativeSamplingPool :
     def sample(self, n_samples, randnum = None) :
         obs = np.empty([n_samples], np.int64)
         if randnum is None :
-            randnum = np.random.random_sample([n_samples])
+            randnum = self.random_numbers.random_sample(n_samples)
         glue.sampling_pool_sample(self.ptr, obs, n_samples, randnum)
         return observation.ObservationList(self.qreg_ordering, obs, self.mask)
@@ -0,0 +1,436 @@
+import qgate.model as model
+import numpy as np
+from .runtime_operator import gate_record
+
+
+def _gate_matrix(gate_type, adjoint) :
+    mat = gate_type.pymat()
+    if adjoint :
+        mat = np.conjugate(mat.T)
+    return mat
+
+
+class Plan :
+    """ circuit compiled by Simulator.compile().
+    A plan has a flat list of instructions whose qubit states and lanes are resolved and
+    whose gate matrices are pre-built.  Plans are immutable, and are executed by Simulator.run()
+    any number of times.  Matrices of gates with parameters are built by bind().
+    """
+    def __init__(self, instructions, n_slots, layout, refset, stats, parametric = ()) :
+        self._instructions = tuple(instructions)
+        self._n_slots = n_slots
+        self._layout = tuple(layout)
+        self._refset = frozenset(refset)
+        self._stats = dict(stats)
+        # tuple of (instruction index, record index or None, gate type, adjoint)
+        self._parametric = tuple(parametric)
+
+    @property
+    def instructions(self) :
+        return self._instructions
+
+    @property
+    def n_slots(self) :
+        """ number of qubit states slots used by instructions. """
+        return self._n_slots
+
+    @property
+    def layout(self) :
+        """ tuple of (qreg, slot, local lane) after executing a plan. """
+        return self._layout
+
+    @property
+    def refset(self) :
+        return self._refset
+
+    @property
+    def stats(self) :
+        return dict(self._stats)
+
+    @property
+    def parameters(self) :
+        """ set of parameters to be bound. """
+        params = set()
+        for _, _, gate_type, _ in self._parametric :
+            for arg in gate_type.args :
+                if isinstance(arg, model.ParameterExpression) :
+                    params.add(arg.parameter)
+        return params
+
+    def __len__(self) :
+        return len(self._instructions)
+
+    def bind(self, bindings) :
+        """ returns a plan whose gate matrices are built with values given by bindings.
+        Only instructions of gates with parameters are updated.
+        """
+        if len(self._parametric) == 0 :
+            return self
+        instructions = list(self._instructions)
+        copied = set()
+        for idx, record_idx, gate_type, adjoint in self._parametric :
+            mat = _gate_matrix(model.bind_gate_type(gate_type, bindings), adjoint)
+            method, args = instructions[idx]
+            if record_idx is None :
+                # multi qubit gate, (slot, mat, control lanes, target lanes)
+                args = (args[0], np.ascontiguousarray(mat, np.complex128)) + args[2:]
+            else :
+                # gate records, (slot, records)
+                if not idx in copied :
+                    args = (args[0], args[1].copy())
+                    copied.add(idx)
+                args[1][record_idx]['mat'] = mat
+            instructions[idx] = (method, args)
+        return Plan(instructions, self._n_slots, self._layout, self._refset, self._stats)
+
+    def batch_matrices(self, bindings_list) :
+        """ returns a dict of matrices of gates with parameters for a batch of bindings.
+        Keys are (instruction index, record index or None), and values are arrays of (batch, d, d).
+        """
+        batch_mats = dict()
+        for idx, record_idx, gate_type, adjoint in self._parametric :
+            mats = [_gate_matrix(model.bind_gate_type(gate_type, bindings), adjoint)
+                    for bindings in bindings_list]
+            batch_mats[(idx, record_idx)] = np.array(mats, np.complex128)
+        return batch_mats
+
+
+class PlanExecutor :
+    """ executes instructions of plans.
+    Instructions are tuples of (PlanExecutor method, args).  Qubit states are held in slots
+    given by compile, and lanes are updated only when a plan finishes.
+    """
+    def __init__(self, qubits_handler, value_store) :
+        self._qhandler = qubits_handler
+        self._value_store = value_store
+        self._slots = None
+
+    def run(self, plan, random_numbers) :
+        self._slots = [None] * plan.n_slots
+        self._random_numbers = random_numbers
+        instructions = plan.instructions
+        n_instructions = len(instructions)
+        pc = 0
+        while pc < n_instructions :
+            method, args = instructions[pc]
+            pc += 1
+            n_skips = method(self, *args)
+            if n_skips is not None :
+                pc += n_skips
+
+        lanes = self._qhandler.lanes
+        for qreg, slot, local in plan.layout :
+            lanes.add_lane(qreg, self._slots[slot], local)
+        self._slots = None
+
+    def _allocate(self, slot, n_lanes) :
+        qstates = self._qhandler.allocate_qubit_states(n_lanes)
+        self._slots[slot] = qstates
+        return qstates
+
+    def _release(self, slot) :
+        qstates = self._slots[slot]
+        self._qhandler.release_qubit_states(qstates)
+        self._slots[slot] = None
+        return qstates
+
+    def new_qubit_states(self, slot, n_lanes) :
+        qstates = self._allocate(slot, n_lanes)
+        qstates.processor.reset_qubit_states(qstates)
+
+    def join(self, slot, src_slots, n_lanes, n_new_qregs, lane_states) :
+        qslist = [self._release(src) for src in src_slots]
+        joined = self._allocate(slot, n_lanes)
+        joined.processor.join(joined, qslist, n_new_qregs)
+        # lane_states: list of (local lane, index in src_slots, local lane in src).
+        for local, idx, src_local in lane_states :
+            joined.set_lane_state(local, qslist[idx].get_lane_state(src_local))
+
+    def release_qreg(self, slot) :
+        qstates = self._slots[slot]
+        if qstates.get_lane_state(0) == -1 :
+            raise RuntimeError('qreg/lane is not measured.')
+        self._release(slot)
+
+    def _measure(self, outref, qstates, local) :
+        prob = qstates.processor.calc_probability(qstates, local)
+        result = 0 if self._random_numbers.random() < prob else 1
+        self._value_store.set(outref, result)
+        qstates.set_lane_state(local, result)
+        return result, prob
+
+    def measure(self, outref, slot, local) :
+        qstates = self._slots[slot]
+        result, prob = self._measure(outref, qstates, local)
+        qstates.processor.decohere(result, prob, qstates, local)
+
+    def measure_and_separate(self, outref, slot, local, slot0, slot1, lane_states) :
+        qstates = self._slots[slot]
+        result, prob = self._measure(outref, qstates, local)
+        self._release(slot)
+        qstates0 = self._allocate(slot0, qstates.get_n_lanes() - 1)
+        qstates1 = self._allocate(slot1, 1)
+        qstates.processor.decohere_and_separate(result, prob,
+                                                qstates0, qstates1, qstates, local)
+        # lane_states: list of (local lane in qstates0, local lane in qstates).
+        for local0, src_local in lane_states :
+            qstates0.set_lane_state(local0, qstates.get_lane_state(src_local))
+        qstates1.set_lane_state(0, result)
+
+    def prob(self, outref, slot, local) :
+        qstates = self._slots[slot]
+        self._value_store.set(outref, qstates.processor.calc_probability(qstates, local))
+
+    def reset(self, slot, local) :
+        qstates = self._slots[slot]
+        bitval = qstates.get_lane_state(local)
+        if bitval == -1 :
+            raise RuntimeError('Qubit is not measured.')
+        if bitval == 1 :
+            qstates.processor.apply_reset(qstates, local)
+            qstates.set_lane_state(local, -1)
+
+    def apply_gates(self, slot, records) :
+        qstates = self._slots[slot]
+        qstates.processor.apply_gate_records(records, qstates)
+
+    def apply_multi_qubit_gate(self, slot, mat, local_control_lanes, local_target_lanes) :
+        qstates = self._slots[slot]
+        qstates.processor.apply_multi_qubit_matrix(mat, qstates,
+                                                   local_control_lanes, local_target_lanes)
+
+    def apply_diagonal_gate(self, slot, phases, local_target_lanes) :
+        qstates = self._slots[slot]
+        qstates.processor.apply_diagonal_gate(phases, qstates, local_target_lanes)
+
+    def if_clause(self, refs, cond, n_clause_instructions) :
+        # returns the number of instructions to skip.
+        if callable(cond) :
+            taken = cond(*self._value_store.get(refs))
+        else :
+            taken = self._value_store.get_packed_value(refs) == cond
+        return None if taken else n_clause_instructions
+
+
+class PlanCompiler :
+    """ compiles preprocessed ops to a plan.
+    Layout of qubit states is traced while compiling, thus ops are translated to instructions
+    with slots of qubit states and local lanes.  NewQreg and Join in if clauses are moved
+    before if clauses, and measurements in if clauses do not separate qubit states, so that
+    the layout does not depend on evaluated conditions.
+    """
+    def __init__(self) :
+        # key: qreg, value: [slot, local lane]
+        self._lanes = dict()
+        # key: slot, value: number of lanes.
+        self._n_lanes = dict()
+        self._n_slots = 0
+        # pending gates, [instruction list, slot, list of gate records, list of parametric gates]
+        self._gates = None
+        self._parametric = list()
+
+    def compile(self, ops, refset, stats) :
+        instructions = list()
+        self._compile_ops(instructions, ops, False)
+        self._flush_gates()
+        layout = [(qreg, slot, local) for qreg, (slot, local) in self._lanes.items()]
+        return Plan(instructions, self._n_slots, layout, refset, stats, self._parametric)
+
+    def _new_slot(self, n_lanes) :
+        slot = self._n_slots
+        self._n_slots += 1
+        self._n_lanes[slot] = n_lanes
+        return slot
+
+    def _emit(self, instructions, method, *args) :
+        self._flush_gates()
+        instructions.append((method, args))
+
+    def _flush_gates(self) :
+        if self._gates is None :
+            return
+        instructions, slot, records, parametric = self._gates
+        self._gates = None
+        for record_idx, gate_type, adjoint in parametric :
+            self._parametric.append((len(instructions), record_idx, gate_type, adjoint))
+        instructions.append((PlanExecutor.apply_gates,
+                             (slot, np.array(records, dtype = gate_record))))
+
+    def _add_qreg(self, instructions, qreg) :
+        slot = self._new_slot(1)
+        self._lanes[qreg] = [slot, 0]
+        self._emit(instructions, PlanExecutor.new_qubit_states, slot, 1)
+
+    def _join(self, instructions, qreglist) :
+        # the same layout as QubitsHandler.join().
+        slotmap = dict()
+        new_qregs = list()
+        for qreg in qreglist :
+            if qreg in self._lanes :
+                slot = self._lanes[qreg][0]
+                slotmap.setdefault(slot, list()).append(qreg)
+            elif not qreg in new_qregs :
+                new_qregs.append(qreg)
+
+        if len(slotmap) == 0 :
+            slot = self._new_slot(len(new_qregs))
+            for local, qreg in enumerate(new_qregs) :
+                self._lanes[qreg] = [slot, local]
+            self._emit(instructions, PlanExecutor.new_qubit_states, slot, len(new_qregs))
+            return
+        if len(slotmap) == 1 and len(new_qregs) == 0 :
+            # already joined.
+            return
+
+        src_slots = sorted(slotmap.keys(), key = lambda slot : self._n_lanes[slot])
+        n_lanes = sum([self._n_lanes[src] for src in src_slots]) + len(new_qregs)
+        slot = self._new_slot(n_lanes)
+        lane_states = list()
+        lane_offset = 0
+        # the last qstates has lowest local lanes.
+        for idx in reversed(range(len(src_slots))) :
+            src = src_slots[idx]
+            for qreg in slotmap[src] :
+                src_local = self._lanes[qreg][1]
+                local = src_local + lane_offset
+                lane_states.append((local, idx, src_local))
+                self._lanes[qreg] = [slot, local]
+            lane_offset += len(slotmap[src])
+        for idx, qreg in enumerate(new_qregs) :
+            self._lanes[qreg] = [slot, lane_offset + idx]
+        for src in src_slots :
+            del self._n_lanes[src]
+
+        self._emit(instructions, PlanExecutor.join,
+                   slot, src_slots, n_lanes, len(new_qregs), lane_states)
+
+    def _separate(self, slot, local) :
+        # returns slots of separated qubit states and lane states to copy.
+        n_lanes = self._n_lanes.pop(slot)
+        slot0 = self._new_slot(n_lanes - 1)
+        slot1 = self._new_slot(1)
+        lane_states = list()
+        for qreg, lane in self._lanes.items() :
+            if lane[0] != slot :
+                continue
+            if lane[1] == local :
+                lane[0], lane[1] = slot1, 0
+                continue
+            local0 = lane[1] - 1 if local < lane[1] else lane[1]
+            lane_states.append((local0, lane[1]))
+            lane[0], lane[1] = slot0, local0
+        return slot0, slot1, lane_states
+
+    def _hoist_layout(self, instructions, ops) :
+        # apply layout changes in an if clause before the if clause.
+        for op in ops :
+            if isinstance(op, model.NewQreg) :
+                if not op.qreg in self._lanes :
+                    self._add_qreg(instructions, op.qreg)
+            elif isinstance(op, model.Join) :
+                self._join(instructions, op.qreglist)
+            elif isinstance(op, (model.Measure, model.Prob)) :
+                if not op.qreg in self._lanes :
+                    self._add_qreg(instructions, op.qreg)
+            elif isinstance(op, model.ReleaseQreg) :
+                raise RuntimeError('ReleaseQreg in if clauses is not supported in plans.')
+            elif isinstance(op, model.IfClause) :
+                self._hoist_layout(instructions, op.clause)
+
+    def _compile_ops(self, instructions, ops, in_clause) :
+        idx = 0
+        while idx < len(ops) :
+            op = ops[idx]
+            idx += 1
+            if isinstance(op, model.NewQreg) :
+                if not in_clause :
+                    self._add_qreg(instructions, op.qreg)
+            elif isinstance(op, model.Join) :
+                if not in_clause :
+                    self._join(instructions, op.qreglist)
+            elif isinstance(op, model.ReleaseQreg) :
+                slot, local = self._lanes.pop(op.qreg)
+                if self._n_lanes[slot] != 1 :
+                    raise RuntimeError('qreg/lane is not separated.')
+                del self._n_lanes[slot]
+                self._emit(instructions, PlanExecutor.release_qreg, slot)
+            elif isinstance(op, model.Measure) :
+                if not op.qreg in self._lanes :
+                    # target qreg does not exist.  It may happen if a qreg is used in a if clause.
+                    self._add_qreg(instructions, op.qreg)
+                slot, local = self._lanes[op.qreg]
+                separate = idx < len(ops) and isinstance(ops[idx], model.Separate)
+                if separate :
+                    idx += 1
+                if separate and not in_clause and self._n_lanes[slot] != 1 :
+                    slot0, slot1, lane_states = self._separate(slot, local)
+                    self._emit(instructions, PlanExecutor.measure_and_separate,
+                               op.outref, slot, local, slot0, slot1, lane_states)
+                else :
+                    self._emit(instructions, PlanExecutor.measure, op.outref, slot, local)
+            elif isinstance(op, model.Prob) :
+                slot, local = self._lanes[op.qreg]
+                self._emit(instructions, PlanExecutor.prob, op.outref, slot, local)
+            elif isinstance(op, model.Reset) :
+                slot, local = self._lanes[op.qreg]
+                self._emit(instructions, PlanExecutor.reset, slot, local)
+            elif isinstance(op, model.Gate) :
+                slot, target = self._lanes[op.qreg]
+                control_mask = 0
+                if op.ctrllist is not None :
+                    for ctrlreg in op.ctrllist :
+                        ctrl_slot, ctrl_local = self._lanes[ctrlreg]
+                        assert ctrl_slot == slot, 'control and target lanes are not joined.'
+                        control_mask |= 1 << ctrl_local
+                # successive gates on the same qubit states are applied at once.
+                if self._gates is None or self._gates[0] is not instructions \
+                   or self._gates[1] != slot :
+                    self._flush_gates()
+                    self._gates = [instructions, slot, list(), list()]
+                records = self._gates[2]
+                if model.has_parameters(op.gate_type) :
+                    # matrix is built when bound.
+                    self._gates[3].append((len(records), op.gate_type, op.adjoint))
+                    mat = np.identity(2, np.complex128)
+                else :
+                    mat = _gate_matrix(op.gate_type, op.adjoint)
+                records.append((mat, control_mask, target))
+            elif isinstance(op, model.MultiQubitGate) :
+                slot = self._lanes[op.qreglist[0]][0]
+                target_lanes = [self._lanes[qreg][1] for qreg in op.qreglist]
+                control_lanes = None
+                if op.ctrllist is not None :
+                    control_lanes = [self._lanes[ctrlreg][1] for ctrlreg in op.ctrllist]
+                self._flush_gates()
+                if isinstance(op.gate_type, model.gate_type.DIAGN) :
+                    phases, = op.gate_type.args
+                    if op.adjoint :
+                        phases = np.conjugate(phases)
+                    self._emit(instructions, PlanExecutor.apply_diagonal_gate,
+                               slot, np.ascontiguousarray(phases, np.complex128), target_lanes)
+                    continue
+                if model.has_parameters(op.gate_type) :
+                    # matrix is built when bound.
+                    self._parametric.append((len(instructions), None, op.gate_type, op.adjoint))
+                    mat = None
+                else :
+                    mat = np.ascontiguousarray(_gate_matrix(op.gate_type, op.adjoint), np.complex128)
+                self._emit(instructions, PlanExecutor.apply_multi_qubit_gate,
+                           slot, mat, control_lanes, target_lanes)
+            elif isinstance(op, model.IfClause) :
+                self._flush_gates()
+                self._hoist_layout(instructions, op.clause)
+                # if_clause instruction is given after the clause is compiled.
+                if_idx = len(instructions)
+                instructions.append(None)
+                self._compile_ops(instructions, op.clause, True)
+                self._flush_gates()
+                n_clause_instructions = len(instructions) - if_idx - 1
+                instructions[if_idx] = (PlanExecutor.if_clause,
+                                        (op.refs, op.cond, n_clause_instructions))
+            elif isinstance(op, (model.Separate, model.Barrier,
+                                 model.ClauseBegin, model.ClauseEnd)) :
+                # no effects, instructions are executed synchronously.
+                pass
+            else :
+                assert False, 'Unknown operator, {}.'.format(repr(op))
@@ -147,3 +147,31 @@ def SH_mat(self) :
     return SH_mat.mat
 SH_mat.mat = math.sqrt(0.5) * np.array([[1., 1.], [1.j, -1.j]], np.complex128)
 _attach(gtype.SH, SH_mat)
+
+# fused gate
+def MAT_mat(self) :
+    mat,  = self.args
+    return mat
+_attach(gtype.MAT, MAT_mat)
+
+# multi qubit gates, the i-th qreg corresponds to the i-th bit of row/column indices.
+def SWAP_mat(self) :
+    return SWAP_mat.mat
+SWAP_mat.mat = np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]], np.complex128)
+_attach(gtype.SWAP, SWAP_mat)
+
+def MATN_mat(self) :
+    mat,  = self.args
+    return mat
+_attach(gtype.MATN, MATN_mat)
+
+def DIAGN_mat(self) :
+    phases,  = self.args
+    return np.diag(phases)
+_attach(gtype.DIAGN, DIAGN_mat)
+
+def ExpiN_mat(self) :
+    # exp(i theta P) = cos(theta) I + i sin(theta) P
+    theta, pauli = self.args
+    return math.cos(theta) * np.identity(pauli.shape[0], np.complex128) + 1.j * math.sin(theta) * pauli
+_attach(gtype.ExpiN, ExpiN_mat)
@@ -2,6 +2,7 @@ import numpy as np
 import math
 from . import qubits
 from . import observation
+from .random_numbers import RandomNumbers
 
 def adjoint(mat) :
     return np.conjugate(mat.T)
@@ -40,6 +41,49 @@ class QubitStates :
         self.states[key] = value
 
 
+def _lane_view(qstates, local_lane) :
+    # view state vector as (hi, 2, lo), the middle axis is for the given lane.
+    n_lanes = qstates.get_n_lanes()
+    return qstates.states.reshape(1 << (n_lanes - local_lane - 1), 2, 1 << local_lane)
+
+def _controlled_lane_view(qstates, local_control_lanes, local_target_lane) :
+    # view state vector as a tensor of (2, 2, ..., 2), and select states whose control bits are 1.
+    # The first axis of the returned view is for the target lane.
+    n_lanes = qstates.get_n_lanes()
+    tensor = qstates.states.reshape([2] * n_lanes)
+    key = [slice(None)] * n_lanes
+    for lane in local_control_lanes :
+        key[n_lanes - lane - 1] = 1
+    # axis for target lane is placed in the middle.
+    target_axis = n_lanes - local_target_lane - 1
+    key[target_axis] = slice(None)
+    view = tensor[tuple(key)]
+    # number of axes removed by control lanes before target axis.
+    n_removed = sum([1 for lane in local_control_lanes if local_target_lane < lane])
+    return np.moveaxis(view, target_axis - n_removed, 0)
+
+def _multi_lane_view(qstates, local_control_lanes, local_target_lanes) :
+    # view state vector as a tensor of (2, 2, ..., 2), and select states whose control bits are 1.
+    # The first k axes of the returned view are for target lanes in the reversed order,
+    # thus the first axis corresponds to the most significant bit of matrix indices.
+    n_lanes = qstates.get_n_lanes()
+    tensor = qstates.states.reshape([2] * n_lanes)
+    key = [slice(None)] * n_lanes
+    for lane in local_control_lanes :
+        key[n_lanes - lane - 1] = 1
+    view = tensor[tuple(key)]
+    # lanes of remaining axes.
+    axis_lanes = [lane for lane in reversed(range(n_lanes)) if not lane in local_control_lanes]
+    target_axes = [axis_lanes.index(lane) for lane in reversed(local_target_lanes)]
+    return np.moveaxis(view, target_axes, list(range(len(target_axes))))
+
+def _apply_matrix(mat, qs0, qs1) :
+    qsout0 = mat[0, 0] * qs0 + mat[0, 1] * qs1
+    qsout1 = mat[1, 0] * qs0 + mat[1, 1] * qs1
+    qs0[...] = qsout0
+    qs1[...] = qsout1
+
+
 class PyQubitProcessor :
 
     def synchronize(self) :
@@ -57,19 +101,12 @@ class PyQubitProcessor :
         qstates.states[0] = 1
         qstates.reset_lane_states()
         
-    def calc_probability(self, qstates, local_lane) :
+    def set_states(self, qstates, values) :
+        qstates.states[:] = values
 
-        bitmask_lane = 1 << local_lane
-        bitmask_hi = ~((2 << local_lane) - 1)
-        bitmask_lo = (1 << local_lane) - 1
-        n_loops = 2 ** (qstates.get_n_lanes() - 1)
-        prob = 0.
-        for idx in range(n_loops) :
-            idx_lo = ((idx << 1) & bitmask_hi) | (idx & bitmask_lo)
-            qs = qstates[idx_lo]
-            prob += (qs * qs.conj()).real
-
-        return prob
+    def calc_probability(self, qstates, local_lane) :
+        qs = _lane_view(qstates, local_lane)[:, 0, :]
+        return np.sum(qs.real ** 2 + qs.imag ** 2)
 
     def join(self, qstates, qstates_list, n_new_qregs) :
         it = iter(qstates_list)
@@ -87,125 +124,103 @@ class PyQubitProcessor :
         qstates.states[len_vec:] = 0.
 
     def decohere(self, value, prob, qstates, local_lane) :
-
-        bitmask_lane = 1 << local_lane
-        bitmask_hi = ~((2 << local_lane) - 1)
-        bitmask_lo = (1 << local_lane) - 1
-        n_loops = 2 ** (qstates.get_n_lanes() - 1)
-
+        view = _lane_view(qstates, local_lane)
         if (value == 0) :
             norm = 1. / math.sqrt(prob)
-            for idx in range(n_loops) :
-                idx_lo = ((idx << 1) & bitmask_hi) | (idx & bitmask_lo)
-                idx_hi = idx_lo | bitmask_lane
-                qstates[idx_lo] *= norm
-                qstates[idx_hi] = 0.
+            view[:, 0, :] *= norm
+            view[:, 1, :] = 0.
         else :  # value == 1
             norm = 1. / math.sqrt(1. - prob)
-            for idx in range(n_loops) :
-                idx_lo = ((idx << 1) & bitmask_hi) | (idx & bitmask_lo)
-                idx_hi = idx_lo | bitmask_lane
-                qstates[idx_lo] = 0.
-                qstates[idx_hi] *= norm
+            view[:, 0, :] = 0.
+            view[:, 1, :] *= norm
 
         return value
     
     def decohere_and_separate(self, value, prob, qstates0, qstates1, qstates, local_lane) :
-
-        bitmask_lane = 1 << local_lane
-        bitmask_hi = ~((2 << local_lane) - 1)
-        bitmask_lo = (1 << local_lane) - 1
-        n_loops = 2 ** (qstates.get_n_lanes() - 1)
+        view = _lane_view(qstates, local_lane)
+        dst = qstates0.states.reshape(view.shape[0], view.shape[2])
 
         if value == 0 :
             norm = 1. / math.sqrt(prob)
-            for idx in range(n_loops) :
-                idx_lo = ((idx << 1) & bitmask_hi) | (idx & bitmask_lo)
-                qstates0[idx] = norm * qstates[idx_lo]
+            dst[...] = norm * view[:, 0, :]
             qstates1[0] = 1.
             qstates1[1] = 0.
         else :
             norm = 1. / math.sqrt(1. - prob)
-            for idx in range(n_loops) :
-                idx_lo = ((idx << 1) & bitmask_hi) | (idx & bitmask_lo)
-                idx_hi = idx_lo | bitmask_lane
-                qstates0[idx] = norm * qstates[idx_hi]
+            dst[...] = norm * view[:, 1, :]
             qstates1[0] = 0.
             qstates1[1] = 1.
 
         return value
 
     def apply_reset(self, qstates, local_lane) :
-
-        bitmask_lane = 1 << local_lane
-        bitmask_hi = ~((2 << local_lane) - 1)
-        bitmask_lo = (1 << local_lane) - 1
-        n_loops = 2 ** (qstates.get_n_lanes() - 1)
-
-        for idx in range(n_loops) :
-            idx_lo = ((idx << 1) & bitmask_hi) | (idx & bitmask_lo)
-            idx_hi = idx_lo | bitmask_lane
-            qstates[idx_lo] = qstates[idx_hi]
-            qstates[idx_hi] = 0.
-
+        view = _lane_view(qstates, local_lane)
+        view[:, 0, :] = view[:, 1, :]
+        view[:, 1, :] = 0.
 
     def apply_gate(self, gate_type, _adjoint, qstates, local_lane) :
         mat = gate_type.pymat()
         if _adjoint :
             mat = adjoint(mat)
-        
-        bitmask_lane = 1 << local_lane
-        bitmask_hi = ~((2 << local_lane) - 1)
-        bitmask_lo = (1 << local_lane) - 1
-        n_loops = 2 ** (qstates.get_n_lanes() - 1)
-        for idx in range(n_loops) :
-            idx_lo = ((idx << 1) & bitmask_hi) | (idx & bitmask_lo)
-            idx_hi = idx_lo | bitmask_lane
-            qs0 = qstates[idx_lo]
-            qs1 = qstates[idx_hi]
-            qsout = np.matmul(mat, np.array([qs0, qs1], np.complex128).T)
-            qstates[idx_lo] = qsout[0]
-            qstates[idx_hi] = qsout[1]
+
+        view = _lane_view(qstates, local_lane)
+        _apply_matrix(mat, view[:, 0, :], view[:, 1, :])
 
     def apply_controlled_gate(self, gate_type, _adjoint,
                               qstates, local_control_lanes, local_target_lane) :
         mat = gate_type.pymat()
         if _adjoint :
             mat = adjoint(mat)
-            
-        # create control bit mask
-        bits = [1 << lane for lane in local_control_lanes]
-        control_mask = 0
-        for bit in bits : # bits stores control bits.
-            control_mask |= bit
-        
-        # target bit
-        target_bit = 1 << local_target_lane
-        bits.append(target_bit)
-        bits = sorted(bits)
 
-        mask = bits[0] - 1
-        masks = [ mask ]
-        for idx in range(len(bits) - 1) :
-            mask = (bits[idx + 1] - 1) & (~(bits[idx] * 2 - 1))
-            masks.append(mask)
-        mask = ~(bits[-1] * 2 - 1)
-        masks.append(mask)
+        view = _controlled_lane_view(qstates, local_control_lanes, local_target_lane)
+        _apply_matrix(mat, view[0, ...], view[1, ...])
 
-        n_loops = 1 << (qstates.get_n_lanes() - len(bits))
-        n_shifts = len(bits) + 1
-        for idx in range(n_loops) :
-            idx_0 = 0
-            for shift in range(n_shifts) :
-                idx_0 |= (idx << shift) & masks[shift]
-            idx_0 |= control_mask
-            idx_1 = idx_0 | target_bit
- 
-            qs0 = qstates[idx_0]
-            qs1 = qstates[idx_1]
-            qsout = np.matmul(mat, np.array([qs0, qs1], np.complex128).T)
-            qstates[idx_0] = qsout[0]
-            qstates[idx_1] = qsout[1]
+    def apply_multi_qubit_gate(self, gate_type, _adjoint,
+                               qstates, local_control_lanes, local_target_lanes) :
+        mat = gate_type.pymat()
+        if _adjoint :
+            mat = adjoint(mat)
+        self.apply_multi_qubit_matrix(mat, qstates, local_control_lanes, local_target_lanes)
+
+    def apply_multi_qubit_matrix(self, mat, qstates, local_control_lanes, local_target_lanes) :
+        if local_control_lanes is None :
+            local_control_lanes = []
+
+        n_targets = len(local_target_lanes)
+        view = _multi_lane_view(qstates, local_control_lanes, local_target_lanes)
+        tensor = mat.reshape([2] * (2 * n_targets))
+        view[...] = np.tensordot(tensor, view,
+                                 axes = (list(range(n_targets, 2 * n_targets)), list(range(n_targets))))
+
+    def apply_diagonal_gate(self, phases, qstates, local_target_lanes) :
+        # the i-th target lane corresponds to the i-th bit of indices of phases.
+        n_lanes = qstates.get_n_lanes()
+        n_targets = len(local_target_lanes)
+        tensor = qstates.states.reshape([2] * n_lanes)
+        axes = [n_lanes - lane - 1 for lane in reversed(local_target_lanes)]
+        view = np.moveaxis(tensor, axes, list(range(n_targets)))
+        view *= phases.reshape([2] * n_targets + [1] * (n_lanes - n_targets))
+
+    def apply_gates(self, gates, qstates) :
+        for gate_type, _adjoint, local_control_lanes, local_target_lane in gates :
+            if local_control_lanes is None :
+                self.apply_gate(gate_type, _adjoint, qstates, local_target_lane)
+            else :
+                self.apply_controlled_gate(gate_type, _adjoint,
+                                           qstates, local_control_lanes, local_target_lane)
+
+    def apply_gate_records(self, records, qstates) :
+        # records: array of gate_record with pre-built matrices.
+        for mat, control_mask, local_target_lane in records :
+            control_mask = int(control_mask)
+            if control_mask == 0 :
+                view = _lane_view(qstates, int(local_target_lane))
+                _apply_matrix(mat, view[:, 0, :], view[:, 1, :])
+            else :
+                local_control_lanes = [lane for lane in range(control_mask.bit_length())
+                                       if (control_mask >> lane) & 1]
+                view = _controlled_lane_view(qstates, local_control_lanes, int(local_target_lane))
+                _apply_matrix(mat, view[0, ...], view[1, ...])
 
 
 class PyQubitsStatesGetter :
@@ -217,29 +232,20 @@ class PyQubitsStatesGetter :
         for empty_lane_pos in empty_lanes :
             empty_lane_mask |= 1 << empty_lane_pos
         
-        arranged = []
+        ext_idx = start + step * np.arange(n_states, dtype = np.int64)
+        vals = np.ones([n_states], values.dtype)
         for qstates, lanes in lane_trans :
-            lanebit_list = list()
+            # convert to local idx
+            local_idx = np.zeros([n_states], np.int64)
             for lane in lanes :
-                lanebit_list.append((1 << lane.external, 1 << lane.local))
-            arranged.append((qstates, lanebit_list))
+                local_idx |= ((ext_idx >> lane.external) & 1) << lane.local
+            vals *= mathop(qstates.states[local_idx])
+        vals[(ext_idx & empty_lane_mask) != 0] = 0.
 
-        for idx in range(n_states) :
-            if idx & empty_lane_mask != 0 :
-                val = 0.
-            else :
-                val = 1.
-                for qstates, lanebit_list in arranged :
-                    ext_idx = start + step * idx
-                    # convert to local idx
-                    local_idx = 0
-                    for lane_bit in lanebit_list :
-                        if (lane_bit[0] & ext_idx) != 0 :
-                            local_idx |= lane_bit[1]
-                    state = qstates[local_idx]
-                    val *= mathop(state)
-                
-            values[array_offset + idx] = val
+        values[array_offset : array_offset + n_states] = vals
+
+    def calc_pauli_expectations(self, qstates, x_mask, z_masks) :
+        return qubits.pauli_expectations(qstates.states, x_mask, z_masks)
 
     def create_sampling_pool(self, qreg_ordering,
                              n_lanes, n_hidden_lanes, lane_trans, empty_lanes,
@@ -276,6 +282,9 @@ class PyQubitsStatesGetter :
 
 
 class PySamplingPool :
+    # replaced with random numbers of simulator in Qubits.create_sampling_pool().
+    random_numbers = RandomNumbers()
+
     def __init__(self, prob, empty_lanes, qreg_ordering) :
         self.cumprob = np.cumsum(prob)
         norm = 1. / self.cumprob[-1]
@@ -292,7 +301,7 @@ class PySamplingPool :
         # cprobs *= norm
         obs = np.empty([n_samples], dtype = np.int64)
         if randnum is None :
-            randnum = np.random.random_sample([n_samples])
+            randnum = self.random_numbers.random_sample(n_samples)
         obs = np.searchsorted(self.cumprob, randnum, side = 'right')
         if self.mask != 0 :
             self.shift_for_empty_lanes(obs)
@@ -321,6 +330,9 @@ class PySamplingPool :
             obs[idx] = v_shifted
 
 
+# runtime has multi qubit gate operations.
+multi_qubit_gate = True
+
 def create_qubit_states(dtype) :
     return QubitStates(PyQubitProcessor())
 
@@ -1,6 +1,8 @@
 import numpy as np
 from . import lanes
 from . import empty_sampling_pool
+from .random_numbers import RandomNumbers
+from qgate.model.bitops import parity
 
 # math operations
 def null(v) :
@@ -9,6 +11,47 @@ def abs2(v) :
     return v.real ** 2 + v.imag ** 2
 prob = abs2
 
+
+def pauli_expectations(states, x_mask, z_masks) :
+    """ returns sums of conj(states[idx ^ x_mask]) * states[idx] * (-1)^popcount(idx & z_mask)
+    for z_masks.  Terms sharing x_mask are calculated from one product array. """
+    idx = np.arange(len(states), dtype = np.int64)
+    products = (np.conjugate(states[idx ^ x_mask]) * states).astype(np.complex128)
+    values = np.empty([len(z_masks)], np.complex128)
+    for term_idx, z_mask in enumerate(z_masks) :
+        signs = 1 - 2 * parity(idx & z_mask)
+        values[term_idx] = np.dot(signs, products)
+    return values
+
+def _pauli_operators(term) :
+    # returns (phase, ops), the term is i^phase * prod(X^x Z^z), ops is { qreg : [x, z] }.
+    from qgate.model import Gate
+    import qgate.model.gate_type as gtype
+    if isinstance(term, Gate) :
+        term = [term]
+    phase, ops = 0, dict()
+    # gates are applied in order, so the operator is g[n-1] ... g[1] g[0].
+    for gate in term :
+        if not isinstance(gate, Gate) or \
+           not isinstance(gate.gate_type, (gtype.ID, gtype.X, gtype.Y, gtype.Z)) :
+            raise RuntimeError('pauli terms only accept ID, X, Y and Z gates, but {} passed.'.format(repr(gate)))
+        if gate.ctrllist is not None :
+            raise RuntimeError('control qreg(s) should not be set for pauli operators.')
+        x, z = ops.get(gate.qreg, (0, 0))
+        if isinstance(gate.gate_type, gtype.X) :
+            x ^= 1
+        elif isinstance(gate.gate_type, gtype.Z) :
+            # Z X^x Z^z = (-1)^x X^x Z^(z+1)
+            phase += 2 * x
+            z ^= 1
+        elif isinstance(gate.gate_type, gtype.Y) :
+            # Y = iXZ, Y X^x Z^z = i (-1)^x X^(x+1) Z^(z+1)
+            phase += 1 + 2 * x
+            x ^= 1
+            z ^= 1
+        ops[gate.qreg] = (x, z)
+    return phase % 4, ops
+
         
 # FIXME: implement __iter__ method.
 class StateGetter :
@@ -41,6 +84,8 @@ class Qubits :
         self._ordering = list()
         self.lanes = lanes.Lanes()
         self.qstates_list = list()
+        # random numbers for sampling pools, given by simulator.
+        self.random_numbers = RandomNumbers()
 
     def __del__(self) :
         self.qstates_list = None
@@ -64,6 +109,11 @@ class Qubits :
     def ordering(self) :
         return self._ordering
 
+    @property
+    def given_ordering(self) :
+        # qreglist given by set_ordering(), or None if not given.
+        return self._given_ordering
+
     def set_ordering(self, qreglist) :
         self._given_ordering = qreglist
         self.update_external_layout()
@@ -87,6 +137,7 @@ class Qubits :
         remaining = sorted(list(qregset), key = lambda qreg:qreg.id)
         # add remainings
         self._ordering = qreglist + remaining
+        self.lanes.set_external_layout(self._ordering)
 
     def calc_probability(self, qreg) :
         from qgate.model import Qreg
@@ -96,6 +147,37 @@ class Qubits :
         lane = self.lanes[qreg]
         return lane.qstates.calc_probability(lane.local)
 
+    def expectation(self, pauli_terms) :
+        """ returns an array of expectation values, <psi|P|psi>, for pauli terms.
+        A pauli term is a list of ID, X, Y and Z gates, or a single gate, as accepted by
+        PauliProb.  Expectation values are calculated from state vectors without modifying them,
+        and terms sharing bit flips (X and Y) in a qubit states are calculated in one pass. """
+        # key: (qstates, x_mask), value: list of (term_idx, z_mask)
+        groups = dict()
+        factors = np.ones([len(pauli_terms)], np.complex128)
+        for term_idx, term in enumerate(pauli_terms) :
+            phase, ops = _pauli_operators(term)
+            factors[term_idx] = 1j ** phase
+            masks = dict()
+            for qreg, (x, z) in ops.items() :
+                lane = self.lanes.get(qreg, None)
+                if lane is None :
+                    # qregs not in lanes are in |0>, <0|Z|0> = 1.
+                    if x != 0 :
+                        factors[term_idx] = 0.
+                    continue
+                x_mask, z_mask = masks.get(lane.qstates, (0, 0))
+                masks[lane.qstates] = (x_mask | (x << lane.local), z_mask | (z << lane.local))
+            for qstates, (x_mask, z_mask) in masks.items() :
+                groups.setdefault((qstates, x_mask), list()).append((term_idx, z_mask))
+
+        for (qstates, x_mask), terms in groups.items() :
+            z_masks = [z_mask for _, z_mask in terms]
+            values = self.states_getter.calc_pauli_expectations(qstates, x_mask, z_masks)
+            for (term_idx, _), value in zip(terms, values) :
+                factors[term_idx] *= value
+        return factors.real
+
     def create_sampling_pool(self, qreg_ordering, sampling_pool_factory = None) :
         if len(set(qreg_ordering)) != len(qreg_ordering) :
             raise RuntimeError('qreg_ordering has duplicate qregs, {}.'.format(repr(qreg_ordering)))
@@ -120,9 +202,12 @@ class Qubits :
         n_pool_lanes = len(pool_ordering)
         n_hidden_lanes = len(self.lanes) - len(pool_ordering)
 
-        return self.states_getter.create_sampling_pool(qreg_ordering,
+        pool = self.states_getter.create_sampling_pool(qreg_ordering,
                                         n_pool_lanes, n_hidden_lanes, lane_trans, empty_lanes,
                                         sampling_pool_factory)
+        if hasattr(pool, 'random_numbers') :
+            pool.random_numbers = self.random_numbers
+        return pool
 
     def get_states(self, mathop = null, key = None) :
         if mathop == null :
@@ -139,7 +224,7 @@ class Qubits :
                 if not qreg in self.lanes :
                     empty_lanes.append(external_lane)
 
-        lane_trans = lanes.create_lane_transformation(self.lanes, self._ordering)
+        lane_trans = lanes.create_lane_transformation(self.lanes)
             
         n_states = 1 << self.get_n_qregs()
         if key is None :
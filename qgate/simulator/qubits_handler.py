@@ -1,3 +1,7 @@
+import numpy as np
+from . import lanes
+from . import qubits
+
 
 class QubitsHandler :
     def __init__(self, qubit_states_factory, qubits) :
@@ -11,20 +15,88 @@ class QubitsHandler :
     def lanes(self) :
         return self._qubits.lanes
     
-    def _allocate_qubit_states(self, n_lanes) :
-        # allocate qubit states
+    def allocate_qubit_states(self, n_lanes) :
+        # allocate qubit states, added to qstates_list.
         qstates = self._create_qubit_states(self._qubits.dtype)
         qstates.processor.initialize_qubit_states(qstates, n_lanes)
         self._qubits.qstates_list.append(qstates)
         return qstates
 
+    def release_qubit_states(self, qstates) :
+        # remove qubit states from qstates_list.
+        self._qubits.qstates_list.remove(qstates)
+
+    def _copy_qubit_states(self, qstates) :
+        n_lanes = qstates.get_n_lanes()
+        copied = self._create_qubit_states(self._qubits.dtype)
+        copied.processor.initialize_qubit_states(copied, n_lanes)
+        # join() with one qubit states copies it.
+        copied.processor.join(copied, [qstates], 0)
+        for lane in range(n_lanes) :
+            copied.set_lane_state(lane, qstates.get_lane_state(lane))
+        return copied
+
+    def snapshot(self) :
+        # copy qubit states and lanes.
+        qstates_list = self._qubits.qstates_list
+        copied = [self._copy_qubit_states(qstates) for qstates in qstates_list]
+        lanes = [(qreg, qstates_list.index(lane.qstates), lane.local)
+                 for qreg, lane in self.lanes.items()]
+        return copied, lanes
+
+    def restore(self, snapshot) :
+        # qubit states in snapshot are copied, thus a snapshot is able to be restored many times.
+        qstates_list, lanes = snapshot
+        self._qubits.reset()
+        for qstates in qstates_list :
+            self._qubits.qstates_list.append(self._copy_qubit_states(qstates))
+        for qreg, idx, local_lane in lanes :
+            self.lanes.add_lane(qreg, self._qubits.qstates_list[idx], local_lane)
+
+    def save(self, filename) :
+        # write qubit states to a numpy.memmap file.  Values are directly written to the file
+        # by states getters, and no in-memory copy is made.
+        qstates_list = self._qubits.qstates_list
+        dtype = np.complex64 if self._qubits.dtype == np.float32 else np.complex128
+        n_states = sum([1 << qstates.get_n_lanes() for qstates in qstates_list])
+        array = np.memmap(filename, dtype, 'w+', shape = (max(n_states, 1), ))
+        layouts = list()
+        offset = 0
+        for qstates in qstates_list :
+            n_lanes = qstates.get_n_lanes()
+            lane_trans = lanes.create_local_lane_transformation(qstates)
+            self._qubits.states_getter.get_states(array, offset, qubits.null,
+                                                  lane_trans, [], 1 << n_lanes, 0, 1)
+            lane_states = [qstates.get_lane_state(lane) for lane in range(n_lanes)]
+            layouts.append((n_lanes, offset, lane_states))
+            offset += 1 << n_lanes
+        array.flush()
+        del array
+        lanelist = [(qreg, qstates_list.index(lane.qstates), lane.local)
+                    for qreg, lane in self.lanes.items()]
+        return dtype, layouts, lanelist
+
+    def load(self, filename, saved) :
+        # restore qubit states from a file written by save().
+        dtype, layouts, lanelist = saved
+        array = np.memmap(filename, dtype, 'r')
+        self._qubits.reset()
+        for n_lanes, offset, lane_states in layouts :
+            qstates = self.allocate_qubit_states(n_lanes)
+            qstates.processor.set_states(qstates, array[offset : offset + (1 << n_lanes)])
+            for lane, value in enumerate(lane_states) :
+                qstates.set_lane_state(lane, value)
+        del array
+        for qreg, idx, local_lane in lanelist :
+            self.lanes.add_lane(qreg, self._qubits.qstates_list[idx], local_lane)
+
     def add_qubit_states(self, qregset) :
         
         # initialize qubit states
         assert len(qregset) != 0, "empty qreg set."
 
         n_lanes = len(qregset)
-        qstates = self._allocate_qubit_states(n_lanes)
+        qstates = self.allocate_qubit_states(n_lanes)
         qstates.processor.reset_qubit_states(qstates)
 
         # create lane map.
@@ -64,9 +136,9 @@ class QubitsHandler :
 
         # remove given qubit states
         for qs in qslist :
-            self._qubits.qstates_list.remove(qs)
+            self.release_qubit_states(qs)
         # allocate qubit states
-        joined = self._allocate_qubit_states(n_lanes)
+        joined = self.allocate_qubit_states(n_lanes)
         # join states in list
         joined.processor.join(joined, qslist, len(new_qregs))
 
@@ -79,7 +151,7 @@ class QubitsHandler :
                 new_local_lane = lane.local + lane_offset
                 joined.set_lane_state(new_local_lane, qs.get_lane_state(lane.local))
                 # update lane.  Should be done after copy.
-                lane.update(joined, new_local_lane)
+                self.lanes.update_lane(lane, joined, new_local_lane)
 
             lane_offset += len(lanes)
 
@@ -94,10 +166,10 @@ class QubitsHandler :
         # allocate qubit states
         n_lanes = qstates.get_n_lanes()
 
-        qstates0 = self._allocate_qubit_states(n_lanes - 1)
-        qstates1 = self._allocate_qubit_states(1)
+        qstates0 = self.allocate_qubit_states(n_lanes - 1)
+        qstates1 = self.allocate_qubit_states(1)
         # update qstates_list.
-        self._qubits.qstates_list.remove(qstates)
+        self.release_qubit_states(qstates)
 
         # separate.  lane states is updated in processor.separate().
         # FIXME: correct propcessor ?
@@ -115,10 +187,11 @@ class QubitsHandler :
 
         # update lanes
         for lane in lanes :
-            lane.qstates = qstates0
-            if sep_lane.local < lane.local :
-                lane.local -= 1
-        sep_lane.qstates, sep_lane.local = qstates1, 0
+            new_local_lane = lane.local
+            if sep_lane.local < new_local_lane :
+                new_local_lane -= 1
+            self.lanes.update_lane(lane, qstates0, new_local_lane)
+        self.lanes.update_lane(sep_lane, qstates1, 0)
         # FIXME: add consistency checks.
 
     def deallocate_qubit_states(self, qreg) :
@@ -130,6 +203,6 @@ class QubitsHandler :
         # update lanes
         self.lanes.pop(qreg)
         # update qstates_list
-        self._qubits.qstates_list.remove(lane.qstates)
+        self.release_qubit_states(lane.qstates)
         # release qubit states
         lane.qstates = None
@@ -0,0 +1,76 @@
+import numpy as np
+
+
+def create_generator(seed) :
+    """ create numpy.random.Generator from seed.
+    seed is None, an integer, numpy.random.SeedSequence or numpy.random.Generator.
+    None means numpy global random state.
+    """
+    if seed is None or isinstance(seed, np.random.Generator) :
+        return seed
+    # Philox is counter-based, streams spawned from seeds are independent.
+    return np.random.Generator(np.random.Philox(seed))
+
+
+class RandomNumbers :
+    """ source of random numbers for measurements and sampling.
+    Random numbers are drawn in blocks from numpy.random.Generator.
+    If generator is None, numpy global random state is used and random numbers
+    are drawn on demand, so that np.random.seed() gives reproducible results.
+    """
+    block_size = 4096
+
+    def __init__(self, generator = None) :
+        self._generator = generator
+        self._block = np.empty([0], np.float64)
+        self._pos = 0
+
+    @property
+    def generator(self) :
+        return self._generator
+
+    def random(self) :
+        """ returns one random number in [0, 1). """
+        if self._generator is None :
+            return np.random.random_sample()
+        if self._pos == len(self._block) :
+            self._block = self._generator.random(self.block_size)
+            self._pos = 0
+        randnum = self._block[self._pos]
+        self._pos += 1
+        return randnum
+
+    def random_sample(self, n_samples) :
+        """ returns an array of n_samples random numbers in [0, 1). """
+        if self._generator is None :
+            return np.random.random_sample([n_samples])
+        n_buffered = len(self._block) - self._pos
+        if n_samples <= n_buffered :
+            randnum = self._block[self._pos : self._pos + n_samples].copy()
+            self._pos += n_samples
+            return randnum
+        randnum = np.empty([n_samples], np.float64)
+        randnum[:n_buffered] = self._block[self._pos:]
+        self._generator.random(out = randnum[n_buffered:])
+        self._block = np.empty([0], np.float64)
+        self._pos = 0
+        return randnum
+
+    def binomial(self, n, p) :
+        if self._generator is None :
+            return np.random.binomial(n, p)
+        return self._generator.binomial(n, p)
+
+    def shuffle(self, values) :
+        if self._generator is None :
+            np.random.shuffle(values)
+        else :
+            self._generator.shuffle(values)
+
+    def spawn(self, n_streams) :
+        """ returns a list of numpy.random.SeedSequence for independent streams. """
+        if self._generator is None :
+            entropy = np.random.randint(0, 1 << 32, size = 4, dtype = np.uint64)
+        else :
+            entropy = self._generator.integers(0, 1 << 32, size = 4, dtype = np.uint64)
+        return np.random.SeedSequence([int(v) for v in entropy]).spawn(n_streams)
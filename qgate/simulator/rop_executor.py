@@ -1,4 +1,6 @@
-from .runtime_operator import ControlledGate, Gate, Reset, Prob, Decohere, ReferencedObservable
+from .runtime_operator import ControlledGate, Gate, MultiQubitGate, Reset, Prob, Decohere, ReferencedObservable
+import qgate.model.gate_type as gtype
+import numpy as np
 
 class RopExecutor :
     def __init__(self) :
@@ -12,12 +14,9 @@ class RopExecutor :
             self.dispatch()
 
     def wait_rop(self, rop) :
-        try :
-            idx = self.queue.index(rop)
-            for _ in range(idx + 1) :
-                self.dispatch()
-        except :
-            pass
+        # dispatch() may process 2 or more rops at once.
+        while rop in self.queue :
+            self.dispatch()
 
     def wait_observable(self, observer) :
         observables = [ op for op in self.queue if isinstance(op, ReferencedObservable) ]
@@ -25,13 +24,43 @@ class RopExecutor :
             if observer == observable.get_observer() :
                 self.wait_rop(observable)
 
+    def pop_gates(self, rop) :
+        # collect successive gates applied to the same qubit states.
+        gates = [ rop ]
+        while len(self.queue) != 0 :
+            next_rop = self.queue[0]
+            if not isinstance(next_rop, (ControlledGate, Gate)) or next_rop.qstates != rop.qstates :
+                break
+            gates.append(self.queue.pop(0))
+        return gates
+
     def dispatch(self) :
         rop = self.queue.pop(0)
+        if isinstance(rop, (ControlledGate, Gate)) and len(self.queue) != 0 :
+            gates = self.pop_gates(rop)
+            if len(gates) != 1 :
+                batch = list()
+                for gate in gates :
+                    if isinstance(gate, ControlledGate) :
+                        batch.append((gate.gate_type, gate.adjoint, gate.control_lanes, gate.target_lane))
+                    else :
+                        batch.append((gate.gate_type, gate.adjoint, None, gate.lane))
+                rop.qstates.processor.apply_gates(batch, rop.qstates)
+                return
+
         if isinstance(rop, ControlledGate) :
             rop.qstates.processor.apply_controlled_gate(rop.gate_type, rop.adjoint,
                                             rop.qstates, rop.control_lanes, rop.target_lane)
         elif isinstance(rop, Gate) :
             rop.qstates.processor.apply_gate(rop.gate_type, rop.adjoint, rop.qstates, rop.lane)
+        elif isinstance(rop, MultiQubitGate) and isinstance(rop.gate_type, gtype.DIAGN) :
+            phases, = rop.gate_type.args
+            if rop.adjoint :
+                phases = np.conjugate(phases)
+            rop.qstates.processor.apply_diagonal_gate(phases, rop.qstates, rop.target_lanes)
+        elif isinstance(rop, MultiQubitGate) :
+            rop.qstates.processor.apply_multi_qubit_gate(rop.gate_type, rop.adjoint, rop.qstates,
+                                                         rop.control_lanes, rop.target_lanes)
         elif isinstance(rop, Prob) :
             prob = rop.qstates.processor.calc_probability(rop.qstates, rop.lane)
             rop.set(prob)
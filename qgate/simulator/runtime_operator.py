@@ -1,4 +1,10 @@
 import qgate.model as model
+import numpy as np
+
+# record for batched gate application, should be the same as qgate::GateRecord.
+gate_record = np.dtype([('mat', np.complex128, (2, 2)),
+                        ('control_mask', np.int64),
+                        ('target_lane', np.int64)])
 
 class Observable :
     pass
@@ -34,6 +40,14 @@ class Gate :
         self.adjoint = adjoint
         self.lane = lane
         
+class MultiQubitGate :
+    def __init__(self, qstates, control_lanes, gate_type, adjoint, target_lanes) :
+        self.qstates = qstates
+        self.control_lanes = control_lanes
+        self.gate_type = gate_type
+        self.adjoint = adjoint
+        self.target_lanes = target_lanes
+        
 class Reset :
     def __init__(self, qstates, lane) :
         self.qstates = qstates
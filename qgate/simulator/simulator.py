@@ -2,24 +2,48 @@ from .qubits import Qubits
 from .value_store import ValueStore
 from .qubits_handler import QubitsHandler
 import qgate.model as model
-from qgate.model.gatelist import GateListIterator
+from qgate.model.gatelist import OpCursor
+from qgate.model.expand import adjoint
 from .model_executor import ModelExecutor
 from .runtime_operator import Observer
 from .observation import Observation, ObservationList
+from . import random_numbers
+from .plan import Plan, PlanCompiler, PlanExecutor
+from .sweepruntime import SweepExecutor
+from .snapshot import Snapshot
 import numpy as np
 import math
 
 
+# sampling job shared with forked worker processes.
+_sampling_job = None
+
+def _sample_worker(args) :
+    n_samples, seed_seq = args
+    defpkg, prefs, circuit, ref_array, n_threads = _sampling_job
+    # independent and reproducible random number stream for each worker.
+    prefs = dict(prefs)
+    prefs[model.prefs.random_generator] = seed_seq
+    if hasattr(defpkg, 'set_n_workers') :
+        defpkg.set_n_workers(n_threads)
+    sim = Simulator(defpkg, **prefs)
+    return sim.sample(circuit, ref_array, n_samples).intarray
+
+
 class Simulator :
     def __init__(self, defpkg, **prefs) :
         dtype = prefs.get('dtype', np.float64)
+        self._defpkg = defpkg
         self.prefs = dict()
         self.set_preference(**prefs)
         states_getter = defpkg.create_qubits_states_getter(dtype)
         self._qubits = Qubits(states_getter, dtype) # FIXME: remove
         self._value_store = ValueStore()
         self._qhandler = QubitsHandler(defpkg.create_qubit_states, self._qubits)
+        self._multi_qubit_gate = getattr(defpkg, 'multi_qubit_gate', False)
         self.executor = ModelExecutor(self._qhandler, self._value_store)
+        self._plan_executor = PlanExecutor(self._qhandler, self._value_store)
+        self._stats = dict()
         self.reset()
 
     @property
@@ -30,14 +54,28 @@ class Simulator :
     def values(self) :
         return self._value_store
 
+    @property
+    def stats(self) :
+        return self._stats
+
     def set_preference(self, **prefs) :
         self.prefs = dict(prefs.items())
+        seed = self.prefs.get(model.prefs.random_generator, None)
+        self._random_numbers = random_numbers.RandomNumbers(random_numbers.create_generator(seed))
 
     def reset(self) :
         # release all internal objects
         self._qhandler.reset()
         self._value_store.reset()
-        self.preprocessor = model.Preprocessor(**self.prefs)
+        self.executor.set_random_numbers(self._random_numbers)
+        self._qubits.random_numbers = self._random_numbers
+        self.preprocessor = self._create_preprocessor()
+        self._stats = dict()
+
+    def _create_preprocessor(self) :
+        prefs = dict(self.prefs)
+        prefs.setdefault(model.prefs.multi_qubit_gate, self._multi_qubit_gate)
+        return model.Preprocessor(**prefs)
 
     def terminate(self) :
         # release resources.
@@ -54,69 +92,296 @@ class Simulator :
         mask = self._value_store.get_mask(reflist)
         return Observation(reflist, value, mask)
 
-    def run(self, circuit) :
+    def compile(self, circuit) :
+        """ compile circuit to a plan executed by run().
+        Preprocessing, lane resolution and gate matrices are done once in compile,
+        and each run of the plan starts from the reset state.
+        """
+        if not isinstance(circuit, model.GateList) :
+            ops = circuit
+            circuit = model.GateList()
+            circuit.set(ops)
+
+        preprocessor = self._create_preprocessor()
+        preprocessed = preprocessor.preprocess(circuit)
+        compiler = PlanCompiler()
+        return compiler.compile(preprocessed.ops, preprocessor.get_refset(),
+                                preprocessor.get_stats())
+
+    def run(self, circuit, bindings = None) :
+        """ run circuit or plan.
+        bindings is a dict whose keys are parameters and values are bound values.
+        """
+        if bindings is None :
+            bindings = dict()
+        if isinstance(circuit, Plan) :
+            self._run_plan(circuit.bind(bindings))
+            return
+
         if not isinstance(circuit, model.GateList) :
             ops = circuit
             circuit = model.GateList()
             circuit.set(ops)
             
         preprocessed = self.preprocessor.preprocess(circuit)
+        self._stats.update(self.preprocessor.get_stats())
         
         # model.dump(preprocessed)
 
         self._value_store.sync_refs(self.preprocessor.get_refset())
 
-        self.op_iter = GateListIterator(preprocessed.ops)
-        while True :
-            op = self.op_iter.next()
-            if op is None :
-                break
-            if isinstance(op, model.IfClause) :
-                if self._evaluate_if(op) :
-                    self.op_iter.prepend(op.clause)
+        self.executor.set_bindings(bindings)
+        self._run_ops(preprocessed.linear)
+        self._qubits.update_external_layout()
+        for qstates in self.qubits.qstates_list :
+            qstates.processor.synchronize()
+
+    def run_batch(self, circuit, bindings_list, callback = None) :
+        """ run circuit for each bindings in bindings_list.
+        circuit is compiled once, and only matrices of gates with parameters are built for each bindings.
+        callback(simulator) is called after each run, and a list of returned values is returned.
+        If callback is None, a list of state vectors is returned.
+        """
+        plan = circuit if isinstance(circuit, Plan) else self.compile(circuit)
+        if callback is None :
+            callback = lambda sim : sim.qubits.states[:]
+        results = list()
+        for bindings in bindings_list :
+            self.run(plan, bindings)
+            results.append(callback(self))
+        return results
+
+    def sweep(self, circuit, bindings_list) :
+        """ run circuit for all bindings in bindings_list at once.
+        States of all bindings are held in one array of (batch, 2**n_qregs), and each gate is applied
+        to all of them in one pass.  Returns SweepResult that has states and values of Prob as arrays.
+        """
+        plan = circuit if isinstance(circuit, Plan) else self.compile(circuit)
+        executor = SweepExecutor(self.prefs.get('dtype', np.float64))
+        return executor.run(plan, bindings_list, self._qubits.given_ordering)
+
+    def snapshot(self, filename = None) :
+        """ returns a snapshot of qubit states, lanes, lane states and values.
+        If filename is given, qubit states are written to a numpy.memmap-backed file
+        without an in-memory copy, and the snapshot only holds their layout.
+        """
+        if filename is None :
+            qubits_snapshot = self._qhandler.snapshot()
+        else :
+            qubits_snapshot = self._qhandler.save(filename)
+        return Snapshot(qubits_snapshot, dict(self._value_store.valuedict),
+                        self.preprocessor.snapshot(), filename)
+
+    def restore(self, snapshot) :
+        """ restore states from a snapshot.  Circuits are able to continue running after restore.
+        A snapshot is able to be restored many times.
+        """
+        self.reset()
+        if snapshot.filename is None :
+            self._qhandler.restore(snapshot.qubits)
+        else :
+            self._qhandler.load(snapshot.filename, snapshot.qubits)
+        self._value_store.valuedict = dict(snapshot.values)
+        self.preprocessor.restore(snapshot.preprocessor)
+        self._qubits.update_external_layout()
+        for qstates in self.qubits.qstates_list :
+            qstates.processor.synchronize()
+
+    def evaluate_pauli_terms(self, terms) :
+        """ returns an array of weighted expectation values of pauli terms for the current states.
+        terms is a list of (coefficient, gatelist) or gatelist.  Terms are partitioned into
+        qubit-wise commuting groups, and each group is evaluated from one probability vector
+        after one basis change, which is reverted after evaluation.
+        """
+        values = np.zeros([len(terms)], np.float64)
+        # probability vector without empty lanes.
+        factory = lambda prob, empty_lanes, qreg_ordering : prob
+        for group in model.group_pauli_terms(terms) :
+            ordering = [qreg for qreg in group.qregs if qreg in self._qubits.lanes]
+            basis_change = group.get_basis_change(ordering)
+            self.run(basis_change)
+            if len(ordering) == 0 :
+                prob = np.ones([1], np.float64)
             else :
-                self.executor.enqueue(op)
+                prob = self._qubits.create_sampling_pool(ordering, factory)
+            values[group.term_indices] = group.calc_expectations(prob, ordering)
+            self.run(adjoint(basis_change))
+        return values
 
-        self.executor.flush()
+    def _run_plan(self, plan) :
+        self.reset()
+        self._stats.update(plan.stats)
+        self._value_store.sync_refs(plan.refset)
+        self._plan_executor.run(plan, self._random_numbers)
         self._qubits.update_external_layout()
         for qstates in self.qubits.qstates_list :
             qstates.processor.synchronize()
 
-    def sample(self, circuit, ref_array, n_samples = 1024) :
+    def sample(self, circuit, ref_array, n_samples = 1024, n_workers = None) :
+        """ sample values of references in ref_array.
+        If n_workers is given, shots are divided and sampled in n_workers forked processes.
+        """
         if not isinstance(circuit, model.GateList) :
             ops = circuit
             circuit = model.GateList()
             circuit.set(ops)
 
-        obs = np.empty([n_samples], dtype = np.int64)
-        
         self.reset()
         preprocessed = self.preprocessor.preprocess(circuit)
+        stats = self.preprocessor.get_stats()
+        self._value_store.sync_refs(self.preprocessor.get_refset())
+
+        if n_workers is not None and 1 < n_workers :
+            obs = self._sample_in_processes(circuit, ref_array, n_samples, n_workers)
+        else :
+            obs = self._sample_branches(preprocessed.linear, ref_array, n_samples)
+
+            for qstates in self.qubits.qstates_list :
+                qstates.processor.synchronize()
+        mask = self._value_store.get_mask(ref_array)
+        self._stats.update(stats)
+        return ObservationList(ref_array, obs, mask)
+
+    def _sample_in_processes(self, circuit, ref_array, n_samples, n_workers) :
+        import multiprocessing
+        # workers inherit circuits by fork, since circuits may have unpicklable conditions.
+        ctx = multiprocessing.get_context('fork')
+
+        n_shots_list = [n_samples // n_workers + (1 if idx < n_samples % n_workers else 0)
+                        for idx in range(n_workers)]
+        # seeds of workers are derived from random numbers of this simulator.
+        seed_seqs = self._random_numbers.spawn(n_workers)
+
+        n_threads = 1
+        if hasattr(self._defpkg, 'get_n_workers') :
+            n_threads = max(1, self._defpkg.get_n_workers() // n_workers)
+
+        global _sampling_job
+        _sampling_job = (self._defpkg, self.prefs, circuit, ref_array, n_threads)
+        try :
+            with ctx.Pool(n_workers) as pool :
+                results = pool.map(_sample_worker, zip(n_shots_list, seed_seqs))
+        finally :
+            _sampling_job = None
+        return np.concatenate(results)
+
+    def _run_ops(self, linear) :
+        cursor = OpCursor(linear)
+        while True :
+            op = cursor.next()
+            if op is None :
+                break
+            if isinstance(op, model.IfClause) :
+                if not self._evaluate_if(op) :
+                    cursor.skip_clause()
+            else :
+                self.executor.enqueue(op)
+        self.executor.flush()
 
-        for loop in range(n_samples) :
-            self.reset()
-            self._value_store.sync_refs(self.preprocessor.get_refset())
+    def _sample_branches(self, linear, ref_array, n_samples) :
+        # Circuits are simulated once for each branch made by measurements.
+        # Shots are distributed to branches according to probabilities of measurement results.
+        results = list()
+        # branch: (snapshot to restore, position in linear ops, number of shots,
+        #          random number for the first Measure)
+        branches = [ (None, 0, n_samples, None) ]
+        while len(branches) != 0 :
+            snapshot, pos, n_shots, randnum = branches.pop()
+            if snapshot is not None :
+                self._restore(snapshot)
+            forced = None
+            if randnum is not None :
+                forced = linear.ops[pos]
+                self.executor.set_randnum(forced, randnum)
 
-            self.op_iter = GateListIterator(preprocessed.ops)
+            cursor = OpCursor(linear, pos)
             while True :
-                op = self.op_iter.next()
+                op = cursor.next()
                 if op is None :
                     break
                 if isinstance(op, model.IfClause) :
-                    if self._evaluate_if(op) :
-                        self.op_iter.prepend(op.clause)
+                    if not self._evaluate_if(op) :
+                        cursor.skip_clause()
+                elif isinstance(op, model.Measure) and not op is forced :
+                    break
                 else :
                     self.executor.enqueue(op)
-
             self.executor.flush()
 
-            packed_value = self._value_store.get_packed_value(ref_array)
-            obs[loop] = packed_value
+            if op is None :
+                # end of circuit.
+                value = self._value_store.get_packed_value(ref_array)
+                results.append(np.full([n_shots], value, dtype = np.int64))
+                continue
 
-        for qstates in self.qubits.qstates_list :
-            qstates.processor.synchronize()
-        mask = self._value_store.get_mask(ref_array)
-        return ObservationList(ref_array, obs, mask)
+            # position of the measurement to branch.
+            pos = cursor.pos - 1
+            measured = self._get_terminal_measurements(linear.ops[pos:])
+            if measured is not None :
+                results.append(self._sample_terminal_measurements(measured, ref_array, n_shots))
+                continue
+
+            # branch by measurement result.
+            if op.qreg in self._qhandler.lanes :
+                lane = self._qhandler.lanes[op.qreg]
+                prob = lane.qstates.calc_probability(lane.local)
+            else :
+                prob = 1.
+            n_shots_0 = self._random_numbers.binomial(n_shots, min(max(prob, 0.), 1.))
+            n_shots_1 = n_shots - n_shots_0
+            # random numbers of 0. and 1. give measurement results of 0 and 1.
+            if n_shots_0 != 0 and n_shots_1 != 0 :
+                branches.append((self._snapshot(), pos, n_shots_1, 1.))
+                branches.append((None, pos, n_shots_0, 0.))
+            elif n_shots_0 != 0 :
+                branches.append((None, pos, n_shots_0, 0.))
+            else :
+                branches.append((None, pos, n_shots_1, 1.))
+
+        obs = np.concatenate(results)
+        # shots in branches are shuffled to give the same sequences as independent shots.
+        self._random_numbers.shuffle(obs)
+        return obs
+
+    def _snapshot(self) :
+        return self._qhandler.snapshot(), dict(self._value_store.valuedict)
+
+    def _restore(self, snapshot) :
+        qubits_snapshot, values = snapshot
+        self._qhandler.restore(qubits_snapshot)
+        self._value_store.valuedict = dict(values)
+
+    def _get_terminal_measurements(self, ops) :
+        # returns dict of ref and measured qreg if ops only have measurements, otherwise None.
+        measured = dict()
+        for op in ops :
+            if isinstance(op, model.Measure) :
+                measured[op.outref] = op.qreg
+            elif not isinstance(op, (model.Separate, model.ReleaseQreg, model.NewQreg,
+                                     model.Barrier, model.ClauseBegin, model.ClauseEnd)) :
+                return None
+        return measured
+
+    def _sample_terminal_measurements(self, measured, ref_array, n_samples) :
+        # values not measured are the same for all shots.
+        const_refs = [ref for ref in ref_array if not ref in measured]
+        const_value = self._value_store.get_packed_value(const_refs)
+        obs = np.zeros([n_samples], dtype = np.int64)
+        for idx, ref in enumerate(const_refs) :
+            if (const_value >> idx) & 1 :
+                obs |= 1 << ref_array.index(ref)
+
+        qreg_ordering = list()
+        for qreg in measured.values() :
+            if not qreg in qreg_ordering :
+                qreg_ordering.append(qreg)
+        pool = self._qubits.create_sampling_pool(qreg_ordering)
+        values = pool.sample(n_samples, self._random_numbers.random_sample(n_samples)).intarray
+        for idx, ref in enumerate(ref_array) :
+            if ref in measured :
+                pos = qreg_ordering.index(measured[ref])
+                obs |= ((values >> pos) & 1) << idx
+        return obs
 
     def _evaluate_if(self, op) :
         # wait for referred value obtained.
@@ -0,0 +1,26 @@
+class Snapshot :
+    """ snapshot of qubit states, lanes, lane states and values, created by Simulator.snapshot().
+    If filename is not None, qubit states are stored in a numpy.memmap-backed file, and this object
+    holds their layout.  Such snapshots are picklable, and are restored as long as the file exists.
+    """
+    def __init__(self, qubits_snapshot, values, preprocessor_snapshot, filename = None) :
+        self._qubits = qubits_snapshot
+        self._values = values
+        self._preprocessor = preprocessor_snapshot
+        self._filename = filename
+
+    @property
+    def filename(self) :
+        return self._filename
+
+    @property
+    def qubits(self) :
+        return self._qubits
+
+    @property
+    def values(self) :
+        return self._values
+
+    @property
+    def preprocessor(self) :
+        return self._preprocessor
@@ -0,0 +1,100 @@
+#include "CPUMmapChunkStore.h"
+
+#ifndef _MSC_VER
+#  include <sys/mman.h>
+#  include <unistd.h>
+#  include <stdlib.h>
+#endif
+
+using qgate::Qone;
+using namespace qgate_cpu;
+
+
+MmapChunkStore::MmapChunkStore() : po2idxPerChunk_(-1), nextDirectory_(0) {
+}
+
+MmapChunkStore::~MmapChunkStore() {
+}
+
+void MmapChunkStore::initialize(const std::vector<std::string> &directories, int po2idxPerChunk) {
+    throwErrorIf(directories.empty(), "no directory given.");
+    directories_ = directories;
+    po2idxPerChunk_ = po2idxPerChunk;
+    nextDirectory_ = 0;
+}
+
+void MmapChunkStore::finalize() {
+    /* allocated buffers are still valid, and released by deallocate(). */
+    directories_.clear();
+    po2idxPerChunk_ = -1;
+}
+
+bool MmapChunkStore::useChunks(QstateSize nStates) const {
+    /* small buffers are allocated in memory. */
+    return isInitialized() && ((Qone << po2idxPerChunk_) < nStates);
+}
+
+#ifndef _MSC_VER
+
+void *MmapChunkStore::allocate(QstateSize nStates, size_t itemSize) {
+    size_t byteSize = itemSize * nStates;
+    size_t chunkSize = itemSize << po2idxPerChunk_;
+    size_t pageSize = (size_t)sysconf(_SC_PAGESIZE);
+    throwErrorIf((chunkSize % pageSize) != 0, "chunk size must be a multiple of page size.");
+
+    /* reserve address space, chunks are mapped on it. */
+    void *reserved = mmap(NULL, byteSize, PROT_NONE,
+                          MAP_PRIVATE | MAP_ANONYMOUS | MAP_NORESERVE, -1, 0);
+    throwErrorIf(reserved == MAP_FAILED, "failed to reserve address space.");
+
+    char *base = static_cast<char*>(reserved);
+    for (size_t offset = 0; offset < byteSize; offset += chunkSize) {
+        const std::string &dir = directories_[nextDirectory_];
+        nextDirectory_ = (nextDirectory_ + 1) % (int)directories_.size();
+
+        std::string path = dir + "/qgate-chunk-XXXXXX";
+        std::vector<char> pathBuf(path.begin(), path.end());
+        pathBuf.push_back('\0');
+        int fd = mkstemp(pathBuf.data());
+        if (fd == -1) {
+            munmap(reserved, byteSize);
+            throwError("failed to create a chunk file in %s.", dir.c_str());
+        }
+        /* files are removed when unmapped. */
+        unlink(pathBuf.data());
+        void *mapped = MAP_FAILED;
+        if (ftruncate(fd, chunkSize) == 0) {
+            mapped = mmap(base + offset, chunkSize, PROT_READ | PROT_WRITE,
+                          MAP_SHARED | MAP_FIXED, fd, 0);
+        }
+        close(fd);
+        if (mapped == MAP_FAILED) {
+            munmap(reserved, byteSize);
+            throwError("failed to map a chunk file in %s.", dir.c_str());
+        }
+        madvise(mapped, chunkSize, MADV_SEQUENTIAL);
+    }
+    return reserved;
+}
+
+void MmapChunkStore::deallocate(void *ptr, QstateSize nStates, size_t itemSize) {
+    munmap(ptr, itemSize * nStates);
+}
+
+#else
+
+void *MmapChunkStore::allocate(QstateSize nStates, size_t itemSize) {
+    throwError("memory-mapped chunks are not supported.");
+    return NULL;
+}
+
+void MmapChunkStore::deallocate(void *ptr, QstateSize nStates, size_t itemSize) {
+}
+
+#endif
+
+
+MmapChunkStore &qgate_cpu::mmapChunkStore() {
+    static MmapChunkStore store;
+    return store;
+}
@@ -0,0 +1,49 @@
+#pragma once
+
+#include "Types.h"
+#include <string>
+#include <vector>
+
+namespace qgate_cpu {
+
+using qgate::QstateSize;
+
+/* memory store whose buffers consist of chunks of memory-mapped files.
+ * Chunk files are created in given directories in round-robin, and mapped to contiguous
+ * addresses, so buffers are accessed as flat arrays.  Gates on lanes lower than
+ * po2idxPerChunk are chunk-local, and gates on higher lanes access pairs of chunks,
+ * which are streamed by page cache. */
+class MmapChunkStore {
+public:
+    MmapChunkStore();
+
+    ~MmapChunkStore();
+
+    void initialize(const std::vector<std::string> &directories, int po2idxPerChunk);
+
+    void finalize();
+
+    bool isInitialized() const {
+        return !directories_.empty();
+    }
+
+    /* returns true if buffers of nStates are allocated in chunks. */
+    bool useChunks(QstateSize nStates) const;
+
+    void *allocate(QstateSize nStates, size_t itemSize);
+
+    void deallocate(void *ptr, QstateSize nStates, size_t itemSize);
+
+private:
+    std::vector<std::string> directories_;
+    int po2idxPerChunk_;
+    /* directory index for the next chunk. */
+    int nextDirectory_;
+
+    /* hidden copy ctor */
+    MmapChunkStore(const MmapChunkStore &);
+};
+
+MmapChunkStore &mmapChunkStore();
+
+}
@@ -58,6 +58,53 @@ void CPUQubitProcessor<real>::run(int nLanes,
 }
 
 
+namespace {
+
+/* run f(idx_0, W) for nBlocks blocks of 2 * W states from idx_0.  W is given at compile time,
+ * so kernels inlined in f are unrolled and vectorized over blocks. */
+template<int W, class F>
+inline void runBlocks(QstateIdx idx_0, QstateSize nBlocks, const F &f) {
+    for (QstateSize block = 0; block < nBlocks; ++block)
+        f(idx_0 + 2 * W * block, (QstateSize)W);
+}
+
+}
+
+template<class real> template<class F>
+void CPUQubitProcessor<real>::runSpans(int nLanes, int localLane, const F &f) {
+    QstateSize nLoops = Qone << (nLanes - 1);
+    QstateIdx loMask = (Qone << localLane) - 1;
+    auto spanFunc = [=, &f](int threadIdx, QstateIdx spanBegin, QstateIdx spanEnd) {
+        /* spans are aligned to 256 loops or cover all loops, and hold whole blocks for low lanes. */
+        switch (localLane) {
+        case 0:
+            runBlocks<1>(spanBegin << 1, spanEnd - spanBegin, f);
+            return;
+        case 1:
+            runBlocks<2>(spanBegin << 1, (spanEnd - spanBegin) >> 1, f);
+            return;
+        case 2:
+            runBlocks<4>(spanBegin << 1, (spanEnd - spanBegin) >> 2, f);
+            return;
+        case 3:
+            runBlocks<8>(spanBegin << 1, (spanEnd - spanBegin) >> 3, f);
+            return;
+        }
+        QstateIdx idx = spanBegin;
+        while (idx < spanEnd) {
+            QstateIdx lo = idx & loMask;
+            QstateSize n = std::min(loMask + 1 - lo, spanEnd - idx);
+            f(((idx - lo) << 1) | lo, n);
+            idx += n;
+        }
+    };
+    if (nLoops < 256)
+        spanFunc(0, 0, nLoops);
+    else
+        qgate::Parallel().distribute(spanFunc, 0LL, nLoops, 256LL);
+}
+
+
 template<class real>
 void CPUQubitProcessor<real>::resetQubitStates(qgate::QubitStates &_qstates) {
     CPUQubitStates<real> &qstates = static_cast<CPUQubitStates<real>&>(_qstates);
@@ -68,10 +115,23 @@ void CPUQubitProcessor<real>::resetQubitStates(qgate::QubitStates &_qstates) {
     auto setZeroFunc = [=](int threadIdx, QstateIdx spanBegin, QstateIdx spanEnd) {
         memset(&cmp[spanBegin], 0, sizeof(Complex) * (spanEnd - spanBegin));
     };
-    Parallel().distribute(setZeroFunc, 0LL, nStates);
+    Parallel().distributeStates(setZeroFunc, nStates);
     cmp[0] = Complex(1.);
 }
 
+template<class real> void CPUQubitProcessor<real>::
+setStates(qgate::QubitStates &_qstates, const void *array, QstateSize nStates) {
+    CPUQubitStates<real> &qstates = static_cast<CPUQubitStates<real>&>(_qstates);
+    throwErrorIf(nStates != (Qone << qstates.getNLanes()), "size of states mismatch.");
+
+    Complex *cmp = qstates.getPtr();
+    const Complex *src = static_cast<const Complex*>(array);
+    auto copyFunc = [=](int threadIdx, QstateIdx spanBegin, QstateIdx spanEnd) {
+        memcpy(&cmp[spanBegin], &src[spanBegin], sizeof(Complex) * (spanEnd - spanBegin));
+    };
+    Parallel().distributeStates(copyFunc, nStates);
+}
+
 template<class real> double CPUQubitProcessor<real>::
 calcProbability(const qgate::QubitStates &_qstates, int localLane) {
     const CPUQubitStates<real> &qstates = static_cast<const CPUQubitStates<real>&>(_qstates);
@@ -304,11 +364,161 @@ void CPUQubitProcessor<real>::applyReset(qgate::QubitStates &_qstates, int local
     run(qstates.getNLanes(), 1, bitShiftMap, resetFunc);
 }
 
+namespace {
+
+/* kernels on arrays of (real, imag), written as plain loops over contiguous states to be vectorized. */
+
+template<class real>
+inline void mulPhase(real *v, QstateSize n, real pr, real pi) {
+    for (QstateSize idx = 0; idx < n; ++idx) {
+        real re = v[2 * idx], im = v[2 * idx + 1];
+        v[2 * idx] = re * pr - im * pi;
+        v[2 * idx + 1] = re * pi + im * pr;
+    }
+}
+
+template<class real>
+inline void swapStates(real *v0, real *v1, QstateSize n) {
+    for (QstateSize idx = 0; idx < 2 * n; ++idx) {
+        real tmp = v0[idx];
+        v0[idx] = v1[idx];
+        v1[idx] = tmp;
+    }
+}
+
+template<class real>
+inline void mulSwapStates(real *v0, real *v1, QstateSize n,
+                          real p01r, real p01i, real p10r, real p10i) {
+    for (QstateSize idx = 0; idx < n; ++idx) {
+        real re0 = v0[2 * idx], im0 = v0[2 * idx + 1];
+        real re1 = v1[2 * idx], im1 = v1[2 * idx + 1];
+        v0[2 * idx] = re1 * p01r - im1 * p01i;
+        v0[2 * idx + 1] = re1 * p01i + im1 * p01r;
+        v1[2 * idx] = re0 * p10r - im0 * p10i;
+        v1[2 * idx + 1] = re0 * p10i + im0 * p10r;
+    }
+}
+
+}
+
+template<class real> typename CPUQubitProcessor<real>::GateKind
+CPUQubitProcessor<real>::classifyGate(const Matrix2x2C64 &mat) {
+    const ComplexType<double> zero(0.), one(1.);
+    if ((mat(0, 1) == zero) && (mat(1, 0) == zero)) {
+        if (mat(0, 0) == one)
+            return (mat(1, 1) == one) ? gateIdentity : gatePhase;
+        return gateDiagonal;
+    }
+    if ((mat(0, 0) == zero) && (mat(1, 1) == zero)) {
+        if ((mat(0, 1) == one) && (mat(1, 0) == one))
+            return gateSwap;
+        return gateAntiDiagonal;
+    }
+    return gateDense;
+}
+
+template<class real> bool CPUQubitProcessor<real>::
+applySpecializedGate(const Matrix2x2C64 &mat, CPUQubitStates<real> &qstates, int localLane) {
+    GateKind kind = classifyGate(mat);
+    if (kind == gateDense)
+        return false;
+    if (kind == gateIdentity)
+        return true;
+
+    real *v = reinterpret_cast<real*>(qstates.getPtr());
+    /* offset of |1> states in reals. */
+    QstateIdx offset1 = Qtwo << localLane;
+    const Complex m00(mat(0, 0)), m01(mat(0, 1)), m10(mat(1, 0)), m11(mat(1, 1));
+
+    if (kind == gatePhase) {
+        auto phaseFunc = [=](QstateIdx idx_0, QstateSize n) {
+            mulPhase(&v[2 * idx_0 + offset1], n, m11.real(), m11.imag());
+        };
+        runSpans(qstates.getNLanes(), localLane, phaseFunc);
+    }
+    else if (kind == gateDiagonal) {
+        auto diagFunc = [=](QstateIdx idx_0, QstateSize n) {
+            mulPhase(&v[2 * idx_0], n, m00.real(), m00.imag());
+            mulPhase(&v[2 * idx_0 + offset1], n, m11.real(), m11.imag());
+        };
+        runSpans(qstates.getNLanes(), localLane, diagFunc);
+    }
+    else if (kind == gateSwap) {
+        auto swapFunc = [=](QstateIdx idx_0, QstateSize n) {
+            swapStates(&v[2 * idx_0], &v[2 * idx_0 + offset1], n);
+        };
+        runSpans(qstates.getNLanes(), localLane, swapFunc);
+    }
+    else {
+        auto antiDiagFunc = [=](QstateIdx idx_0, QstateSize n) {
+            mulSwapStates(&v[2 * idx_0], &v[2 * idx_0 + offset1], n,
+                          m01.real(), m01.imag(), m10.real(), m10.imag());
+        };
+        runSpans(qstates.getNLanes(), localLane, antiDiagFunc);
+    }
+    return true;
+}
+
+template<class real> bool CPUQubitProcessor<real>::
+applySpecializedControlledGate(const Matrix2x2C64 &mat, CPUQubitStates<real> &qstates,
+                               const qgate::IdList &localControlLanes, int localTargetLane) {
+    GateKind kind = classifyGate(mat);
+    if (kind == gateDense)
+        return false;
+    if (kind == gateIdentity)
+        return true;
+
+    QstateIdx allControlBits = qgate::createBitmask(localControlLanes);
+    QstateIdx targetBit = Qone << localTargetLane;
+    int nInputBits = (int)localControlLanes.size() + 1;
+    int nIdxBits = qstates.getNLanes() - nInputBits;
+    qgate::IdList allLanes(localControlLanes);
+    allLanes.push_back(localTargetLane);
+    qgate::IdList bitShiftMap = qgate::createBitShiftMap(allLanes, nIdxBits);
+
+    real *v = reinterpret_cast<real*>(qstates.getPtr());
+    const Complex m00(mat(0, 0)), m01(mat(0, 1)), m10(mat(1, 0)), m11(mat(1, 1));
+
+    if (kind == gatePhase) {
+        auto phaseFunc = [=](QstateIdx idx, QstateIdx) {
+            QstateIdx idx_1 = idx | allControlBits | targetBit;
+            mulPhase(&v[2 * idx_1], 1, m11.real(), m11.imag());
+        };
+        run(qstates.getNLanes(), nInputBits, bitShiftMap, phaseFunc);
+    }
+    else if (kind == gateDiagonal) {
+        auto diagFunc = [=](QstateIdx idx, QstateIdx) {
+            QstateIdx idx_0 = idx | allControlBits;
+            mulPhase(&v[2 * idx_0], 1, m00.real(), m00.imag());
+            mulPhase(&v[2 * (idx_0 | targetBit)], 1, m11.real(), m11.imag());
+        };
+        run(qstates.getNLanes(), nInputBits, bitShiftMap, diagFunc);
+    }
+    else if (kind == gateSwap) {
+        auto swapFunc = [=](QstateIdx idx, QstateIdx) {
+            QstateIdx idx_0 = idx | allControlBits;
+            swapStates(&v[2 * idx_0], &v[2 * (idx_0 | targetBit)], 1);
+        };
+        run(qstates.getNLanes(), nInputBits, bitShiftMap, swapFunc);
+    }
+    else {
+        auto antiDiagFunc = [=](QstateIdx idx, QstateIdx) {
+            QstateIdx idx_0 = idx | allControlBits;
+            mulSwapStates(&v[2 * idx_0], &v[2 * (idx_0 | targetBit)], 1,
+                          m01.real(), m01.imag(), m10.real(), m10.imag());
+        };
+        run(qstates.getNLanes(), nInputBits, bitShiftMap, antiDiagFunc);
+    }
+    return true;
+}
+
 template<class real>
 void CPUQubitProcessor<real>::applyGate(const Matrix2x2C64 &_mat,
                                         qgate::QubitStates &_qstates, int localLane) {
     
     CPUQubitStates<real> &qstates = static_cast<CPUQubitStates<real>&>(_qstates);
+    if (applySpecializedGate(_mat, qstates, localLane))
+        return;
     Matrix2x2CR mat(_mat);
     
     QstateIdx laneBit = Qone << localLane;
@@ -333,6 +543,8 @@ applyControlledGate(const Matrix2x2C64 &_mat, qgate::QubitStates &_qstates,
                     const qgate::IdList &localControlLanes, int localTargetLane) {
 
     CPUQubitStates<real> &qstates = static_cast<CPUQubitStates<real>&>(_qstates);
+    if (applySpecializedControlledGate(_mat, qstates, localControlLanes, localTargetLane))
+        return;
     Matrix2x2CR mat(_mat);
     
     /* control bit mask */
@@ -361,6 +573,120 @@ applyControlledGate(const Matrix2x2C64 &_mat, qgate::QubitStates &_qstates,
     run(qstates.getNLanes(), nInputBits, bitShiftMap, controlledGateFunc);
 }
 
+template<class real> void CPUQubitProcessor<real>::
+applyMultiQubitGate(const ComplexType<double> *_mat, qgate::QubitStates &_qstates,
+                    const qgate::IdList &localControlLanes, const qgate::IdList &localTargetLanes) {
+
+    CPUQubitStates<real> &qstates = static_cast<CPUQubitStates<real>&>(_qstates);
+
+    enum { maxNTargets = 6 };
+    int nTargets = (int)localTargetLanes.size();
+    throwErrorIf(maxNTargets < nTargets, "too many target lanes, %d.", nTargets);
+    int dim = 1 << nTargets;
+
+    std::vector<Complex> matBuf(dim * dim);
+    for (int idx = 0; idx < dim * dim; ++idx)
+        matBuf[idx] = Complex(_mat[idx]);
+    /* offsets of state indices for matrix indices. */
+    std::vector<QstateIdx> offsetBuf(dim);
+    for (int idx = 0; idx < dim; ++idx) {
+        QstateIdx offset = 0;
+        for (int bit = 0; bit < nTargets; ++bit) {
+            if ((idx >> bit) & 1)
+                offset |= Qone << localTargetLanes[bit];
+        }
+        offsetBuf[idx] = offset;
+    }
+    const Complex *mat = matBuf.data();
+    const QstateIdx *offsets = offsetBuf.data();
+
+    /* control bit mask */
+    QstateIdx allControlBits = qgate::createBitmask(localControlLanes);
+
+    auto multiQubitGateFunc = [=, &qstates](QstateIdx idx, QstateIdx) {
+        QstateIdx idx_0 = idx | allControlBits;
+        Complex qsin[1 << maxNTargets];
+        for (int icol = 0; icol < dim; ++icol)
+            qsin[icol] = qstates[idx_0 | offsets[icol]];
+        for (int irow = 0; irow < dim; ++irow) {
+            const Complex *row = &mat[irow * dim];
+            Complex qsout(0.);
+            for (int icol = 0; icol < dim; ++icol)
+                qsout += row[icol] * qsin[icol];
+            qstates[idx_0 | offsets[irow]] = qsout;
+        }
+    };
+
+    int nInputBits = (int)localControlLanes.size() + nTargets;
+    int nIdxBits = qstates.getNLanes() - nInputBits;
+
+    qgate::IdList allLanes(localControlLanes);
+    allLanes.insert(allLanes.end(), localTargetLanes.begin(), localTargetLanes.end());
+    qgate::IdList bitShiftMap = qgate::createBitShiftMap(allLanes, nIdxBits);
+    run(qstates.getNLanes(), nInputBits, bitShiftMap, multiQubitGateFunc);
+}
+
+template<class real> void CPUQubitProcessor<real>::
+applyDiagonalGate(const ComplexType<double> *_phases, QubitStates &_qstates,
+                  const qgate::IdList &localTargetLanes) {
+
+    CPUQubitStates<real> &qstates = static_cast<CPUQubitStates<real>&>(_qstates);
+
+    enum { maxNTargets = 16 };
+    int nTargets = (int)localTargetLanes.size();
+    throwErrorIf(maxNTargets < nTargets, "too many target lanes, %d.", nTargets);
+
+    std::vector<Complex> phaseBuf(Qone << nTargets);
+    for (int idx = 0; idx < (int)phaseBuf.size(); ++idx)
+        phaseBuf[idx] = Complex(_phases[idx]);
+    const Complex *phases = phaseBuf.data();
+    qgate::IdList lanes(localTargetLanes);
+    const int *lanesPtr = lanes.data();
+
+    /* key bits given by the lower 8 bits of state indices. */
+    std::vector<int> lowKeyBuf(256, 0);
+    for (int idx = 0; idx < 256; ++idx) {
+        for (int bit = 0; bit < nTargets; ++bit) {
+            if (lanes[bit] < 8)
+                lowKeyBuf[idx] |= ((idx >> lanes[bit]) & 1) << bit;
+        }
+    }
+    const int *lowKeys = lowKeyBuf.data();
+
+    /* states in a run of 2^(the lowest target lane) share the same phase. */
+    int lowestLane = *std::min_element(lanes.begin(), lanes.end());
+    QstateSize runSize = Qone << lowestLane;
+    real *v = reinterpret_cast<real*>(qstates.getPtr());
+    const Complex one(1.);
+
+    auto diagonalFunc = [=](int threadIdx, QstateIdx spanBegin, QstateIdx spanEnd) {
+        QstateIdx idx = spanBegin;
+        while (idx < spanEnd) {
+            QstateSize blockSize = std::max(runSize, (QstateSize)256);
+            QstateSize n = std::min(blockSize - (idx & (blockSize - 1)), spanEnd - idx);
+            int highKey = 0;
+            for (int bit = 0; bit < nTargets; ++bit) {
+                if (8 <= lanesPtr[bit])
+                    highKey |= (int)((idx >> lanesPtr[bit]) & 1) << bit;
+            }
+            if (256 <= runSize) {
+                /* states are not touched for phases of 1, e.g. those whose control bits are 0. */
+                const Complex &phase = phases[highKey];
+                if (phase != one)
+                    mulPhase(&v[2 * idx], n, phase.real(), phase.imag());
+            }
+            else {
+                for (QstateIdx offset = 0; offset < n; ++offset) {
+                    const Complex &phase = phases[highKey | lowKeys[(idx + offset) & 255]];
+                    mulPhase(&v[2 * (idx + offset)], 1, phase.real(), phase.imag());
+                }
+            }
+            idx += n;
+        }
+    };
+    Parallel().distributeStates(diagonalFunc, Qone << qstates.getNLanes());
+}
+
 template<class real>
 void CPUQubitProcessor<real>::synchronize() {
 }
@@ -33,6 +33,8 @@ public:
     
     virtual void resetQubitStates(qgate::QubitStates &qstates);
 
+    virtual void setStates(qgate::QubitStates &qstates, const void *array, QstateSize nStates);
+
     virtual double calcProbability(const qgate::QubitStates &qstates, int localLane);
 
     virtual void join(qgate::QubitStates &qstates,
@@ -50,12 +52,40 @@ public:
 
     virtual void applyControlledGate(const Matrix2x2C64 &mat, QubitStates &qstates,
                                      const qgate::IdList &localControlLanes, int localTargetLane);
+
+    virtual void applyMultiQubitGate(const ComplexType<double> *mat, QubitStates &qstates,
+                                     const qgate::IdList &localControlLanes,
+                                     const qgate::IdList &localTargetLanes);
+
+    virtual void applyDiagonalGate(const ComplexType<double> *phases, QubitStates &qstates,
+                                   const qgate::IdList &localTargetLanes);
     
 private:
+    /* gates classified by matrices.  Diagonal and permutation gates have kernels touching fewer states. */
+    enum GateKind {
+        gateDense = 0,
+        gateIdentity,
+        gatePhase,         /* diag(1, p), touches |1> states only. */
+        gateDiagonal,      /* diag(p0, p1) */
+        gateSwap,          /* [[0, 1], [1, 0]] */
+        gateAntiDiagonal,  /* [[0, p01], [p10, 0]] */
+    };
+
+    static GateKind classifyGate(const Matrix2x2C64 &mat);
+
     template<class G>
     void run(int nLanes, int nInputBits,
              const qgate::IdList &bitShiftMap, const G &gatef);
 
+    /* run f(idx_0, n) for contiguous ranges of states, [idx_0, idx_0 + n), whose target lane bit is 0. */
+    template<class F>
+    void runSpans(int nLanes, int localLane, const F &f);
+
+    bool applySpecializedGate(const Matrix2x2C64 &mat, CPUQubitStates<real> &qstates, int localLane);
+
+    bool applySpecializedControlledGate(const Matrix2x2C64 &mat, CPUQubitStates<real> &qstates,
+                                        const qgate::IdList &localControlLanes, int localTargetLane);
+
     real _calcProbability(const CPUQubitStates<real> &qstates, int localLane);
     
     template<class R, class F>
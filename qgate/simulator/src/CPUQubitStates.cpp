@@ -1,4 +1,6 @@
 #include "CPUQubitStates.h"
+#include "CPUMmapChunkStore.h"
+#include "Parallel.h"
 #include <string.h>
 #include <algorithm>
 
@@ -9,7 +11,7 @@ using qgate::Qone;
 
 
 template<class real>
-CPUQubitStates<real>::CPUQubitStates() {
+CPUQubitStates<real>::CPUQubitStates(bool useChunks) : useChunks_(useChunks), chunked_(false) {
     if (sizeof(real) == sizeof(float))
         prec_ = qgate::precFP32;
     else
@@ -27,14 +29,30 @@ void CPUQubitStates<real>::allocate(const int nLanes) {
     assert(qstates_ == NULL);
     nLanes_ = nLanes;
     nStates_ = Qone << nLanes;
-    qstates_ = (Complex*)malloc(sizeof(Complex) * nStates_);
+    chunked_ = useChunks_ && mmapChunkStore().useChunks(nStates_);
+    if (chunked_)
+        qstates_ = (Complex*)mmapChunkStore().allocate(nStates_, sizeof(Complex));
+    else {
+        qstates_ = (Complex*)malloc(sizeof(Complex) * nStates_);
+        /* first touch, pages are placed on NUMA nodes of workers processing them. */
+        Complex *cmp = qstates_;
+        auto setZeroFunc = [=](int threadIdx, QstateIdx spanBegin, QstateIdx spanEnd) {
+            memset(&cmp[spanBegin], 0, sizeof(Complex) * (spanEnd - spanBegin));
+        };
+        qgate::Parallel().distributeStates(setZeroFunc, nStates_);
+    }
 }
     
 template<class real>
 void CPUQubitStates<real>::deallocate() {
-    if (qstates_ != NULL)
-        free(qstates_);
+    if (qstates_ != NULL) {
+        if (chunked_)
+            mmapChunkStore().deallocate(qstates_, nStates_, sizeof(Complex));
+        else
+            free(qstates_);
+    }
     qstates_ = NULL;
+    chunked_ = false;
 }
 
 template class CPUQubitStates<float>;
@@ -15,7 +15,8 @@ template<class real>
 class CPUQubitStates : public qgate::QubitStates {
     typedef ComplexType<real> Complex;
 public:
-    CPUQubitStates();
+    /* buffers are allocated in memory-mapped chunks if useChunks is true. */
+    CPUQubitStates(bool useChunks = false);
 
     ~CPUQubitStates();
     
@@ -49,6 +50,8 @@ private:
     QstateSize nStates_;
     int nLanes_;
     Complex *qstates_;
+    bool useChunks_;
+    bool chunked_;
     
     /* hidden copy ctor */
     CPUQubitStates(const CPUQubitStates &);
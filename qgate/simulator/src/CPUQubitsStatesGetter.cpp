@@ -25,6 +25,10 @@ inline R abs2(const std::complex<R> &c) {
     return c.real() * c.real() + c.imag() * c.imag();
 }
 
+inline bool parity(QstateIdx idx) {
+    return __builtin_parityll((unsigned long long)idx) != 0;
+}
+
 template<class R>
 inline std::complex<R> null(const std::complex<R> &c) {
     return c;
@@ -263,5 +267,50 @@ createSamplingPool(const qgate::IdListList &laneTransformTables,
     return new CPUSamplingPool<real>(prob, nLanes, emptyLanes);
 }
 
+template<class real> void CPUQubitsStatesGetter<real>::
+calcPauliExpectations(double *values, const qgate::QubitStates &_qstates,
+                      QstateIdx xMask, const QstateIdx *zMasks, int nZMasks) {
+    const CPUQubitStates<real> &qstates = static_cast<const CPUQubitStates<real>&>(_qstates);
+    typedef std::complex<double> DoubleComplex;
+
+    /* read-only pass, terms sharing xMask are accumulated at once. */
+    auto accumulate = [=, &qstates](DoubleComplex *sums, QstateIdx spanBegin, QstateIdx spanEnd) {
+        for (QstateIdx idx = spanBegin; idx < spanEnd; ++idx) {
+            const ComplexType<real> &flipped = qstates[idx ^ xMask];
+            const ComplexType<real> &state = qstates[idx];
+            DoubleComplex v = DoubleComplex(std::conj(flipped) * state);
+            for (int iTerm = 0; iTerm < nZMasks; ++iTerm) {
+                if (parity(idx & zMasks[iTerm]))
+                    sums[iTerm] -= v;
+                else
+                    sums[iTerm] += v;
+            }
+        }
+    };
+
+    QstateSize nStates = Qone << qstates.getNLanes();
+    DoubleComplex *results = reinterpret_cast<DoubleComplex*>(values);
+    for (int iTerm = 0; iTerm < nZMasks; ++iTerm)
+        results[iTerm] = DoubleComplex();
+
+    if (nStates < 256) {
+        accumulate(results, 0, nStates);
+        return;
+    }
+
+    Parallel parallel;
+    int nWorkers = parallel.getNWorkers(nStates);
+    DoubleComplex *partialSums = new DoubleComplex[nWorkers * nZMasks]();
+    auto forloop = [=](int threadIdx, QstateIdx spanBegin, QstateIdx spanEnd) {
+        accumulate(&partialSums[threadIdx * nZMasks], spanBegin, spanEnd);
+    };
+    parallel.distribute(forloop, 0LL, nStates, 256LL);
+    for (int idx = 0; idx < nWorkers; ++idx) {
+        for (int iTerm = 0; iTerm < nZMasks; ++iTerm)
+            results[iTerm] += partialSums[idx * nZMasks + iTerm];
+    }
+    delete[] partialSums;
+}
+
 template class CPUQubitsStatesGetter<float>;
 template class CPUQubitsStatesGetter<double>;
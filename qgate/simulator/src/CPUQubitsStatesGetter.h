@@ -22,6 +22,9 @@ class CPUQubitsStatesGetter : public qgate::QubitsStatesGetter {
     createSamplingPool(const qgate::IdListList &laneTransformTables,
                        const qgate::QubitStatesList &qstatesList,
                        int nLanes, int nHiddenLanes, const qgate::IdList &emptyLanes);
+
+    void calcPauliExpectations(double *values, const qgate::QubitStates &qstates,
+                               qgate::QstateIdx xMask, const qgate::QstateIdx *zMasks, int nZMasks);
 };
     
 }
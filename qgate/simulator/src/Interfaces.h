@@ -31,6 +31,11 @@ struct QubitProcessor {
     
     virtual void resetQubitStates(qgate::QubitStates &qstates) = 0;
 
+    /* copy states from array of complex values whose precision is the same as qstates. */
+    virtual void setStates(qgate::QubitStates &qstates, const void *array, QstateSize nStates) {
+        throwError("setStates() is not implemented.");
+    }
+
     virtual double calcProbability(const qgate::QubitStates &qstates, int localLane) = 0;
 
     virtual void join(qgate::QubitStates &qstates, const QubitStatesList &qstatesList, int nNewLanes) = 0;
@@ -47,6 +52,39 @@ struct QubitProcessor {
 
     virtual void applyControlledGate(const Matrix2x2C64 &mat, QubitStates &qstates,
                                      const IdList &localControlLanes, int localTargetLane) = 0;
+
+    /* apply 2^n x 2^n matrix to n target lanes.  mat is a row-major array, and
+     * the i-th target lane corresponds to the i-th bit of row/column indices. */
+    virtual void applyMultiQubitGate(const ComplexType<double> *mat, QubitStates &qstates,
+                                     const IdList &localControlLanes,
+                                     const IdList &localTargetLanes) {
+        throwError("multi qubit gate is not supported.");
+    }
+
+    /* multiply states by a diagonal of 2^n x 2^n matrix applied to n target lanes.
+     * The i-th target lane corresponds to the i-th bit of indices of phases. */
+    virtual void applyDiagonalGate(const ComplexType<double> *phases, QubitStates &qstates,
+                                   const IdList &localTargetLanes) {
+        throwError("diagonal gate is not supported.");
+    }
+
+    /* apply gates in a given order.  Processors are able to override to optimize. */
+    virtual void applyGates(const GateRecord *records, int nRecords, QubitStates &qstates) {
+        for (int idx = 0; idx < nRecords; ++idx) {
+            const GateRecord &rec = records[idx];
+            if (rec.controlMask == 0) {
+                applyGate(rec.mat, qstates, (int)rec.targetLane);
+            }
+            else {
+                IdList localControlLanes;
+                for (int lane = 0; lane < 64; ++lane) {
+                    if ((rec.controlMask >> lane) & 1)
+                        localControlLanes.push_back(lane);
+                }
+                applyControlledGate(rec.mat, qstates, localControlLanes, (int)rec.targetLane);
+            }
+        }
+    }
 };
 
 
@@ -69,6 +107,14 @@ struct QubitsStatesGetter {
                                                     const QubitStatesList &qstatesList,
                                                     int nLanes, int nHiddenLanes,
                                                     const IdList &emptyLanes) = 0;
+
+    /* sums of conj(qstates[idx ^ xMask]) * qstates[idx] * (-1)^popcount(idx & zMasks[k])
+     * for terms sharing xMask, calculated in one pass.
+     * values is an array of complex<double> whose length is nZMasks. */
+    virtual void calcPauliExpectations(double *values, const QubitStates &qstates,
+                                       QstateIdx xMask, const QstateIdx *zMasks, int nZMasks) {
+        throwError("calcPauliExpectations() is not implemented.");
+    }
 };
 
 
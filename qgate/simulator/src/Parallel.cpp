@@ -7,10 +7,16 @@
 #ifdef __linux__
 #  include <sched.h>
 #  include <unistd.h>
+#  include <pthread.h>
+#  include <dirent.h>
 #endif
 
 #include "Parallel.h"
 #include "Types.h"
+#include <vector>
+#include <stdio.h>
+#include <mutex>
+#include <condition_variable>
 
 using namespace qgate;
 
@@ -53,6 +59,16 @@ int Parallel::getDefaultNWorkers() {
     return nDefaultWorkers_;
 }
 
+void Parallel::setDefaultNWorkers(int nWorkers) {
+    if (nWorkers <= 0) {
+        /* use default */
+        nDefaultWorkers_ = -1;
+        getDefaultNWorkers();
+        return;
+    }
+    nDefaultWorkers_ = nWorkers;
+}
+
 int Parallel::getNWorkers() const {
     return nWorkers_;
 }
@@ -65,3 +81,267 @@ int Parallel::getNWorkers(QstateSize nLoops) const {
     }
     return getNWorkers();
 }
+
+
+/* ThreadPool */
+
+namespace {
+
+#ifdef __linux__
+
+int getCpuNode(int cpu) {
+    char path[64];
+    snprintf(path, sizeof(path), "/sys/devices/system/cpu/cpu%d", cpu);
+    DIR *dir = opendir(path);
+    if (dir == NULL)
+        return 0;
+    int node = 0;
+    struct dirent *ent;
+    while ((ent = readdir(dir)) != NULL) {
+        if (sscanf(ent->d_name, "node%d", &node) == 1)
+            break;
+    }
+    closedir(dir);
+    return node;
+}
+
+/* cpus available for the process, sorted by NUMA node. */
+std::vector<int> getSortedCpus() {
+    cpu_set_t cpuset;
+    CPU_ZERO(&cpuset);
+    sched_getaffinity(0, sizeof(cpuset), &cpuset);
+    std::vector<std::pair<int, int>> nodeCpus;
+    for (int cpu = 0; cpu < CPU_SETSIZE; ++cpu) {
+        if (CPU_ISSET(cpu, &cpuset))
+            nodeCpus.push_back(std::make_pair(getCpuNode(cpu), cpu));
+    }
+    std::sort(nodeCpus.begin(), nodeCpus.end());
+    std::vector<int> cpus;
+    for (auto &nodeCpu : nodeCpus)
+        cpus.push_back(nodeCpu.second);
+    return cpus;
+}
+
+void pinThread(int cpu) {
+    cpu_set_t cpuset;
+    CPU_ZERO(&cpuset);
+    CPU_SET(cpu, &cpuset);
+    pthread_setaffinity_np(pthread_self(), sizeof(cpuset), &cpuset);
+}
+
+#endif
+
+/* cpus for workers.  Workers are spread over cpus, and consecutive workers are on the same node. */
+std::vector<int> assignCpus(int nWorkers) {
+    std::vector<int> assigned;
+#ifdef __linux__
+    std::vector<int> cpus = getSortedCpus();
+    int nCpus = (int)cpus.size();
+    if (nCpus == 0)
+        return assigned;
+    for (int idx = 0; idx < nWorkers; ++idx) {
+        if (nWorkers <= nCpus)
+            assigned.push_back(cpus[(long long)idx * nCpus / nWorkers]);
+        else
+            assigned.push_back(cpus[idx % nCpus]);
+    }
+#endif
+    return assigned;
+}
+
+}
+
+
+struct ThreadPool::Workers {
+    Workers() : job(NULL), nJobWorkers(0), nRunning(0), generation(0), stop(false), busy(false) { }
+
+    std::vector<std::thread> threads;
+    std::mutex mutex;
+    std::condition_variable cvStart;
+    std::condition_variable cvDone;
+    const std::function<void(int)> *job;
+    int nJobWorkers;
+    int nRunning;
+    /* cpus assigned to workers, empty if workers are not pinned. */
+    std::vector<int> cpus;
+    unsigned long long generation;
+    bool stop;
+    std::atomic<bool> busy;
+};
+
+
+ThreadPool &ThreadPool::instance() {
+    /* Not deleted to avoid joining threads in static destruction. */
+    static ThreadPool *pool = new ThreadPool();
+    return *pool;
+}
+
+ThreadPool::ThreadPool() {
+    workers_ = NULL;
+    pid_ = -1;
+    pinning_ = -1;
+}
+
+ThreadPool::~ThreadPool() {
+    shutdown();
+}
+
+ThreadPool::Workers *ThreadPool::getWorkers() {
+#ifdef __linux__
+    /* Threads are not copied to child processes.  Old workers are abandoned after fork. */
+    int pid = (int)getpid();
+    if (pid_ != pid) {
+        workers_ = NULL;
+        pid_ = pid;
+    }
+#endif
+    if (workers_ == NULL)
+        workers_ = new Workers();
+    return workers_;
+}
+
+void ThreadPool::createThreads(Workers *workers, int nThreads) {
+    std::lock_guard<std::mutex> lock(workers->mutex);
+    for (int idx = (int)workers->threads.size(); idx < nThreads; ++idx)
+        workers->threads.push_back(std::thread(ThreadPool::threadLoop,
+                                               workers, idx + 1, workers->generation));
+}
+
+void ThreadPool::threadLoop(Workers *workers, int threadIdx, unsigned long long generation) {
+#ifdef __linux__
+    cpu_set_t original;
+    pthread_getaffinity_np(pthread_self(), sizeof(original), &original);
+#endif
+    int pinnedCpu = -1;
+    while (true) {
+        const std::function<void(int)> *job;
+        int cpu;
+        {
+            std::unique_lock<std::mutex> lock(workers->mutex);
+            workers->cvStart.wait(lock, [=]() {
+                        return workers->stop || (workers->generation != generation); });
+            if (workers->stop)
+                return;
+            generation = workers->generation;
+            if (workers->nJobWorkers <= threadIdx)
+                continue;
+            job = workers->job;
+            cpu = threadIdx < (int)workers->cpus.size() ? workers->cpus[threadIdx] : -1;
+        }
+        if (cpu != pinnedCpu) {
+#ifdef __linux__
+            if (cpu == -1)
+                pthread_setaffinity_np(pthread_self(), sizeof(original), &original);
+            else
+                pinThread(cpu);
+#endif
+            pinnedCpu = cpu;
+        }
+        (*job)(threadIdx);
+        {
+            std::lock_guard<std::mutex> lock(workers->mutex);
+            --workers->nRunning;
+            if (workers->nRunning == 0)
+                workers->cvDone.notify_one();
+        }
+    }
+}
+
+bool ThreadPool::run(const std::function<void(int)> &f, int nWorkers) {
+    Workers *workers = getWorkers();
+    if (workers->busy.exchange(true))
+        return false;
+
+    /* on leaving run(), even by an exception thrown from f(0), waits for workers running
+     * the job, restores the affinity of the calling thread and clears the busy flag. */
+    struct RunGuard {
+        Workers *workers;
+        bool started;
+        int cpu;
+#ifdef __linux__
+        cpu_set_t original;
+#endif
+        ~RunGuard() {
+#ifdef __linux__
+            if (cpu != -1)
+                pthread_setaffinity_np(pthread_self(), sizeof(original), &original);
+#endif
+            if (started) {
+                std::unique_lock<std::mutex> lock(workers->mutex);
+                workers->cvDone.wait(lock, [this]() { return workers->nRunning == 0; });
+                workers->job = NULL;
+            }
+            workers->busy = false;
+        }
+    } guard;
+    guard.workers = workers;
+    guard.started = false;
+    guard.cpu = -1;
+
+    bool pin = getPinning();
+    int nThreads = nWorkers - 1;
+    if ((int)workers->threads.size() < nThreads)
+        createThreads(workers, nThreads);
+    int cpu = -1;
+    {
+        std::lock_guard<std::mutex> lock(workers->mutex);
+        if (!pin)
+            workers->cpus.clear();
+        else if ((int)workers->cpus.size() != nWorkers)
+            workers->cpus = assignCpus(nWorkers);
+        if (!workers->cpus.empty())
+            cpu = workers->cpus[0];
+        workers->job = &f;
+        workers->nJobWorkers = nWorkers;
+        workers->nRunning = nThreads;
+        ++workers->generation;
+    }
+    guard.started = true;
+    workers->cvStart.notify_all();
+
+    /* run the 0-th worker in the calling thread, pinned while running. */
+#ifdef __linux__
+    if (cpu != -1) {
+        pthread_getaffinity_np(pthread_self(), sizeof(guard.original), &guard.original);
+        pinThread(cpu);
+        guard.cpu = cpu;
+    }
+#endif
+    f(0);
+    return true;
+}
+
+void ThreadPool::shutdown() {
+    Workers *workers = getWorkers();
+    if (workers->busy.exchange(true))
+        throwError("Thread pool is running.");
+    {
+        std::lock_guard<std::mutex> lock(workers->mutex);
+        workers->stop = true;
+    }
+    workers->cvStart.notify_all();
+    for (auto &thread : workers->threads)
+        thread.join();
+    workers->threads.clear();
+    workers->stop = false;
+    workers->busy = false;
+}
+
+void ThreadPool::setPinning(bool pin) {
+    pinning_ = pin ? 1 : 0;
+}
+
+bool ThreadPool::getPinning() {
+    if (pinning_ == -1) {
+        const char *env = getenv("QGATE_PIN_WORKERS");
+        pinning_ = ((env != NULL) && (env[0] != '0')) ? 1 : 0;
+    }
+    return pinning_ == 1;
+}
+
+int ThreadPool::getNThreads() const {
+    if (workers_ == NULL)
+        return 0;
+    return (int)workers_->threads.size();
+}
+
@@ -2,18 +2,77 @@
 
 #include "Types.h"
 #include <thread>
+#include <atomic>
 #include <functional>
 #include <algorithm>
 
 namespace qgate {
 
+/* Process-wide persistent worker threads used by Parallel. */
+class ThreadPool {
+public:
+    static ThreadPool &instance();
+
+    /* run f(threadIdx) for threadIdx in [0, nWorkers), the 0-th worker runs in the calling thread.
+     * Returns false without running f if the pool is already running other functors. */
+    bool run(const std::function<void(int)> &f, int nWorkers);
+
+    /* join all worker threads.  Threads are created again when required. */
+    void shutdown();
+
+    int getNThreads() const;
+
+    /* pin workers to cpus.  Cpus are sorted by NUMA node and assigned to workers in order,
+     * so each worker runs on the same node in every call.  Default is given by QGATE_PIN_WORKERS. */
+    void setPinning(bool pin);
+
+    bool getPinning();
+
+private:
+    ThreadPool();
+    ~ThreadPool();
+
+    struct Workers;
+    Workers *getWorkers();
+    void createThreads(Workers *workers, int nThreads);
+    static void threadLoop(Workers *workers, int threadIdx, unsigned long long generation);
+
+    Workers *workers_;
+    int pid_;
+    int pinning_;
+
+    /* hidden copy ctor */
+    ThreadPool(const ThreadPool &);
+};
+
+
 struct Parallel {
 
     template<class Iterator, class C>
     void distribute(const C &functor, Iterator begin, Iterator end, Iterator spanBase = 16) {
         int nWorkers = getNWorkers(end - begin);
-        Iterator span = (end - begin + nWorkers - 1) / nWorkers;
-        span = ((span + spanBase - 1) / spanBase) * spanBase;
+        Iterator span = getSpan(end - begin, nWorkers, spanBase);
+        distribute(functor, begin, end, span, nWorkers);
+    }
+
+    /* distribute state indices in [0, nStates) with the same spans as gate loops over
+     * nStates / 2 indices.  The same worker touches the same slice of qubit states in every call. */
+    template<class C>
+    void distributeStates(const C &functor, QstateSize nStates) {
+        QstateSize nLoops = nStates / 2;
+        int nWorkers = getNWorkers(nLoops);
+        QstateSize span = getSpan(nLoops, nWorkers, (QstateSize)256) * 2;
+        distribute(functor, (QstateIdx)0, (QstateIdx)nStates, span, nWorkers);
+    }
+
+    template<class Iterator>
+    static Iterator getSpan(Iterator nLoops, int nWorkers, Iterator spanBase) {
+        Iterator span = (nLoops + nWorkers - 1) / nWorkers;
+        return ((span + spanBase - 1) / spanBase) * spanBase;
+    }
+
+    template<class Iterator, class C>
+    void distribute(const C &functor, Iterator begin, Iterator end, Iterator span, int nWorkers) {
         auto distributed = [=](int threadIdx) {
             Iterator spanBegin = std::min(begin + span * threadIdx, end);
             Iterator spanEnd = std::min(begin + span * (threadIdx + 1), end);
@@ -64,6 +123,10 @@ struct Parallel {
     void run(F &f, int nWorkers) {
         functor_ = f;
         if (1 < nWorkers) {
+            /* workers in thread pool run functors. */
+            if (ThreadPool::instance().run(functor_, nWorkers))
+                return;
+            /* thread pool is busy(nested call).  Spawning threads. */
             int nThreads = nWorkers - 1;
             std::thread *threads = (std::thread*)malloc(sizeof(std::thread) * nThreads);
 
@@ -99,6 +162,8 @@ struct Parallel {
     int getNWorkers(QstateSize nLoops) const;
 
     static int getDefaultNWorkers();
+
+    static void setDefaultNWorkers(int nWorkers);
     
 private:
 
@@ -42,6 +42,14 @@ struct MatrixType {
 /* Matrix for public interface. */
 typedef MatrixType<ComplexType<double>, 2> Matrix2x2C64;
 
+/* Packed gate record for batched gate application.
+ * Layout should be the same as numpy dtype defined in native_qubit_processor.py. */
+struct GateRecord {
+    Matrix2x2C64 mat;
+    QstateIdx controlMask;  /* 0 if not controlled. */
+    QstateIdx targetLane;
+};
+
 
 enum Precision {
     precUnknown = 0,
@@ -1,7 +1,9 @@
 #include "pyglue.h"
+#include "Parallel.h"
 #include "CPUQubitStates.h"
 #include "CPUQubitProcessor.h"
 #include "CPUQubitsStatesGetter.h"
+#include "CPUMmapChunkStore.h"
 
 namespace qcpu = qgate_cpu;
 
@@ -11,14 +13,15 @@ extern "C"
 PyObject *qubit_states_new(PyObject *module, PyObject *args) {
     
     PyObject *dtype;
-    if (!PyArg_ParseTuple(args, "O", &dtype))
+    int useChunks = 0;
+    if (!PyArg_ParseTuple(args, "O|i", &dtype, &useChunks))
         return NULL;
 
     qgate::QubitStates *qstates = NULL;
     if (isFloat64(dtype))
-        qstates = new qcpu::CPUQubitStates<double>();
+        qstates = new qcpu::CPUQubitStates<double>(useChunks != 0);
     else if (isFloat32(dtype))
-        qstates = new qcpu::CPUQubitStates<float>();
+        qstates = new qcpu::CPUQubitStates<float>(useChunks != 0);
     else
         assert("Must not reach.");
     PyObject *obj = PyArrayScalar_New(UInt64);
@@ -69,12 +72,91 @@ PyObject *qubits_states_getter_new(PyObject *module, PyObject *args) {
     return obj;
 }
 
+extern "C"
+PyObject *parallel_set_n_workers(PyObject *module, PyObject *args) {
+    int nWorkers;
+    if (!PyArg_ParseTuple(args, "i", &nWorkers))
+        return NULL;
+    qgate::Parallel::setDefaultNWorkers(nWorkers);
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+extern "C"
+PyObject *parallel_get_n_workers(PyObject *module, PyObject *args) {
+    return Py_BuildValue("i", qgate::Parallel::getDefaultNWorkers());
+}
+
+extern "C"
+PyObject *parallel_shutdown(PyObject *module, PyObject *args) {
+    qgate::ThreadPool::instance().shutdown();
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+extern "C"
+PyObject *parallel_set_pinning(PyObject *module, PyObject *args) {
+    int pin;
+    if (!PyArg_ParseTuple(args, "p", &pin))
+        return NULL;
+    qgate::ThreadPool::instance().setPinning(pin != 0);
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+extern "C"
+PyObject *parallel_get_pinning(PyObject *module, PyObject *args) {
+    return PyBool_FromLong(qgate::ThreadPool::instance().getPinning());
+}
+
+extern "C"
+PyObject *mmap_chunk_store_initialize(PyObject *module, PyObject *args) {
+    PyObject *objDirectories;
+    int po2idxPerChunk;
+    if (!PyArg_ParseTuple(args, "Oi", &objDirectories, &po2idxPerChunk))
+        return NULL;
+
+    std::vector<std::string> directories;
+    PyObject *iter = PyObject_GetIter(objDirectories);
+    PyObject *item;
+    while ((item = PyIter_Next(iter)) != NULL) {
+        const char *dir = getStringFromObject(item);
+        if (dir != NULL)
+            directories.push_back(dir);
+        Py_DECREF(item);
+    }
+    Py_DECREF(iter);
+    if (PyErr_Occurred())
+        return NULL;
+
+    TRY {
+        qcpu::mmapChunkStore().initialize(directories, po2idxPerChunk);
+    } CATCH_ERROR_AND_RETURN;
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+extern "C"
+PyObject *mmap_chunk_store_finalize(PyObject *module, PyObject *args) {
+    qcpu::mmapChunkStore().finalize();
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 
 static
 PyMethodDef cpuext_methods[] = {
     {"qubit_states_new", qubit_states_new, METH_VARARGS},
     {"qubit_processor_new", qubit_processor_new, METH_VARARGS},
     {"qubits_states_getter_new", qubits_states_getter_new, METH_VARARGS},
+    {"parallel_set_n_workers", parallel_set_n_workers, METH_VARARGS},
+    {"parallel_get_n_workers", parallel_get_n_workers, METH_VARARGS},
+    {"parallel_shutdown", parallel_shutdown, METH_VARARGS},
+    {"parallel_set_pinning", parallel_set_pinning, METH_VARARGS},
+    {"parallel_get_pinning", parallel_get_pinning, METH_VARARGS},
+    {"mmap_chunk_store_initialize", mmap_chunk_store_initialize, METH_VARARGS},
+    {"mmap_chunk_store_finalize", mmap_chunk_store_finalize, METH_VARARGS},
     {NULL},
 };
 
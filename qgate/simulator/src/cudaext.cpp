@@ -1,6 +1,7 @@
 /* -*- c++ -*- */
 
 #include "pyglue.h"
+#include "Parallel.h"
 #include "CUDAQubitStates.h"
 #include "CUDAQubitProcessor.h"
 #include "CUDAQubitsStatesGetter.h"
@@ -123,6 +124,28 @@ PyObject *qubits_states_getter_new(PyObject *module, PyObject *args) {
     PyArrayScalar_ASSIGN(obj, UInt64, (npy_uint64)qproc);
     return obj;
 }
+extern "C"
+PyObject *parallel_set_n_workers(PyObject *module, PyObject *args) {
+    int nWorkers;
+    if (!PyArg_ParseTuple(args, "i", &nWorkers))
+        return NULL;
+    qgate::Parallel::setDefaultNWorkers(nWorkers);
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+extern "C"
+PyObject *parallel_get_n_workers(PyObject *module, PyObject *args) {
+    return Py_BuildValue("i", qgate::Parallel::getDefaultNWorkers());
+}
+
+extern "C"
+PyObject *parallel_shutdown(PyObject *module, PyObject *args) {
+    qgate::ThreadPool::instance().shutdown();
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 
 static
 PyMethodDef cudaext_methods[] = {
@@ -132,6 +155,9 @@ PyMethodDef cudaext_methods[] = {
     {"qubit_states_new", qubit_states_new, METH_VARARGS},
     {"qubit_processor_new", qubit_processor_new, METH_VARARGS},
     {"qubits_states_getter_new", qubits_states_getter_new, METH_VARARGS},
+    {"parallel_set_n_workers", parallel_set_n_workers, METH_VARARGS},
+    {"parallel_get_n_workers", parallel_get_n_workers, METH_VARARGS},
+    {"parallel_shutdown", parallel_shutdown, METH_VARARGS},
     {NULL},
 };
 
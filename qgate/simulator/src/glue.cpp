@@ -59,6 +59,14 @@ struct MatFactory_3 : MatFactory {
     const MatFunc_3 matfunc_;
 };
 
+/* matrix given as ndarray, used for fused gates. */
+struct MatFactory_ndarray : MatFactory {
+    void operator()(qgate::Matrix2x2C64 *mat, PyObject *args) const {
+        PyObject *objMat = PyTuple_GET_ITEM(args, 0);
+        matrix2x2FromNdArray(*mat, objMat);
+    }
+};
+
 MatFactory_3 gen_U(qgate::U_mat);
 MatFactory_2 gen_U2(qgate::U2_mat);
 MatFactory_1 gen_U1(qgate::U1_mat);
@@ -80,6 +88,8 @@ MatFactory_1 gen_ExpiZ(qgate::ExpiZ_mat);
 
 MatFactory_0 gen_SH(qgate::SH_mat);
 
+MatFactory_ndarray gen_MAT;
+
 
 PyObject *genPtrObj(const MatFactory &matFactory) {
     PyObject *obj = PyArrayScalar_New(UInt64);
@@ -128,6 +138,8 @@ PyObject *register_matrix_factory(PyObject *module, PyObject *args) {
         return genPtrObj(gen_ExpiZ);
     if (strcmp(gateType, "SH") == 0)
         return genPtrObj(gen_SH);
+    if (strcmp(gateType, "MAT") == 0)
+        return genPtrObj(gen_MAT);
 
     PyErr_SetString(PyExc_RuntimeError, "Unknown gate type.");
     return NULL;
@@ -298,6 +310,30 @@ PyObject *qubit_processor_reset_qubit_states(PyObject *module, PyObject *args) {
     return Py_None;
 }
 
+extern "C"
+PyObject *qubit_processor_set_states(PyObject *module, PyObject *args) {
+    PyObject *objQproc, *objQstates, *objArray;
+    if (!PyArg_ParseTuple(args, "OOO", &objQproc, &objQstates, &objArray))
+        return NULL;
+
+    qgate::QubitStates *qstates = qubitStates(objQstates);
+    npy_intp itemSize = PyArray_ITEMSIZE((PyArrayObject*)objArray);
+    npy_intp expected = (qstates->getPrec() == qgate::precFP32) ? sizeof(float) * 2 : sizeof(double) * 2;
+    if (itemSize != expected) {
+        PyErr_SetString(PyExc_ValueError, "item size of array does not match precision.");
+        return NULL;
+    }
+    qgate::QstateIdx arraySize = 0;
+    void *array = getArrayBuffer(objArray, &arraySize);
+
+    TRY {
+        qproc(objQproc)->setStates(*qstates, array, arraySize);
+    } CATCH_ERROR_AND_RETURN;
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 extern "C"
 PyObject *qubit_processor_calc_probability(PyObject *module, PyObject *args) {
     PyObject *objQproc, *objQstates;
@@ -431,6 +467,81 @@ PyObject *qubit_processor_apply_controlled_gate(PyObject *module, PyObject *args
 }
 
 
+extern "C"
+PyObject *qubit_processor_apply_multi_qubit_gate(PyObject *module, PyObject *args) {
+    PyObject *objQproc, *objMat, *objQstates, *objLocalControlLanes, *objLocalTargetLanes;
+    if (!PyArg_ParseTuple(args, "OOOOO", &objQproc, &objMat, &objQstates,
+                          &objLocalControlLanes, &objLocalTargetLanes))
+        return NULL;
+
+    qgate::IdList localControlLanes = toIdList(objLocalControlLanes);
+    qgate::IdList localTargetLanes = toIdList(objLocalTargetLanes);
+
+    PyArrayObject *arrMat = (PyArrayObject*)objMat;
+    qgate::QstateSize dim = qgate::Qone << localTargetLanes.size();
+    if (PyArray_SIZE(arrMat) != dim * dim) {
+        PyErr_SetString(PyExc_ValueError, "matrix size does not match the number of target lanes.");
+        return NULL;
+    }
+    void *mat = PyArray_DATA(arrMat);
+    
+    qgate::QubitStates *qstates = qubitStates(objQstates);
+    qproc(objQproc)->applyMultiQubitGate(static_cast<const qgate::ComplexType<double>*>(mat),
+                                         *qstates, localControlLanes, localTargetLanes);
+    
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+extern "C"
+PyObject *qubit_processor_apply_diagonal_gate(PyObject *module, PyObject *args) {
+    PyObject *objQproc, *objPhases, *objQstates, *objLocalTargetLanes;
+    if (!PyArg_ParseTuple(args, "OOOO", &objQproc, &objPhases, &objQstates, &objLocalTargetLanes))
+        return NULL;
+
+    qgate::IdList localTargetLanes = toIdList(objLocalTargetLanes);
+
+    PyArrayObject *arrPhases = (PyArrayObject*)objPhases;
+    qgate::QstateSize size = qgate::Qone << localTargetLanes.size();
+    if (PyArray_SIZE(arrPhases) != size) {
+        PyErr_SetString(PyExc_ValueError, "size of phases does not match the number of target lanes.");
+        return NULL;
+    }
+    void *phases = PyArray_DATA(arrPhases);
+
+    qgate::QubitStates *qstates = qubitStates(objQstates);
+    TRY {
+        qproc(objQproc)->applyDiagonalGate(static_cast<const qgate::ComplexType<double>*>(phases),
+                                           *qstates, localTargetLanes);
+    } CATCH_ERROR_AND_RETURN;
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+extern "C"
+PyObject *qubit_processor_apply_gates(PyObject *module, PyObject *args) {
+    PyObject *objQproc, *objRecords, *objQstates;
+    if (!PyArg_ParseTuple(args, "OOO", &objQproc, &objRecords, &objQstates))
+        return NULL;
+
+    npy_intp itemSize = PyArray_ITEMSIZE((PyArrayObject*)objRecords);
+    if (itemSize != sizeof(qgate::GateRecord)) {
+        PyErr_SetString(PyExc_ValueError, "item size of gate records is wrong.");
+        return NULL;
+    }
+
+    qgate::QstateIdx nRecords = 0;
+    void *records = getArrayBuffer(objRecords, &nRecords);
+    qgate::QubitStates *qstates = qubitStates(objQstates);
+    qproc(objQproc)->applyGates(static_cast<const qgate::GateRecord*>(records),
+                                (int)nRecords, *qstates);
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+
 qgate::QubitStatesList toQubitStatesList(PyObject *objQstatesList) {
     qgate::QubitStatesList qstatesList;
     PyObject *iter = PyObject_GetIter(objQstatesList);
@@ -558,6 +669,41 @@ PyObject *qubits_states_getter_create_sampling_pool(PyObject *module, PyObject *
     return obj;
 }
 
+extern "C"
+PyObject *qubits_states_getter_calc_pauli_expectations(PyObject *module, PyObject *args) {
+    PyObject *objQgetter, *objValues, *objQstates, *objZMasks;
+    qgate::QstateIdx xMask;
+
+    if (!PyArg_ParseTuple(args, "OOOKO",
+                          &objQgetter, &objValues, &objQstates, &xMask, &objZMasks)) {
+        return NULL;
+    }
+
+    npy_intp itemSize = PyArray_ITEMSIZE((PyArrayObject*)objZMasks);
+    abortIf(itemSize != sizeof(qgate::QstateIdx), "item size of zMasks is wrong.");
+    itemSize = PyArray_ITEMSIZE((PyArrayObject*)objValues);
+    abortIf(itemSize != sizeof(double) * 2, "values must be an array of complex128.");
+
+    qgate::QstateIdx nZMasks = 0;
+    void *zMasks = getArrayBuffer(objZMasks, &nZMasks);
+    qgate::QstateIdx arraySize = 0;
+    void *values = getArrayBuffer(objValues, &arraySize);
+    if (arraySize < nZMasks) {
+        PyErr_SetString(PyExc_ValueError, "array size too small.");
+        return NULL;
+    }
+
+    TRY {
+        qgetter(objQgetter)->calcPauliExpectations(static_cast<double*>(values),
+                                                   *qubitStates(objQstates), xMask,
+                                                   static_cast<qgate::QstateIdx*>(zMasks),
+                                                   (int)nZMasks);
+    } CATCH_ERROR_AND_RETURN;
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 extern "C"
 PyObject *sampling_pool_sample(PyObject *module, PyObject *args) {
     PyObject *objSamplingPool, *objObs, *objRandNum;
@@ -614,6 +760,7 @@ PyMethodDef glue_methods[] = {
     {"qubit_processor_reset", qubit_processor_reset, METH_VARARGS },
     {"qubit_processor_initialize_qubit_states", qubit_processor_initialize_qubit_states, METH_VARARGS},
     {"qubit_processor_reset_qubit_states", qubit_processor_reset_qubit_states, METH_VARARGS},
+    {"qubit_processor_set_states", qubit_processor_set_states, METH_VARARGS},
     {"qubit_processor_calc_probability", qubit_processor_calc_probability, METH_VARARGS},
     {"qubit_processor_join", qubit_processor_join, METH_VARARGS},
     {"qubit_processor_decohere", qubit_processor_decohere, METH_VARARGS},
@@ -621,9 +768,13 @@ PyMethodDef glue_methods[] = {
     {"qubit_processor_apply_reset", qubit_processor_apply_reset, METH_VARARGS},
     {"qubit_processor_apply_gate", qubit_processor_apply_gate, METH_VARARGS},
     {"qubit_processor_apply_controlled_gate", qubit_processor_apply_controlled_gate, METH_VARARGS},
+    {"qubit_processor_apply_multi_qubit_gate", qubit_processor_apply_multi_qubit_gate, METH_VARARGS},
+    {"qubit_processor_apply_diagonal_gate", qubit_processor_apply_diagonal_gate, METH_VARARGS},
+    {"qubit_processor_apply_gates", qubit_processor_apply_gates, METH_VARARGS},
     {"qubits_states_getter_get_states", qubits_states_getter_get_states, METH_VARARGS},
     {"qubits_states_getter_prepare_prob_array", qubits_states_getter_prepare_prob_array, METH_VARARGS},
     {"qubits_states_getter_create_sampling_pool", qubits_states_getter_create_sampling_pool, METH_VARARGS},
+    {"qubits_states_getter_calc_pauli_expectations", qubits_states_getter_calc_pauli_expectations, METH_VARARGS},
     {"sampling_pool_sample", sampling_pool_sample, METH_VARARGS},
     {"sampling_pool_delete", sampling_pool_delete, METH_VARARGS},
 
@@ -137,8 +137,6 @@ bool isFloat32(PyObject *dtype) {
     return dtype == (PyObject*)&PyFloatArrType_Type;
 }
 
-#if 0
-/* FIXME: remove in future (when this function is confirmed not to be used.) */ 
 inline
 void matrix2x2FromNdArray(qgate::Matrix2x2C64 &mat, PyObject *pyObj) {
     typedef qgate::ComplexType<double> Complex;
@@ -154,8 +152,6 @@ void matrix2x2FromNdArray(qgate::Matrix2x2C64 &mat, PyObject *pyObj) {
     mat(1, 1) = data[stride + 1];
 }
 
-#endif
-
 } /* anonymous namespace */
 
 /* exception handling macro */
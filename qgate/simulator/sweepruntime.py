@@ -0,0 +1,202 @@
+import numpy as np
+import qgate.model as model
+from .plan import PlanExecutor
+
+
+class SweepResult :
+    """ results of a parameter sweep.
+    states is an array of (batch, 2**n_qregs), and values of Prob are arrays of (batch, ).
+    """
+    def __init__(self, states, qreg_ordering, values) :
+        self._states = states
+        self._ordering = qreg_ordering
+        self._values = values
+
+    @property
+    def n_batch(self) :
+        return self._states.shape[0]
+
+    @property
+    def ordering(self) :
+        return self._ordering
+
+    @property
+    def states(self) :
+        return self._states
+
+    @property
+    def prob(self) :
+        return self._states.real ** 2 + self._states.imag ** 2
+
+    def get(self, refs) :
+        """ returns an array of values for a reference, or a list of arrays for references. """
+        if isinstance(refs, model.Reference) :
+            return self._values.get(refs.id, None)
+        return [self._values.get(ref.id, None) for ref in refs]
+
+
+class SweepExecutor :
+    """ executes a plan for a batch of bindings.
+    Qubit states in slots are arrays of (batch, 2**n_lanes), and each gate is applied to
+    all batch members at once.  Gates with parameters have matrices for each batch member.
+    Measure, Reset and if clauses are not supported, since their results differ among batch members.
+    """
+    def __init__(self, dtype = np.float64) :
+        self._dtype = np.complex64 if dtype == np.float32 else np.complex128
+        self._handlers = {
+            PlanExecutor.new_qubit_states : SweepExecutor.new_qubit_states,
+            PlanExecutor.join : SweepExecutor.join,
+            PlanExecutor.prob : SweepExecutor.prob,
+            PlanExecutor.apply_gates : SweepExecutor.apply_gates,
+            PlanExecutor.apply_multi_qubit_gate : SweepExecutor.apply_multi_qubit_gate,
+            PlanExecutor.apply_diagonal_gate : SweepExecutor.apply_diagonal_gate,
+        }
+
+    def run(self, plan, bindings_list, qreg_ordering = None) :
+        self._n_batch = len(bindings_list)
+        self._slots = [None] * plan.n_slots
+        self._values = dict()
+        # key: (instruction index, record index), value: matrices of (batch, d, d)
+        self._batch_mats = plan.batch_matrices(bindings_list)
+
+        for pc, (method, args) in enumerate(plan.instructions) :
+            # instruction index to look up matrices of gates with parameters.
+            self._pc = pc
+            handler = self._handlers.get(method, None)
+            if handler is None :
+                raise RuntimeError('{} is not supported in sweeps.'.format(method.__name__))
+            handler(self, *args)
+
+        states, ordering = self._external_states(plan.layout, qreg_ordering)
+        self._slots = None
+        return SweepResult(states, ordering, self._values)
+
+    def _external_states(self, layout, qreg_ordering) :
+        # product of qubit states in slots, lanes are reordered to the external ordering.
+        qreglist = list() if qreg_ordering is None else list(qreg_ordering)
+        remaining = sorted([qreg for qreg, _, _ in layout if not qreg in qreglist],
+                           key = lambda qreg : qreg.id)
+        qreglist += remaining
+
+        lanes = dict()
+        for qreg, slot, local in layout :
+            lanes[qreg] = (slot, local)
+        slots = sorted(set([slot for slot, _ in lanes.values()]))
+
+        # states tensor of (batch, 2, ..., 2), axes after batch are lanes from the most significant.
+        states = np.ones([self._n_batch, 1], self._dtype)
+        # lane position in states for (slot, local), from the least significant.
+        positions = dict()
+        n_joined = 0
+        for slot in slots :
+            qstates = self._slots[slot]
+            n_slot_lanes = int(qstates.shape[1]).bit_length() - 1
+            states = (qstates[:, :, None] * states[:, None, :]).reshape(self._n_batch, -1)
+            for local in range(n_slot_lanes) :
+                positions[(slot, local)] = n_joined + local
+            n_joined += n_slot_lanes
+
+        tensor = states.reshape([self._n_batch] + [2] * n_joined)
+        # lanes given in qreg_ordering that are not in circuits are in |0>.
+        axes = list()
+        expanded = list()
+        for qreg in reversed(qreglist) :
+            if qreg in lanes :
+                axes.append(1 + n_joined - 1 - positions[lanes[qreg]])
+            else :
+                expanded.append(qreg)
+        tensor = np.transpose(tensor, [0] + axes)
+        states = tensor.reshape(self._n_batch, -1)
+        # insert lanes of |0> from the lowest external position.
+        for pos in sorted([qreglist.index(qreg) for qreg in expanded]) :
+            lo = 1 << pos
+            states = states.reshape(self._n_batch, -1, 1, lo)
+            zeros = np.zeros_like(states)
+            states = np.concatenate([states, zeros], axis = 2).reshape(self._n_batch, -1)
+        return states, qreglist
+
+    def _lane_view(self, slot, control_mask, target_lanes) :
+        # view qubit states as a tensor of (batch, 2, ..., 2), and select states whose control bits are 1.
+        # Axes for target lanes are moved after the batch axis, the first one is for the last target lane.
+        qstates = self._slots[slot]
+        n_lanes = int(qstates.shape[1]).bit_length() - 1
+        tensor = qstates.reshape([self._n_batch] + [2] * n_lanes)
+        key = [slice(None)] * (n_lanes + 1)
+        for lane in range(n_lanes) :
+            if (control_mask >> lane) & 1 :
+                key[n_lanes - lane] = 1
+        view = tensor[tuple(key)]
+        # lanes of remaining axes.
+        axis_lanes = [lane for lane in reversed(range(n_lanes)) if not (control_mask >> lane) & 1]
+        target_axes = [1 + axis_lanes.index(lane) for lane in reversed(target_lanes)]
+        return np.moveaxis(view, target_axes, list(range(1, len(target_axes) + 1)))
+
+    def _broadcast(self, values, ndim) :
+        # values of (batch, ) are broadcasted to (batch, 1, ..., 1).
+        return values.reshape([self._n_batch] + [1] * (ndim - 1))
+
+    def _apply_matrix(self, slot, mat, control_mask, target_lanes) :
+        # mat is (d, d) or (batch, d, d).
+        view = self._lane_view(slot, control_mask, target_lanes)
+        if len(target_lanes) == 1 :
+            qs0, qs1 = view[:, 0, ...], view[:, 1, ...]
+            if mat.ndim == 3 :
+                m00, m01, m10, m11 = [self._broadcast(mat[:, row, col], qs0.ndim)
+                                      for row, col in [(0, 0), (0, 1), (1, 0), (1, 1)]]
+            else :
+                m00, m01, m10, m11 = mat[0, 0], mat[0, 1], mat[1, 0], mat[1, 1]
+            qsout0 = m00 * qs0 + m01 * qs1
+            qsout1 = m10 * qs0 + m11 * qs1
+            qs0[...] = qsout0
+            qs1[...] = qsout1
+            return
+
+        n_targets = len(target_lanes)
+        shape = view.shape
+        sub = view.reshape(self._n_batch, 1 << n_targets, -1)
+        view[...] = np.matmul(mat, sub).reshape(shape)
+
+    def new_qubit_states(self, slot, n_lanes) :
+        qstates = np.zeros([self._n_batch, 1 << n_lanes], self._dtype)
+        qstates[:, 0] = 1.
+        self._slots[slot] = qstates
+
+    def join(self, slot, src_slots, n_lanes, n_new_qregs, lane_states) :
+        # the last qstates has lowest local lanes, and new lanes are placed on the top.
+        joined = np.ones([self._n_batch, 1], self._dtype)
+        for src in src_slots :
+            qstates = self._slots[src]
+            joined = (joined[:, :, None] * qstates[:, None, :]).reshape(self._n_batch, -1)
+            self._slots[src] = None
+        qstates = np.zeros([self._n_batch, 1 << n_lanes], self._dtype)
+        qstates[:, :joined.shape[1]] = joined
+        self._slots[slot] = qstates
+
+    def prob(self, outref, slot, local) :
+        qstates = self._slots[slot]
+        view = qstates.reshape(self._n_batch, -1, 2, 1 << local)[:, :, 0, :]
+        prob = np.sum(view.real ** 2 + view.imag ** 2, axis = (1, 2))
+        self._values[outref.id] = prob
+
+    def apply_gates(self, slot, records) :
+        for record_idx, (mat, control_mask, target_lane) in enumerate(records) :
+            batch_mat = self._batch_mats.get((self._pc, record_idx), None)
+            if batch_mat is not None :
+                mat = batch_mat
+            self._apply_matrix(slot, mat, int(control_mask), [int(target_lane)])
+
+    def apply_multi_qubit_gate(self, slot, mat, local_control_lanes, local_target_lanes) :
+        batch_mat = self._batch_mats.get((self._pc, None), None)
+        if batch_mat is not None :
+            mat = batch_mat
+        control_mask = 0
+        if local_control_lanes is not None :
+            for lane in local_control_lanes :
+                control_mask |= 1 << lane
+        self._apply_matrix(slot, mat, control_mask, local_target_lanes)
+
+    def apply_diagonal_gate(self, slot, phases, local_target_lanes) :
+        view = self._lane_view(slot, 0, local_target_lanes)
+        n_targets = len(local_target_lanes)
+        # the first target axis is for the last target lane, the most significant bit of phases.
+        view *= phases.reshape([1] + [2] * n_targets + [1] * (view.ndim - n_targets - 1))
@@ -52,6 +52,7 @@ ext = Extension('qgate/simulator/cpuext',
                 include_dirs = [npinclude],
                 sources = ['qgate/simulator/src/cpuext.cpp',
                            'qgate/simulator/src/CPUQubitStates.cpp',
+                           'qgate/simulator/src/CPUMmapChunkStore.cpp',
                            'qgate/simulator/src/CPUQubitProcessor.cpp',
                            'qgate/simulator/src/CPUSamplingPool.cpp',
                            'qgate/simulator/src/CPUQubitsStatesGetter.cpp',
@@ -24,3 +24,21 @@ from .test_sampling_pool import *
 from .test_join import *
 from .test_pauli_gates_diagonalizer import *
 from .test_pauli_macro_expansion import *
+from .test_gate_fusion import *
+from .test_thread_pool import *
+from .test_multi_qubit_gate import *
+from .test_plan import *
+from .test_parameter import *
+from .test_sweep import *
+from .test_expectation import *
+from .test_pauli_term_groups import *
+from .test_snapshot import *
+from .test_mmap_runtime import *
+from .test_dist_runtime import *
+from .test_diagonal_permutation_gates import *
+from .test_diagonal_fusion import *
+from .test_circuit_optimizer import *
+from .test_trotter_expansion import *
+from .test_qreg_aggregator import *
+from .test_lanes import *
+from .test_rop_executor import *
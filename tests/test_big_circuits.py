@@ -53,6 +53,7 @@ class TestBigCircuitsBase(SimulatorTestBase) :
 import sys
 this = sys.modules[__name__]
 
+createPyTestCase(this, 'TestBigCircuits', TestBigCircuitsBase)
 createCPUTestCase(this, 'TestBigCircuits', TestBigCircuitsBase)
 createCUDATestCase(this, 'TestBigCircuits', TestBigCircuitsBase)
 
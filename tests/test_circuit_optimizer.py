@@ -0,0 +1,129 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestCircuitOptimizerBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestCircuitOptimizerBase:
+            raise unittest.SkipTest()
+        super(TestCircuitOptimizerBase, cls).setUpClass()
+
+    def run_sim(self, circuit, qregs, bindings = None, **prefs) :
+        sim = self.create_simulator(**prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit, bindings)
+        return sim
+
+    def assert_same_states(self, circuit, qregs, bindings = None) :
+        sim = self.run_sim(circuit, qregs, bindings)
+        states = sim.qubits.states[:]
+        for prep in [qgate.prefs.dynamic, qgate.prefs.one_static] :
+            sim = self.run_sim(circuit, qregs, bindings, circuit_prep = prep, optimize = True)
+            self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+        return sim.stats['optimize']
+
+    def test_cancel_self_inverse(self) :
+        qregs = new_qregs(2)
+        circuit = [ H(qregs[0]), H(qregs[1]), X(qregs[0]), X(qregs[0]), H(qregs[1]), H(qregs[1]),
+                    ctrl(qregs[0]).X(qregs[1]), ctrl(qregs[0]).X(qregs[1]), Ry(0.2)(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(3, stats['n_cancelled'])
+        self.assertEqual(3, stats['n_gates_out'])
+
+    def test_cancel_adjoint(self) :
+        qregs = new_qregs(2)
+        circuit = [ [H(qreg) for qreg in qregs], T(qregs[0]), T.Adj(qregs[0]),
+                    U3(0.1, 0.2, 0.3)(qregs[1]), U3(0.1, 0.2, 0.3).Adj(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(2, stats['n_cancelled'])
+        self.assertEqual(2, stats['n_gates_out'])
+
+    def test_merge_rotations(self) :
+        qregs = new_qregs(2)
+        circuit = [ [H(qreg) for qreg in qregs], Rz(0.1)(qregs[0]), Rz(0.2)(qregs[0]),
+                    U1(0.3)(qregs[1]), U1(0.4).Adj(qregs[1]),
+                    Expiz(0.2)(qregs[0]), Expiz(0.2).Adj(qregs[0]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        # Expiz(0.2) and Expiz(0.2).Adj are removed.
+        self.assertEqual(3, stats['n_merged'] + stats['n_cancelled'])
+        self.assertEqual(4, stats['n_gates_out'])
+
+    def test_merge_parameters(self) :
+        qregs = new_qregs(1)
+        param = new_parameter()
+        circuit = [ H(qregs[0]), Rz(param)(qregs[0]), Rz(0.3)(qregs[0]), Rz(param * 2.)(qregs[0]) ]
+        stats = self.assert_same_states(circuit, qregs, { param : 0.2 })
+        self.assertEqual(2, stats['n_merged'])
+        self.assertEqual(2, stats['n_gates_out'])
+
+    def test_commute_over_controls(self) :
+        qregs = new_qregs(3)
+        # Z and S gates on control qregs, X gates on target qregs commute with CX.
+        circuit = [ [H(qreg) for qreg in qregs],
+                    Z(qregs[0]), X(qregs[1]), ctrl(qregs[0]).X(qregs[1]), Z(qregs[0]), X(qregs[1]),
+                    ctrl(qregs[1]).X(qregs[2]), S(qregs[1]), ctrl(qregs[1]).X(qregs[2]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(3, stats['n_cancelled'])
+
+    def test_cx_ladder(self) :
+        # ladders of trotter steps, exp(i theta Z0 Z1 Z2), are cancelled between steps.
+        qregs = new_qregs(3)
+        circuit = [ H(qreg) for qreg in qregs ]
+        for step in range(3) :
+            circuit += [ ctrl(qregs[0]).X(qregs[1]), ctrl(qregs[1]).X(qregs[2]), Rz(0.1)(qregs[2]),
+                         ctrl(qregs[1]).X(qregs[2]), ctrl(qregs[0]).X(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(4, stats['n_cancelled'])
+        self.assertEqual(2, stats['n_merged'])
+        self.assertEqual(8, stats['n_gates_out'])
+
+    def test_not_cancelled_over_gates(self) :
+        qregs = new_qregs(2)
+        circuit = [ H(qregs[0]), X(qregs[0]), H(qregs[0]), X(qregs[0]),
+                    ctrl(qregs[0]).X(qregs[1]), Rx(0.1)(qregs[0]), ctrl(qregs[0]).X(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(0, stats['n_cancelled'])
+        self.assertEqual(7, stats['n_gates_out'])
+
+    def test_lookback_window(self) :
+        qregs = new_qregs(2)
+        n_gates = qgate.model.circuit_optimizer.CircuitOptimizer.max_lookback + 8
+        # H(qregs[0]) is out of the window of qregs[0], and CX gates are not cancelled over it.
+        circuit = [ H(qregs[0]), Ry(0.4)(qregs[1]), ctrl(qregs[0]).X(qregs[1]), H(qregs[0]),
+                    [T(qregs[0]) if idx % 2 == 0 else S(qregs[0]) for idx in range(n_gates)],
+                    ctrl(qregs[0]).X(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(0, stats['n_cancelled'])
+
+    def test_not_cancelled_over_barrier(self) :
+        qregs = new_qregs(1)
+        circuit = [ H(qregs[0]), barrier(qregs[0]), H(qregs[0]), Rz(0.1)(qregs[0]),
+                    measure(new_reference(), qregs[0]), Rz(0.1)(qregs[0]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(0, stats['n_cancelled'] + stats['n_merged'])
+
+    def test_if_clause(self) :
+        qregs = new_qregs(2)
+        refs = new_references(2)
+        circuit = [ X(qregs[0]), measure(refs[0], qregs[0]), X(qregs[1]),
+                    if_(refs[0], 1, [X(qregs[1]), H(qregs[1]), H(qregs[1])]),
+                    X(qregs[1]), measure(refs[1], qregs[1]) ]
+        sim = self.run_sim(circuit, qregs, optimize = True)
+        self.assertEqual(1, sim.values.get(refs[0]))
+        self.assertEqual(1, sim.values.get(refs[1]))
+        stats = sim.stats['optimize']
+        # X gates before and after if clause are not cancelled.
+        self.assertEqual(1, stats['n_cancelled'])
+        self.assertEqual(4, stats['n_gates_out'])
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestCircuitOptimizer', TestCircuitOptimizerBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestDiagonalFusionBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestDiagonalFusionBase:
+            raise unittest.SkipTest()
+        super(TestDiagonalFusionBase, cls).setUpClass()
+
+    def run_sim(self, circuit, qregs, **prefs) :
+        sim = self.create_simulator(**prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        return sim
+
+    def assert_same_states(self, circuit, qregs, **prefs) :
+        sim = self.run_sim(circuit, qregs)
+        states = sim.qubits.states[:]
+        for prep in [qgate.prefs.dynamic, qgate.prefs.one_static] :
+            sim = self.run_sim(circuit, qregs, circuit_prep = prep, diagonal_fusion = True, **prefs)
+            self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+            plan = sim.compile(circuit)
+            sim.run(plan)
+            self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+        return sim.stats['diagonal_fusion']
+
+    def qft(self, qregs) :
+        circuit = list()
+        for idx, qreg in enumerate(qregs) :
+            circuit.append(H(qreg))
+            for ctrlidx in range(idx + 1, len(qregs)) :
+                circuit.append(ctrl(qregs[ctrlidx]).U1(np.pi / 2 ** (ctrlidx - idx))(qreg))
+        return circuit
+
+    def test_qft(self) :
+        qregs = new_qregs(10)
+        circuit = [ [Ry(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs)], self.qft(qregs) ]
+        stats = self.assert_same_states(circuit, qregs)
+        # controlled U1 gates following each H gate are fused into one phase table,
+        # the last H gate is followed by one controlled U1 gate.
+        self.assertEqual(8, stats['n_phase_tables'])
+
+    def test_diagonal_gates(self) :
+        qregs = new_qregs(4)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    T(qregs[0]), ctrl(qregs[0]).Z(qregs[1]), S.Adj(qregs[1]), Rz(0.3)(qregs[2]),
+                    ctrl(qregs[1], qregs[3]).U1(0.4)(qregs[2]), Expiz(0.2)(qregs[3]),
+                    ctrl(qregs[2]).Rz(0.6)(qregs[0]) ]
+        stats = self.assert_same_states(circuit, qregs, gate_fusion = True)
+        self.assertEqual(1, stats['n_phase_tables'])
+
+    def test_max_qregs(self) :
+        qregs = new_qregs(6)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    [ctrl(qregs[0]).U1(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs[1:])] ]
+        sim = self.run_sim(circuit, qregs)
+        states = sim.qubits.states[:]
+        sim = self.run_sim(circuit, qregs, diagonal_fusion = 3)
+        self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+        self.assertEqual(2, sim.stats['diagonal_fusion']['n_phase_tables'])
+
+    def test_max_qregs_clamped(self) :
+        # phase tables have up to 16 qregs.
+        qregs = new_qregs(18)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    [ctrl(qregs[0]).U1(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs[1:])] ]
+        sim = self.run_sim(circuit, qregs, circuit_prep = qgate.prefs.one_static)
+        states = sim.qubits.states[:]
+        sim = self.run_sim(circuit, qregs, circuit_prep = qgate.prefs.one_static,
+                           diagonal_fusion = 20)
+        self.assertEqual(16, sim.preprocessor.diagonal_fusion.max_qregs)
+        self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+        self.assertEqual(2, sim.stats['diagonal_fusion']['n_phase_tables'])
+
+    def test_invalid_phases(self) :
+        if self.runtime == 'py' :
+            self.skipTest('phase tables are not checked in py runtime.')
+        qregs = new_qregs(2)
+        sim = self.run_sim([ [H(qreg) for qreg in qregs], ctrl(qregs[0]).X(qregs[1]) ], qregs,
+                           circuit_prep = qgate.prefs.one_static)
+        qstates = sim.qubits.qstates_list[0]
+        with self.assertRaises(ValueError) :
+            qstates.processor.apply_diagonal_gate(np.ones([2]), qstates, [0, 1])
+
+    def test_not_fused_over_gates(self) :
+        qregs = new_qregs(3)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    ctrl(qregs[0]).Z(qregs[1]), X(qregs[1]), ctrl(qregs[2]).Z(qregs[1]),
+                    H(qregs[1]), T(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(0, stats['n_phase_tables'])
+
+    def test_fused_over_other_qregs(self) :
+        qregs = new_qregs(3)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    ctrl(qregs[0]).Z(qregs[1]), X(qregs[2]), ctrl(qregs[2]).S(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(1, stats['n_phase_tables'])
+
+    def test_not_fused_over_barrier(self) :
+        qregs = new_qregs(2)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    ctrl(qregs[0]).Z(qregs[1]), barrier(qregs), ctrl(qregs[0]).S(qregs[1]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(0, stats['n_phase_tables'])
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestDiagonalFusion', TestDiagonalFusionBase)
+
+if __name__ == '__main__':
+    unittest.main()
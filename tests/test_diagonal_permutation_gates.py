@@ -0,0 +1,55 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestDiagonalPermutationGatesBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestDiagonalPermutationGatesBase:
+            raise unittest.SkipTest()
+        super(TestDiagonalPermutationGatesBase, cls).setUpClass()
+
+    def compare(self, circuit, qregs) :
+        sim = self.create_simulator(circuit_prep = qgate.prefs.one_static)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        ref = qgate.simulator.py(circuit_prep = qgate.prefs.one_static)
+        ref.qubits.set_ordering(qregs)
+        ref.run(circuit)
+        self.assertTrue(np.allclose(ref.qubits.states[:], sim.qubits.states[:]))
+
+    def prepare(self, qregs) :
+        return [ [H(qreg) for qreg in qregs],
+                 [Ry(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs)] ]
+
+    def test_diagonal_gates(self) :
+        qregs = new_qregs(10)
+        for qreg in [qregs[0], qregs[3], qregs[9]] :
+            circuit = [ self.prepare(qregs), Z(qreg), S(qreg), T.Adj(qreg), Rz(0.3)(qreg),
+                        U1(0.7)(qreg), Expii(0.2)(qreg), Expiz(0.4)(qreg), I(qreg) ]
+            self.compare(circuit, qregs)
+
+    def test_permutation_gates(self) :
+        qregs = new_qregs(10)
+        for qreg in [qregs[0], qregs[4], qregs[9]] :
+            circuit = [ self.prepare(qregs), X(qreg), Y(qreg), X(qreg) ]
+            self.compare(circuit, qregs)
+
+    def test_controlled_gates(self) :
+        qregs = new_qregs(10)
+        for control, target in [(qregs[0], qregs[9]), (qregs[9], qregs[0]), (qregs[2], qregs[5])] :
+            circuit = [ self.prepare(qregs), ctrl(control).X(target), ctrl(control).Y(target),
+                        ctrl(control).Z(target), ctrl(control).U1(0.5)(target),
+                        ctrl(control, qregs[7]).Rz(0.3)(target) ]
+            self.compare(circuit, qregs)
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestDiagonalPermutationGates', TestDiagonalPermutationGatesBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestDistRuntime(SimulatorTestBase) :
+
+    def setUp(self) :
+        self.n_qregs = 12
+        qgate.simulator.distruntime.module_finalize()
+        # 3 processes, chunk size is 256 states.
+        qgate.simulator.distruntime.set_preference(3, 8)
+
+    def tearDown(self) :
+        qgate.simulator.distruntime.module_finalize()
+        qgate.simulator.distruntime.reset_preference()
+
+    def compare(self, circuit, qregs, **prefs) :
+        sim = qgate.simulator.dist(circuit_prep = qgate.prefs.one_static, **prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        states = sim.qubits.states[:]
+
+        ref = qgate.simulator.cpu(circuit_prep = qgate.prefs.one_static, **prefs)
+        ref.qubits.set_ordering(qregs)
+        ref.run(circuit)
+        self.assertTrue(np.allclose(ref.qubits.states[:], states))
+        return sim
+
+    def test_gates(self) :
+        qregs = new_qregs(self.n_qregs)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    [ctrl(qregs[idx]).X(qregs[idx + 1]) for idx in range(self.n_qregs - 1)],
+                    # gates on high lanes are applied to pairs of chunks.
+                    [Ry(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs)],
+                    ctrl(qregs[11]).Rz(0.3)(qregs[0]),
+                    ctrl(qregs[1], qregs[9]).Rx(0.4)(qregs[10]),
+                    Swap(qregs[1], qregs[10]) ]
+        for prefs in [ {}, { 'multi_qubit_gate' : False } ] :
+            self.compare(circuit, qregs, **prefs)
+
+    def test_measure(self) :
+        qregs = new_qregs(self.n_qregs)
+        refs = new_references(2)
+        circuit = [ [H(qreg) for qreg in qregs[:11]], X(qregs[11]),
+                    measure(refs[0], qregs[11]), prob(refs[1], qregs[11]) ]
+        sim = self.compare(circuit, qregs)
+        self.assertEqual(1, sim.values.get(refs[0]))
+        self.assertAlmostEqual(0., sim.values.get(refs[1]))
+
+    def test_sample_in_processes(self) :
+        # worker pool is owned by the main process, and not usable in forked processes.
+        qregs = new_qregs(self.n_qregs)
+        ref = new_reference()
+        circuit = [ [H(qreg) for qreg in qregs], measure(ref, qregs[11]) ]
+        sim = qgate.simulator.dist()
+        for initialized in [ False, True ] :
+            self.assertEqual(initialized, qgate.simulator.distruntime.initialized)
+            with self.assertRaises(RuntimeError) :
+                sim.sample(circuit, [ref], 16, n_workers = 2)
+            obs = sim.sample(circuit, [ref], 16)
+            self.assertEqual(16, len(obs.intarray))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -61,7 +61,28 @@ class TestExpBase(SimulatorTestBase) :
         v = cmath.exp(1.j * math.pi / 8) / (math.sqrt(2) ** 4)
         self.assertTrue(np.allclose(states_hexp[0::2], v))
         self.assertTrue(np.allclose(states_hexp[1::2], np.conjugate(v)))
-        
+
+    def assert_adjoint(self, qregs, paulis, ctrlreg = None) :
+        circuit = [ [H(qreg) for qreg in qregs], [Ry(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs)] ]
+        expi, expi_adj = Expi(-0.3), Expi(0.3).Adj
+        if ctrlreg is not None :
+            expi, expi_adj = ctrl(ctrlreg).Expi(-0.3), ctrl(ctrlreg).Expi(0.3).Adj
+        states = list()
+        for exp in [expi, expi_adj] :
+            sim = self.create_simulator(multi_qubit_gate = False)
+            sim.qubits.set_ordering(qregs)
+            sim.run(circuit + [exp(*paulis)])
+            states.append(sim.qubits.states[:])
+        self.assertTrue(np.allclose(states[0], states[1]))
+
+    def test_expi_adjoint(self) :
+        qregs = new_qregs(6)
+        paulis = [X(qregs[0]), Y(qregs[1]), Z(qregs[2]), X(qregs[3]), Y(qregs[4])]
+        self.assert_adjoint(qregs, paulis)
+        self.assert_adjoint(qregs, paulis[:2])
+        # controlled
+        self.assert_adjoint(qregs, paulis, qregs[5])
+
 import sys
 this = sys.modules[__name__]
 createTestCases(this, 'TestExp', TestExpBase)
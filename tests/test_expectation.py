@@ -0,0 +1,100 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestExpectationBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestExpectationBase:
+            raise unittest.SkipTest()
+        super(TestExpectationBase, cls).setUpClass()
+
+    def pauli_matrix(self, term, qregs) :
+        mats = { 'X' : np.array([[0, 1], [1, 0]], np.complex128),
+                 'Y' : np.array([[0, -1j], [1j, 0]], np.complex128),
+                 'Z' : np.array([[1, 0], [0, -1]], np.complex128),
+                 'ID' : np.eye(2, dtype = np.complex128) }
+        if not isinstance(term, list) :
+            term = [term]
+        n_states = 1 << len(qregs)
+        mat = np.eye(n_states, dtype = np.complex128)
+        for gate in term :
+            lane_mats = [mats['ID']] * len(qregs)
+            lane_mats[qregs.index(gate.qreg)] = mats[gate.gate_type.__class__.__name__]
+            gate_mat = np.ones([1, 1], np.complex128)
+            for lane_mat in reversed(lane_mats) :
+                gate_mat = np.kron(gate_mat, lane_mat)
+            mat = np.matmul(gate_mat, mat)
+        return mat
+
+    def assert_expectation(self, circuit, qregs, terms) :
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        states = sim.qubits.states[:]
+        values = sim.qubits.expectation(terms)
+        self.assertEqual(len(terms), len(values))
+        for term, value in zip(terms, values) :
+            expected = np.vdot(states, np.matmul(self.pauli_matrix(term, qregs), states)).real
+            self.assertAlmostEqual(expected, value)
+        # states are not modified.
+        self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+
+    def test_single_qubit(self) :
+        qregs = new_qregs(1)
+        for circuit in [ [], [H(qregs[0])], [H(qregs[0]), S(qregs[0])], [Ry(0.3)(qregs[0])] ] :
+            self.assert_expectation(circuit, qregs,
+                                    [X(qregs[0]), Y(qregs[0]), Z(qregs[0]), I(qregs[0])])
+
+    def test_entangled_qubits(self) :
+        qregs = new_qregs(4)
+        circuit = [ H(qregs[0]), Ry(0.3)(qregs[1]), ctrl(qregs[0]).X(qregs[2]),
+                    Rx(0.7)(qregs[2]), S(qregs[1]), ctrl(qregs[1]).Rz(0.5)(qregs[0]) ]
+        terms = [ [X(qregs[0]), X(qregs[2])], [Y(qregs[0]), Y(qregs[2]), Z(qregs[1])],
+                  # terms sharing X/Y mask.
+                  [X(qregs[0]), Z(qregs[2])], [X(qregs[0]), Z(qregs[1])],
+                  # qregs[3] is not used in the circuit.
+                  [Z(qregs[0]), Z(qregs[3])], [X(qregs[3])],
+                  # products on a qreg.
+                  [X(qregs[0]), Y(qregs[0])], [Z(qregs[2]), Y(qregs[2]), X(qregs[2])] ]
+        self.assert_expectation(circuit, qregs, terms)
+
+    def test_large_qubits(self) :
+        # states larger than thresholds for parallel execution.
+        qregs = new_qregs(10)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    [ctrl(qregs[idx]).X(qregs[idx + 1]) for idx in range(9)],
+                    [Ry(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs)] ]
+        terms = [ [X(qregs[0]), Y(qregs[5]), Z(qregs[9])], [X(qregs[0]), Y(qregs[5])],
+                  [Z(qregs[idx]) for idx in range(10)], [Y(qregs[3]), Y(qregs[8])] ]
+        self.assert_expectation(circuit, qregs, terms)
+
+    def test_pauli_prob(self) :
+        qregs = new_qregs(3)
+        refs = new_references(1)
+        term = [X(qregs[0]), Y(qregs[1]), Z(qregs[2])]
+        circuit = [ H(qregs[0]), Rx(0.4)(qregs[1]), ctrl(qregs[1]).X(qregs[2]) ]
+        sim = self.create_simulator()
+        sim.run(circuit + [prob(refs[0], term)])
+        value = sim.qubits.expectation([term])[0]
+        self.assertAlmostEqual(2. * sim.values.get(refs[0]) - 1., value)
+
+    def test_wrong_term(self) :
+        qregs = new_qregs(2)
+        sim = self.create_simulator()
+        sim.run(H(qregs[0]))
+        with self.assertRaises(RuntimeError) :
+            sim.qubits.expectation([H(qregs[0])])
+        with self.assertRaises(RuntimeError) :
+            sim.qubits.expectation([ctrl(qregs[1]).X(qregs[0])])
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestExpectation', TestExpectationBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestGateFusionBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestGateFusionBase:
+            raise unittest.SkipTest()
+        super(TestGateFusionBase, cls).setUpClass()
+
+    def run_sim(self, circuit, qregs, gate_fusion) :
+        sim = self.create_simulator(gate_fusion = gate_fusion)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        return sim
+
+    def assert_same_states(self, circuit, qregs) :
+        sim = self.run_sim(circuit, qregs, False)
+        states = sim.qubits.states[:]
+        sim = self.run_sim(circuit, qregs, True)
+        fused = sim.qubits.states[:]
+        self.assertTrue(np.allclose(states, fused))
+        return sim.stats['gate_fusion']
+
+    def test_single_qreg(self) :
+        qregs = new_qregs(1)
+        circuit = [ H(qregs[0]), S(qregs[0]), T(qregs[0]), Rz(0.3)(qregs[0]),
+                    U3(0.1, 0.2, 0.3)(qregs[0]), T.Adj(qregs[0]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(6, stats['n_gates_in'])
+        self.assertEqual(1, stats['n_gates_out'])
+        self.assertEqual(1, stats['n_fused_runs'])
+
+    def test_interleaved_qregs(self) :
+        qregs = new_qregs(3)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    [T(qreg) for qreg in qregs],
+                    [Rx(0.5)(qreg) for qreg in qregs] ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(9, stats['n_gates_in'])
+        self.assertEqual(3, stats['n_gates_out'])
+
+    def test_controlled_gates(self) :
+        qregs = new_qregs(3)
+        circuit = [ H(qregs[0]), H(qregs[1]), H(qregs[2]),
+                    ctrl(qregs[0]).Rx(0.2)(qregs[2]),
+                    ctrl(qregs[0]).Ry(0.4)(qregs[2]),
+                    ctrl(qregs[1]).Rz(0.6)(qregs[2]),
+                    ctrl(qregs[1]).U1(0.8)(qregs[2]),
+                    T(qregs[2]), S(qregs[2]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(9, stats['n_gates_in'])
+        self.assertEqual(6, stats['n_gates_out'])
+
+    def test_not_fused_over_control(self) :
+        qregs = new_qregs(2)
+        circuit = [ H(qregs[0]), ctrl(qregs[0]).X(qregs[1]), H(qregs[0]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(3, stats['n_gates_out'])
+
+    def test_not_fused_over_barrier(self) :
+        qregs = new_qregs(1)
+        circuit = [ H(qregs[0]), barrier(qregs[0]), H(qregs[0]) ]
+        stats = self.assert_same_states(circuit, qregs)
+        self.assertEqual(2, stats['n_gates_out'])
+
+    def test_measure_and_if(self) :
+        qregs = new_qregs(2)
+        refs = new_references(2)
+        circuit = [ X(qregs[0]), H(qregs[0]), H(qregs[0]),
+                    measure(refs[0], qregs[0]),
+                    if_(refs[0], 1, [H(qregs[1]), H(qregs[1]), X(qregs[1])]),
+                    measure(refs[1], qregs[1]) ]
+        sim = self.run_sim(circuit, qregs, True)
+        self.assertEqual(1, sim.values.get(refs[0]))
+        self.assertEqual(1, sim.values.get(refs[1]))
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestGateFusion', TestGateFusionBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -82,6 +82,50 @@ class TestIf(SimulatorTestBase) :
         self.assertEqual(1, sim.values.get(refs[0]))
         self.assertEqual(1, sim.values.get(refs[1]))
 
+    def test_nested_if(self) :
+        qregs = new_qregs(4)
+        refs = new_references(3)
+        circuit = [
+            X(qregs[0]),
+            measure(refs[0], qregs[0]),
+            if_(refs[0], 1, [
+                X(qregs[1]),
+                measure(refs[1], qregs[1]),
+                if_(refs[1], 0, X(qregs[2])),
+                if_(refs[1], 1, [ X(qregs[3]), [ X(qregs[3]), X(qregs[3]) ] ]),
+            ]),
+            if_(refs[0], 0, X(qregs[2])),
+            measure(refs[2], qregs[3])
+        ]
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        self.assertEqual([1, 1, 1], sim.values.get(refs))
+        self.assertEqual(1, sim.qubits.prob[0b1011])
+
+    def test_linear_ops(self) :
+        qregs = new_qregs(2)
+        refs = new_references(2)
+        circuit = [
+            measure(refs[0], qregs[0]),
+            if_(refs[0], 1, [ X(qregs[1]), if_(refs[0], 1, [ X(qregs[1]), X(qregs[1]) ]) ]),
+            measure(refs[1], qregs[1])
+        ]
+        sim = self.create_simulator()
+        gatelist = qgate.model.GateList()
+        gatelist.set(circuit)
+        linear = sim.preprocessor.preprocess(gatelist).linear
+        self.assertEqual(list(range(len(linear))), [op.get_idx() for op in linear.ops])
+        if_pos = [idx for idx, op in enumerate(linear.ops) if isinstance(op, qgate.model.IfClause)]
+        self.assertEqual(2, len(if_pos))
+        # the inner if clause is followed by ClauseEnd of the outer if clause.
+        self.assertEqual(if_pos[0] + linear.n_skips[if_pos[0]], if_pos[1] + linear.n_skips[if_pos[1]] + 1)
+        self.assertTrue(isinstance(linear.ops[if_pos[0] + linear.n_skips[if_pos[0]]], qgate.model.ClauseEnd))
+        after_if = linear.ops[if_pos[0] + linear.n_skips[if_pos[0]] + 1:]
+        self.assertTrue(any([isinstance(op, qgate.model.Measure) for op in after_if]))
+        counts = sim.sample(circuit, refs, 128)
+        self.assertEqual({ 0 : 128 }, dict(counts.histgram()))
+
 import sys
 this = sys.modules[__name__]
 createTestCases(this, 'TestIf', TestIf)
@@ -0,0 +1,59 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+from qgate.simulator import lanes
+import numpy as np
+
+class TestLanesBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestLanesBase:
+            raise unittest.SkipTest()
+        super(TestLanesBase, cls).setUpClass()
+
+    def assert_lanes_indexed(self, qubits) :
+        for qstates in qubits.qstates_list :
+            scanned = [lane for lane in qubits.lanes.values() if lane.qstates is qstates]
+            indexed = qubits.lanes.get_by_qubit_states(qstates)
+            self.assertEqual(set(scanned), set(indexed))
+            self.assertEqual(sorted([lane.local for lane in indexed]), list(range(qstates.get_n_lanes())))
+        for idx, qreg in enumerate(qubits.ordering) :
+            self.assertEqual(idx, qubits.lanes.external_positions[qreg])
+
+    def test_join_and_separate(self) :
+        qregs = new_qregs(6)
+        refs = new_references(6)
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs[::-1])
+        sim.run([ [H(qreg) for qreg in qregs], ctrl(qregs[0]).X(qregs[2]), ctrl(qregs[4]).X(qregs[1]) ])
+        self.assert_lanes_indexed(sim.qubits)
+        sim.run([ ctrl(qregs[2]).X(qregs[4]), measure(refs[2], qregs[2]), X(qregs[3]) ])
+        self.assert_lanes_indexed(sim.qubits)
+        states = sim.qubits.states[:]
+        sim.run([ measure(refs[idx], qreg) for idx, qreg in enumerate(qregs) ])
+        self.assert_lanes_indexed(sim.qubits)
+        # measured states are in the external layout of qregs.
+        values = sim.values.get(refs)
+        idx = sum([value << (len(qregs) - 1 - pos) for pos, value in enumerate(values)])
+        self.assertAlmostEqual(1., sim.qubits.prob[idx])
+        self.assertAlmostEqual(1., np.sum(np.abs(states) ** 2))
+
+    def test_lane_transformation(self) :
+        qregs = new_qregs(4)
+        sim = self.create_simulator()
+        sim.run([ ctrl(qregs[0]).X(qregs[3]), H(qregs[1]), ctrl(qregs[1]).X(qregs[2]) ])
+        ordering = [qregs[2], qregs[0]]
+        trans = lanes.create_lane_transformation(sim.qubits.lanes, ordering)
+        # lanes in transformations hold qregs in place of qstates.
+        externals = dict([(lane.qstates, lane.external) for _, lanelist in trans for lane in lanelist])
+        self.assertEqual({ qregs[0] : 1, qregs[1] : -1, qregs[2] : 0, qregs[3] : -1 }, externals)
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestLanes', TestLanesBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+import tempfile
+import shutil
+import os
+
+class TestMmapRuntime(SimulatorTestBase) :
+
+    def setUp(self) :
+        self.n_qregs = 12
+        self.dirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        qgate.simulator.mmapruntime.module_finalize()
+        # chunk size, 1024 states.
+        qgate.simulator.mmapruntime.set_preference(self.dirs, 10)
+
+    def tearDown(self) :
+        qgate.simulator.mmapruntime.module_finalize()
+        qgate.simulator.mmapruntime.reset_preference()
+        for dirname in self.dirs :
+            shutil.rmtree(dirname)
+
+    def compare(self, circuit, qregs, **prefs) :
+        sim = qgate.simulator.mmap(circuit_prep = qgate.prefs.one_static, **prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        states = sim.qubits.states[:]
+
+        ref = qgate.simulator.cpu(circuit_prep = qgate.prefs.one_static, **prefs)
+        ref.qubits.set_ordering(qregs)
+        ref.run(circuit)
+        self.assertTrue(np.allclose(ref.qubits.states[:], states))
+        return sim
+
+    def test_gates(self) :
+        qregs = new_qregs(self.n_qregs)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    [ctrl(qregs[idx]).X(qregs[idx + 1]) for idx in range(self.n_qregs - 1)],
+                    # gates on high lanes access pairs of chunks.
+                    [Ry(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs)],
+                    ctrl(qregs[11]).Rz(0.3)(qregs[0]),
+                    Swap(qregs[1], qregs[10]) ]
+        for dtype in [np.float64, np.float32] :
+            sim = self.compare(circuit, qregs, dtype = dtype)
+            # unlinked chunk files are not left in directories.
+            for dirname in self.dirs :
+                self.assertEqual(0, len(os.listdir(dirname)))
+
+    def test_measure(self) :
+        qregs = new_qregs(self.n_qregs)
+        refs = new_references(2)
+        circuit = [ [H(qreg) for qreg in qregs[:11]], X(qregs[11]),
+                    measure(refs[0], qregs[11]), prob(refs[1], qregs[11]) ]
+        sim = self.compare(circuit, qregs)
+        self.assertEqual(1, sim.values.get(refs[0]))
+        self.assertAlmostEqual(0., sim.values.get(refs[1]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import qgate.model as model
+import numpy as np
+import math
+
+class TestMultiQubitGateBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestMultiQubitGateBase:
+            raise unittest.SkipTest()
+        super(TestMultiQubitGateBase, cls).setUpClass()
+
+    def run_sim(self, circuit, qregs, multi_qubit_gate, **prefs) :
+        sim = self.create_simulator(multi_qubit_gate = multi_qubit_gate, **prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        return sim.qubits.states[:]
+
+    def assert_same_states(self, circuit, qregs, **prefs) :
+        states = self.run_sim(circuit, qregs, False)
+        multi = self.run_sim(circuit, qregs, True, **prefs)
+        self.assertTrue(np.allclose(states, multi))
+
+    def prep(self, qregs) :
+        return [ [H(qreg) for qreg in qregs], [Ry(0.2 * idx)(qreg) for idx, qreg in enumerate(qregs)] ]
+
+    def test_swap(self) :
+        qregs = new_qregs(4)
+        circuit = self.prep(qregs) + [ Swap(qregs[0], qregs[2]), Swap(qregs[3], qregs[1]) ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_controlled_swap(self) :
+        qregs = new_qregs(4)
+        swap = model.MultiQubitGate(model.gate_type.SWAP())
+        swap.set_ctrllist([qregs[1]])
+        swap.set_qreglist([qregs[3], qregs[0]])
+        circuit = self.prep(qregs) + [ swap ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_expi(self) :
+        qregs = new_qregs(4)
+        circuit = self.prep(qregs) + [ Expi(0.3)(X(qregs[0]), Y(qregs[2]), Z(qregs[3])),
+                                       Expi(0.4)(Z(qregs[1]), I(qregs[2])) ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_controlled_expi(self) :
+        qregs = new_qregs(4)
+        circuit = self.prep(qregs) + [ ctrl(qregs[1]).Expi(0.3)(Y(qregs[3]), X(qregs[0])),
+                                       ctrl(qregs[3], qregs[0]).Expi(0.5)(Z(qregs[2])) ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_expi_adjoint(self) :
+        qregs = new_qregs(3)
+        circuit = self.prep(qregs) + [ Expi(0.3)(X(qregs[0]), Y(qregs[2])) ]
+        states = self.run_sim(circuit, qregs, False)
+        circuit = self.prep(qregs) + [ Expi(-0.3).Adj(X(qregs[0]), Y(qregs[2])) ]
+        multi = self.run_sim(circuit, qregs, True)
+        self.assertTrue(np.allclose(states, multi))
+
+    def test_dense_matrix(self) :
+        qregs = new_qregs(3)
+        # random unitary by QR decomposition.
+        mat, _ = np.linalg.qr(np.random.rand(8, 8) + 1.j * np.random.rand(8, 8))
+        gate = model.MultiQubitGate(model.gate_type.MATN(mat))
+        gate.set_qreglist([qregs[1], qregs[2], qregs[0]])
+        states = self.run_sim(self.prep(qregs) + [ gate ], qregs, True)
+        
+        prepped = self.run_sim(self.prep(qregs), qregs, True)
+        # state indices for matrix indices.
+        perm = [ ((idx & 1) << 1) | (((idx >> 1) & 1) << 2) | ((idx >> 2) & 1) for idx in range(8) ]
+        expected = np.empty(8, np.complex128)
+        expected[perm] = np.matmul(mat, prepped[perm])
+        self.assertTrue(np.allclose(expected, states))
+
+    def test_invalid_matrix(self) :
+        if self.runtime == 'py' :
+            self.skipTest('matrix sizes are not checked in py runtime.')
+        qregs = new_qregs(2)
+        sim = self.create_simulator(circuit_prep = qgate.prefs.one_static)
+        sim.run(self.prep(qregs) + [ ctrl(qregs[0]).X(qregs[1]) ])
+        qstates = sim.qubits.qstates_list[0]
+        with self.assertRaises(ValueError) :
+            qstates.processor.apply_multi_qubit_matrix(np.identity(2), qstates, None, [0, 1])
+
+    def test_gate_fusion(self) :
+        qregs = new_qregs(4)
+        circuit = self.prep(qregs) + [ Swap(qregs[0], qregs[2]), T(qregs[0]), S(qregs[2]),
+                                       Expi(0.4)(X(qregs[2]), Y(qregs[0])), H(qregs[2]),
+                                       ctrl(qregs[0]).X(qregs[1]) ]
+        prefs = { 'gate_fusion' : True, 'circuit_prep' : qgate.prefs.one_static }
+        self.assert_same_states(circuit, qregs, **prefs)
+
+        sim = self.create_simulator(multi_qubit_gate = True, **prefs)
+        sim.run(circuit)
+        stats = sim.stats['gate_fusion']
+        # H, Ry on qregs[1], qregs[3], 1 block, and cx.
+        self.assertEqual(4, stats['n_gates_out'])
+
+import sys
+this = sys.modules[__name__]
+createPyTestCase(this, 'TestMultiQubitGate', TestMultiQubitGateBase)
+createCPUTestCase(this, 'TestMultiQubitGate', TestMultiQubitGateBase)
+
+if __name__ == '__main__':
+    unittest.main()
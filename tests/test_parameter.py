@@ -0,0 +1,95 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestParameterBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestParameterBase:
+            raise unittest.SkipTest()
+        super(TestParameterBase, cls).setUpClass()
+
+    def circuit(self, qregs, angles) :
+        return [ [H(qreg) for qreg in qregs],
+                 Rx(angles[0])(qregs[0]), Ry(angles[1])(qregs[1]),
+                 ctrl(qregs[0]).Rz(angles[2])(qregs[2]), U1(angles[0]).Adj(qregs[1]),
+                 U3(angles[0], angles[1], angles[2])(qregs[2]),
+                 Expi(angles[1])(X(qregs[0]), Z(qregs[2])),
+                 Expi(angles[2]).Adj(Y(qregs[1]), Y(qregs[2])) ]
+
+    def get_states(self, circuit, qregs, bindings = None, **prefs) :
+        sim = self.create_simulator(**prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit, bindings)
+        return sim.qubits.states[:]
+
+    def test_run_with_bindings(self) :
+        qregs = new_qregs(3)
+        params = new_parameters(3)
+        values = [0.1, 0.2, 0.3]
+        bindings = dict(zip(params, values))
+        for prefs in [ {}, { 'multi_qubit_gate' : False }, { 'gate_fusion' : True } ] :
+            expected = self.get_states(self.circuit(qregs, values), qregs, **prefs)
+            states = self.get_states(self.circuit(qregs, params), qregs, bindings, **prefs)
+            self.assertTrue(np.allclose(expected, states))
+
+    def test_plan_with_bindings(self) :
+        qregs = new_qregs(3)
+        params = new_parameters(3)
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        plan = sim.compile(self.circuit(qregs, params))
+        self.assertEqual(set(params), plan.parameters)
+        for values in [[0.1, 0.2, 0.3], [1., -0.5, 2.]] :
+            sim.run(plan, dict(zip(params, values)))
+            expected = self.get_states(self.circuit(qregs, values), qregs)
+            self.assertTrue(np.allclose(expected, sim.qubits.states[:]))
+
+    def test_run_batch(self) :
+        qregs = new_qregs(3)
+        params = new_parameters(3)
+        values_list = [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6], [0.7, 0.8, 0.9]]
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        results = sim.run_batch(self.circuit(qregs, params),
+                                [dict(zip(params, values)) for values in values_list])
+        self.assertEqual(3, len(results))
+        for values, states in zip(values_list, results) :
+            expected = self.get_states(self.circuit(qregs, values), qregs)
+            self.assertTrue(np.allclose(expected, states))
+
+        refs = new_references(1)
+        circuit = [ Ry(params[0])(qregs[0]), prob(refs[0], qregs[0]) ]
+        probs = sim.run_batch(circuit, [{ params[0] : theta } for theta in [0., np.pi]],
+                              lambda sim : sim.values.get(refs[0]))
+        self.assertAlmostEqual(1., probs[0])
+        self.assertAlmostEqual(0., probs[1])
+
+    def test_parameter_expression(self) :
+        qregs = new_qregs(1)
+        param = new_parameter('theta')
+        self.assertEqual('theta', str(param))
+        states = self.get_states([Rx(2. * param - 0.5)(qregs[0])], qregs, { param : 0.4 })
+        expected = self.get_states([Rx(0.3)(qregs[0])], qregs)
+        self.assertTrue(np.allclose(expected, states))
+
+    def test_unbound_parameter(self) :
+        qregs = new_qregs(1)
+        param = new_parameter()
+        sim = self.create_simulator()
+        with self.assertRaises(RuntimeError) :
+            sim.run([Rx(param)(qregs[0])])
+        plan = sim.compile([Rx(param)(qregs[0])])
+        with self.assertRaises(RuntimeError) :
+            sim.run(plan)
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestParameter', TestParameterBase)
+
+if __name__ == '__main__':
+    unittest.main()
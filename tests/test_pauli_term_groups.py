@@ -0,0 +1,56 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+from qgate.model import group_pauli_terms
+import numpy as np
+
+class TestPauliTermGroupsBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestPauliTermGroupsBase:
+            raise unittest.SkipTest()
+        super(TestPauliTermGroupsBase, cls).setUpClass()
+
+    def test_grouping(self) :
+        qregs = new_qregs(3)
+        terms = [ [Z(qregs[0]), Z(qregs[1])], [Z(qregs[0])], [X(qregs[0]), X(qregs[1])],
+                  [X(qregs[1]), Y(qregs[2])], (0.5, [Z(qregs[1]), Z(qregs[2])]),
+                  # X.Z.X = -Z
+                  [X(qregs[0]), Z(qregs[0]), X(qregs[0])], [I(qregs[2])] ]
+        groups = group_pauli_terms(terms)
+        self.assertEqual(2, len(groups))
+        self.assertEqual([0, 1, 4, 5, 6], groups[0].term_indices)
+        self.assertEqual([2, 3], groups[1].term_indices)
+
+    def test_evaluate(self) :
+        qregs = new_qregs(4)
+        circuit = [ H(qregs[0]), Ry(0.3)(qregs[1]), ctrl(qregs[0]).X(qregs[2]),
+                    Rx(0.7)(qregs[2]), S(qregs[1]), ctrl(qregs[1]).Rz(0.5)(qregs[0]) ]
+        terms = [ (0.5, [X(qregs[0]), X(qregs[2])]), (-0.3, [Y(qregs[0]), Y(qregs[2]), Z(qregs[1])]),
+                  (1.2, [X(qregs[0]), Z(qregs[2])]), (0.7, [Z(qregs[0]), Z(qregs[1])]),
+                  # qregs[3] is not used in the circuit.
+                  (0.4, [Z(qregs[0]), Z(qregs[3])]), (2., [X(qregs[3])]),
+                  (0.1, [Y(qregs[1])]), [Z(qregs[2]), X(qregs[2]), Z(qregs[2])] ]
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        states = sim.qubits.states[:]
+        values = sim.evaluate_pauli_terms(terms)
+
+        coefs = [term[0] if isinstance(term, tuple) else 1. for term in terms]
+        gatelists = [term[1] if isinstance(term, tuple) else term for term in terms]
+        expected = sim.qubits.expectation(gatelists) * coefs
+        self.assertTrue(np.allclose(expected, values))
+        # basis changes are reverted.
+        self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+        self.assertEqual(len(qregs) - 1, len(sim.qubits.lanes))
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestPauliTermGroups', TestPauliTermGroupsBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+import math
+
+class TestPlanBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestPlanBase:
+            raise unittest.SkipTest()
+        super(TestPlanBase, cls).setUpClass()
+
+    def assert_same_states(self, circuit, qregs, **prefs) :
+        sim = self.create_simulator(**prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        states = sim.qubits.states[:]
+
+        plan = sim.compile(circuit)
+        # plans are able to run repeatedly.
+        for loop in range(2) :
+            sim.run(plan)
+            self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+        return sim
+
+    def test_gates(self) :
+        qregs = new_qregs(4)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    [Ry(0.2 * idx)(qreg) for idx, qreg in enumerate(qregs)],
+                    ctrl(qregs[0]).X(qregs[1]), ctrl(qregs[2], qregs[1]).Rz(0.3)(qregs[3]),
+                    S.Adj(qregs[2]), U3(0.1, 0.2, 0.3)(qregs[0]) ]
+        for prep in [qgate.prefs.dynamic, qgate.prefs.static, qgate.prefs.one_static] :
+            self.assert_same_states(circuit, qregs, circuit_prep = prep)
+            self.assert_same_states(circuit, qregs, circuit_prep = prep, gate_fusion = True)
+
+    def test_multi_qubit_gates(self) :
+        qregs = new_qregs(3)
+        circuit = [ H(qregs[0]), Ry(0.4)(qregs[2]), Swap(qregs[0], qregs[1]),
+                    Expi(0.3)(X(qregs[0]), Y(qregs[1]), Z(qregs[2])) ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_measure_and_if(self) :
+        qregs = new_qregs(3)
+        refs = new_references(3)
+        circuit = [ X(qregs[0]), ctrl(qregs[0]).X(qregs[1]),
+                    measure(refs[0], qregs[0]),
+                    # qregs[2] is first used in if clause.
+                    if_(refs[0], 1, [X(qregs[2]), measure(refs[1], qregs[2])]),
+                    if_(refs[0], 0, X(qregs[1])),
+                    prob(refs[2], qregs[1]) ]
+        sim = self.assert_same_states(circuit, qregs)
+        self.assertEqual([1, 1], sim.values.get(refs[0:2]))
+        self.assertAlmostEqual(0., sim.values.get(refs[2]))
+
+    def test_reset_and_release(self) :
+        qregs = new_qregs(2)
+        refs = new_references(2)
+        circuit = [ X(qregs[0]), ctrl(qregs[0]).X(qregs[1]),
+                    measure(refs[0], qregs[0]), reset(qregs[0]),
+                    measure(refs[1], qregs[1]), release_qreg(qregs[1]) ]
+        sim = self.create_simulator()
+        plan = sim.compile(circuit)
+        sim.run(plan)
+        self.assertEqual([1, 1], sim.values.get(refs))
+        self.assertEqual(1, len(sim.qubits.lanes))
+        self.assertAlmostEqual(1., sim.qubits.prob[0])
+
+    def test_measurement_statistics(self) :
+        qregs = new_qregs(2)
+        refs = new_references(2)
+        # P(refs[0] == 1) = 0.25
+        circuit = [ Ry(math.pi / 3.)(qregs[0]), ctrl(qregs[0]).X(qregs[1]),
+                    measure(refs[0], qregs[0]), measure(refs[1], qregs[1]) ]
+        sim = self.create_simulator(random_generator = 0)
+        plan = sim.compile(circuit)
+        n_runs = 1024
+        n_ones = 0
+        for loop in range(n_runs) :
+            sim.run(plan)
+            values = sim.values.get(refs)
+            self.assertEqual(values[0], values[1])
+            n_ones += values[0]
+        self.assertTrue(abs(0.25 - n_ones / n_runs) < 0.05)
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestPlan', TestPlanBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+from qgate.model.qreg_aggregator import QregAggregator
+
+class TestQregAggregator(SimulatorTestBase) :
+
+    def assert_qregsets(self, aggregator, qregsets) :
+        self.assertEqual(set([frozenset(qregset) for qregset in qregsets]),
+                         set(aggregator.qregsetlist))
+        aggregator.validate()
+
+    def test_aggregate(self) :
+        qregs = new_qregs(5)
+        agg = QregAggregator()
+        self.assertTrue(agg.add_qreg(qregs[0]))
+        self.assertFalse(agg.add_qreg(qregs[0]))
+        self.assertEqual(set(qregs[:2]), agg.aggregate(qregs[:2]))
+        self.assertIsNone(agg.aggregate([qregs[1], qregs[0]]))
+        self.assertEqual(set(qregs[2:4]), agg.aggregate(qregs[2:4]))
+        self.assertEqual(set(qregs[:4]), agg.aggregate([qregs[0], qregs[3]]))
+        agg.add_qreg(qregs[4])
+        self.assert_qregsets(agg, [qregs[:4], [qregs[4]]])
+        self.assertEqual(frozenset(qregs[:4]), agg.find_qregset(qregs[2]))
+        self.assertEqual(set(qregs), agg.qregset)
+
+    def test_separate(self) :
+        qregs = new_qregs(4)
+        agg = QregAggregator()
+        agg.aggregate(qregs)
+        agg.separate_qreg(qregs[1])
+        agg.separate_qreg(qregs[1])
+        self.assert_qregsets(agg, [[qregs[0], qregs[2], qregs[3]], [qregs[1]]])
+        # separated qreg is joined again.
+        self.assertEqual(set(qregs), agg.aggregate([qregs[1], qregs[3]]))
+        self.assert_qregsets(agg, [qregs])
+        for qreg in qregs :
+            agg.separate_qreg(qreg)
+        self.assert_qregsets(agg, [[qreg] for qreg in qregs])
+
+    def test_restore_qregsetlist(self) :
+        qregs = new_qregs(3)
+        agg = QregAggregator()
+        agg.aggregate(qregs[:2])
+        agg.add_qreg(qregs[2])
+        qregsetlist, qregset = list(agg.qregsetlist), set(agg.qregset)
+        agg.reset()
+        agg.qregsetlist, agg.qregset = qregsetlist, qregset
+        self.assert_qregsets(agg, [qregs[:2], [qregs[2]]])
+        self.assertEqual(set(qregs), agg.aggregate([qregs[0], qregs[2]]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -37,6 +37,15 @@ class TestQregOrderingBase(SimulatorTestBase) :
         self.assertEqual(prob[0], 1.)
         self.assertTrue(np.all(prob[1:] == 0))
 
+    def test_given_ordering(self) :
+        qreg0, qreg1 = new_qregs(2)
+        sim = self.create_simulator()
+        self.assertIsNone(sim.qubits.given_ordering)
+        sim.qubits.set_ordering([qreg1, qreg0])
+        sim.run([X(qreg0)])
+        self.assertEqual([qreg1, qreg0], sim.qubits.given_ordering)
+        self.assertEqual([qreg1, qreg0], sim.qubits.ordering)
+
 import sys
 this = sys.modules[__name__]
 createTestCases(this, 'TestQregOrdering', TestQregOrderingBase)
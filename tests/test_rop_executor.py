@@ -0,0 +1,180 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+from qgate.simulator.rop_executor import RopExecutor
+from qgate.simulator.runtime_operator import Gate, ControlledGate, Prob, Decohere, gate_record
+import qgate.model.gate_type as gtype
+import numpy as np
+
+
+class RecordingProcessor :
+    """ processor recording calls from RopExecutor. """
+    def __init__(self) :
+        self.calls = list()
+
+    def apply_gates(self, gates, qstates) :
+        self.calls.append(('apply_gates', qstates, len(gates)))
+
+    def apply_gate(self, gate_type, _adjoint, qstates, local_lane) :
+        self.calls.append(('apply_gate', qstates, 1))
+
+    def apply_controlled_gate(self, gate_type, _adjoint, qstates, local_control_lanes, local_target_lane) :
+        self.calls.append(('apply_gate', qstates, 1))
+
+    def calc_probability(self, qstates, local_lane) :
+        self.calls.append(('calc_probability', qstates, local_lane))
+        return 0.5
+
+    def decohere(self, value, prob, qstates, local_lane) :
+        self.calls.append(('decohere', qstates, local_lane))
+
+class RecordingQubitStates :
+    def __init__(self, processor) :
+        self.processor = processor
+        self.lane_states = dict()
+
+    def set_lane_state(self, lane, value) :
+        self.lane_states[lane] = value
+
+class ValueObserver :
+    def set_value(self, value) :
+        self.value = value
+
+    def get_value(self) :
+        return self.value
+
+
+class TestRopExecutor(SimulatorTestBase) :
+
+    def setUp(self) :
+        self.processor = RecordingProcessor()
+        self.qstates = [RecordingQubitStates(self.processor) for _ in range(2)]
+        self.executor = RopExecutor()
+
+    def gate(self, qstates, lane = 0) :
+        return Gate(qstates, gtype.H(), False, lane)
+
+    def prob(self, qstates, lane = 0) :
+        rop = Prob(qstates, lane)
+        rop.set_observer(ValueObserver())
+        return rop
+
+    def test_batch_boundaries(self) :
+        qs0, qs1 = self.qstates
+        rops = [ self.gate(qs0), ControlledGate(qs0, [0], gtype.X(), False, 1), self.gate(qs0, 1),
+                 self.gate(qs1), self.gate(qs1),
+                 self.gate(qs0) ]
+        for rop in rops :
+            self.executor.enqueue(rop)
+        self.executor.flush()
+        # batches end at gates on different qubit states.
+        self.assertEqual([('apply_gates', qs0, 3), ('apply_gates', qs1, 2), ('apply_gate', qs0, 1)],
+                         self.processor.calls)
+
+    def test_flush_on_prob(self) :
+        qs0, _ = self.qstates
+        prob = self.prob(qs0)
+        rops = [ self.gate(qs0), self.gate(qs0), prob, self.gate(qs0), self.gate(qs0) ]
+        for rop in rops :
+            self.executor.enqueue(rop)
+        self.executor.flush()
+        self.assertEqual([('apply_gates', qs0, 2), ('calc_probability', qs0, 0), ('apply_gates', qs0, 2)],
+                         self.processor.calls)
+        self.assertEqual(0.5, prob.get_observer().get_value())
+
+    def test_flush_on_measure(self) :
+        qs0, _ = self.qstates
+        prob = self.prob(qs0, 1)
+        decohere = Decohere(0.9, prob.get_observer(), qs0, 1)
+        decohere.set_observer(ValueObserver())
+        rops = [ self.gate(qs0), self.gate(qs0, 1), prob, decohere, self.gate(qs0), self.gate(qs0, 1) ]
+        for rop in rops :
+            self.executor.enqueue(rop)
+        self.executor.flush()
+        self.assertEqual([('apply_gates', qs0, 2), ('calc_probability', qs0, 1),
+                          ('decohere', qs0, 1), ('apply_gates', qs0, 2)], self.processor.calls)
+        self.assertEqual(1, decohere.get_observer().get_value())
+        self.assertEqual(1, qs0.lane_states[1])
+
+    def test_wait_rop(self) :
+        qs0, qs1 = self.qstates
+        gates = [ self.gate(qs0) for _ in range(3) ]
+        prob = self.prob(qs1)
+        for rop in gates + [ prob ] :
+            self.executor.enqueue(rop)
+        # one dispatch consumes successive gates including the waited one.
+        self.executor.wait_rop(gates[1])
+        self.assertEqual([('apply_gates', qs0, 3)], self.processor.calls)
+        self.assertEqual([prob], self.executor.queue)
+        self.executor.wait_observable(prob.get_observer())
+        self.assertEqual(0, len(self.executor.queue))
+        self.assertEqual(('calc_probability', qs1, 0), self.processor.calls[-1])
+
+
+class TestApplyGatesBase(SimulatorTestBase) :
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestApplyGatesBase:
+            raise unittest.SkipTest()
+        super(TestApplyGatesBase, cls).setUpClass()
+
+    def apply(self, states, mat, target, controls = []) :
+        # reference, applying a 2x2 matrix to states on a qubit at target.
+        states = states.copy()
+        control_mask = sum([1 << lane for lane in controls])
+        for idx in range(len(states)) :
+            if idx & (1 << target) or (idx & control_mask) != control_mask :
+                continue
+            idx1 = idx | (1 << target)
+            states[idx], states[idx1] = \
+                mat[0, 0] * states[idx] + mat[0, 1] * states[idx1], \
+                mat[1, 0] * states[idx] + mat[1, 1] * states[idx1]
+        return states
+
+    def test_batches_across_qstates(self) :
+        qregs = new_qregs(3)
+        ref = new_reference()
+        # qregs[0:2] and qregs[2] are in different qubit states, and gates on them are interleaved.
+        circuit = [ H(qregs[0]), ctrl(qregs[0]).X(qregs[1]), Ry(0.3)(qregs[2]), T(qregs[1]),
+                    prob(ref, qregs[0]), Rx(0.2)(qregs[0]), S(qregs[2]), ctrl(qregs[1]).Rz(0.4)(qregs[0]),
+                    H(qregs[2]) ]
+        sim = self.create_simulator(circuit_prep = qgate.prefs.dynamic)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        states = sim.qubits.states[:]
+
+        expected = np.zeros([8], np.complex128)
+        expected[0] = 1.
+        for target, controls, gate_type in [ (0, [], gtype.H()), (1, [0], gtype.X()),
+                                             (2, [], gtype.RY(0.3)), (1, [], gtype.T()),
+                                             (0, [], gtype.RX(0.2)), (2, [], gtype.S()),
+                                             (0, [1], gtype.RZ(0.4)), (2, [], gtype.H()) ] :
+            expected = self.apply(expected, gate_type.pymat(), target, controls)
+        self.assertTrue(np.allclose(expected, states))
+        self.assertAlmostEqual(0.5, sim.values.get(ref))
+
+    def test_invalid_records(self) :
+        if self.runtime == 'py' :
+            self.skipTest('records are not checked in py runtime.')
+        qreg = new_qreg()
+        sim = self.create_simulator()
+        sim.run([H(qreg)])
+        qstates = sim.qubits.qstates_list[0]
+        records = np.zeros([2], np.complex128)
+        with self.assertRaises(ValueError) :
+            qstates.processor.apply_gate_records(records, qstates)
+        # valid records.
+        records = np.zeros([1], gate_record)
+        records[0] = (gtype.H().pymat(), 0, 0)
+        qstates.processor.apply_gate_records(records, qstates)
+        self.assertTrue(np.allclose([1., 0.], sim.qubits.states[:]))
+
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestApplyGates', TestApplyGatesBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ import unittest
 import qgate
 from qgate.script import *
 import numpy as np
+import math
 
 class TestSampling(unittest.TestCase) :
 
@@ -98,6 +99,98 @@ class TestSampling(unittest.TestCase) :
         half = obslist[0:64]
         self.assertEqual(len(half), 64)
 
+    def test_sampling_terminal_measurements(self) :
+        qregs = new_qregs(3)
+        cregs = new_references(3)
+        circuit = [ H(qregs[0]), ctrl(qregs[0]).X(qregs[1]), X(qregs[2]),
+                    measure(cregs[2], qregs[0]), measure(cregs[0], qregs[1]),
+                    measure(cregs[1], qregs[2]) ]
+
+        for sim in [qgate.simulator.py(), qgate.simulator.cpu()] :
+            obslist = sim.sample(circuit, cregs, 256)
+            values = obslist.intarray
+            # cregs[1] is always 1, cregs[0] and cregs[2] are the same.
+            self.assertTrue(np.all((values == 0b010) | (values == 0b111)))
+            self.assertTrue(np.any(values == 0b010))
+            self.assertTrue(np.any(values == 0b111))
+
+    def test_sampling_mid_circuit_measurement(self) :
+        qregs = new_qregs(2)
+        cregs = new_references(2)
+        circuit = [ H(qregs[0]), measure(cregs[0], qregs[0]),
+                    if_(cregs[0], 1, X(qregs[1])),
+                    measure(cregs[1], qregs[1]) ]
+
+        for sim in [qgate.simulator.py(), qgate.simulator.cpu()] :
+            obslist = sim.sample(circuit, cregs, 256)
+            values = obslist.intarray
+            self.assertTrue(np.all((values == 0b00) | (values == 0b11)))
+            self.assertTrue(np.any(values == 0b00))
+            self.assertTrue(np.any(values == 0b11))
+
+    def test_sampling_measurement_branches(self) :
+        qregs = new_qregs(2)
+        cregs = new_references(3)
+        # P(cregs[0] == 1) = 0.25
+        circuit = [ Ry(math.pi / 3.)(qregs[0]), measure(cregs[0], qregs[0]),
+                    if_(cregs[0], 1, H(qregs[1])),
+                    measure(cregs[1], qregs[1]),
+                    reset(qregs[0]), measure(cregs[2], qregs[0]) ]
+
+        np.random.seed(0)
+        for sim in [qgate.simulator.py(), qgate.simulator.cpu()] :
+            n_samples = 4096
+            hist = sim.sample(circuit, cregs, n_samples).histgram()
+            self.assertEqual(n_samples, sum(hist.values()))
+            self.assertEqual({0b000, 0b001, 0b011}, set(hist.keys()))
+            self.assertTrue(abs(0.75 - hist[0b000] / n_samples) < 0.03)
+            self.assertTrue(abs(0.125 - hist[0b001] / n_samples) < 0.03)
+
+    def test_sampling_n_workers(self) :
+        qregs = new_qregs(2)
+        cregs = new_references(2)
+        circuit = [ H(qregs[0]), measure(cregs[0], qregs[0]),
+                    if_(cregs[0], lambda v : v == 1, X(qregs[1])),
+                    measure(cregs[1], qregs[1]) ]
+
+        for sim in [qgate.simulator.py(), qgate.simulator.cpu()] :
+            np.random.seed(0)
+            obslist = sim.sample(circuit, cregs, 1001, n_workers = 3)
+            self.assertEqual(len(obslist), 1001)
+            values = obslist.intarray
+            self.assertTrue(np.all((values == 0b00) | (values == 0b11)))
+            # reproducible with the same seed.
+            np.random.seed(0)
+            obslist = sim.sample(circuit, cregs, 1001, n_workers = 3)
+            self.assertTrue(np.all(values == obslist.intarray))
+
+    def test_sampling_random_generator(self) :
+        qregs = new_qregs(2)
+        cregs = new_references(2)
+        circuit = [ H(qregs[0]), measure(cregs[0], qregs[0]),
+                    if_(cregs[0], 1, H(qregs[1])),
+                    measure(cregs[1], qregs[1]) ]
+        prefs = { qgate.prefs.random_generator : 1234 }
+
+        for factory in [qgate.simulator.py, qgate.simulator.cpu] :
+            state = np.random.get_state()
+            values = factory(**prefs).sample(circuit, cregs, 1024).intarray
+            # numpy global random state is not used.
+            self.assertTrue(np.all(state[1] == np.random.get_state()[1]))
+            # simulators with the same seed give the same results.
+            sim = factory(**prefs)
+            self.assertTrue(np.all(values == sim.sample(circuit, cregs, 1024).intarray))
+            # random number stream continues over runs.
+            self.assertFalse(np.all(values == sim.sample(circuit, cregs, 1024).intarray))
+
+            results = list()
+            for loop in range(2) :
+                sim = factory(random_generator = np.random.default_rng(5))
+                for loop in range(32) :
+                    sim.run(circuit)
+                results.append(sim.obs(cregs).int)
+            self.assertEqual(results[0], results[1])
+
     def test_observation_list_getitem(self) :
         cregs = new_references(4)
         values = np.random.random((64))
@@ -0,0 +1,81 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+import tempfile
+import pickle
+import os
+
+class TestSnapshotBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestSnapshotBase:
+            raise unittest.SkipTest()
+        super(TestSnapshotBase, cls).setUpClass()
+
+    def prefix(self, qregs, refs) :
+        return [ H(qregs[0]), ctrl(qregs[0]).X(qregs[1]), Ry(0.3)(qregs[2]),
+                 X(qregs[3]), measure(refs[0], qregs[3]) ]
+
+    def suffix(self, qregs, refs) :
+        return [ ctrl(qregs[1]).Rx(0.5)(qregs[2]), H(qregs[3]), prob(refs[1], qregs[2]) ]
+
+    def expected(self, qregs, refs) :
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        sim.run(self.prefix(qregs, refs) + self.suffix(qregs, refs))
+        return sim.qubits.states[:], sim.values.get(refs)
+
+    def assert_restored(self, sim, snap, qregs, refs) :
+        expected_states, expected_values = self.expected(qregs, refs)
+        # a snapshot is able to be restored many times.
+        for loop in range(2) :
+            sim.restore(snap)
+            self.assertEqual(1, sim.values.get(refs[0]))
+            sim.run(self.suffix(qregs, refs))
+            self.assertTrue(np.allclose(expected_states, sim.qubits.states[:]))
+            self.assertEqual(expected_values[0], sim.values.get(refs[0]))
+            self.assertAlmostEqual(expected_values[1], sim.values.get(refs[1]))
+
+    def test_snapshot(self) :
+        qregs = new_qregs(4)
+        refs = new_references(2)
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        sim.run(self.prefix(qregs, refs))
+        snap = sim.snapshot()
+        states = sim.qubits.states[:]
+        # snapshots are not affected by later runs.
+        sim.run(X(qregs[0]))
+        sim.restore(snap)
+        self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+        self.assert_restored(sim, snap, qregs, refs)
+
+    def test_snapshot_to_file(self) :
+        qregs = new_qregs(4)
+        refs = new_references(2)
+        sim = self.create_simulator()
+        sim.qubits.set_ordering(qregs)
+        sim.run(self.prefix(qregs, refs))
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try :
+            snap = sim.snapshot(filename)
+            self.assertEqual(filename, snap.filename)
+            # snapshots with files are restored in another simulator after pickling.
+            snap = pickle.loads(pickle.dumps(snap))
+            sim = self.create_simulator()
+            sim.qubits.set_ordering(qregs)
+            self.assert_restored(sim, snap, qregs, refs)
+        finally :
+            os.remove(filename)
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestSnapshot', TestSnapshotBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import numpy as np
+
+class TestSweepBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestSweepBase:
+            raise unittest.SkipTest()
+        super(TestSweepBase, cls).setUpClass()
+
+    def circuit(self, qregs, angles, refs) :
+        return [ H(qregs[0]), H(qregs[1]),
+                 Rx(angles[0])(qregs[0]), Ry(angles[1])(qregs[2]),
+                 ctrl(qregs[0]).Rz(angles[1])(qregs[1]), ctrl(qregs[1]).X(qregs[2]),
+                 Expi(angles[0])(X(qregs[0]), Z(qregs[2])), Swap(qregs[1], qregs[2]),
+                 Ry(0.3)(qregs[3]),
+                 prob(refs[0], qregs[0]), prob(refs[1], [Z(qregs[1]), X(qregs[2])]) ]
+
+    def test_sweep(self) :
+        qregs = new_qregs(4)
+        refs = new_references(2)
+        params = new_parameters(2)
+        values_list = [[0.1, 0.2], [0.5, -0.3], [1.2, 2.]]
+        for prefs in [ {}, { 'circuit_prep' : qgate.prefs.one_static },
+                       { 'multi_qubit_gate' : False } ] :
+            sim = self.create_simulator(**prefs)
+            sim.qubits.set_ordering(qregs)
+            result = sim.sweep(self.circuit(qregs, params, refs),
+                               [dict(zip(params, values)) for values in values_list])
+            self.assertEqual(3, result.n_batch)
+            self.assertEqual((3, 16), result.states.shape)
+            probs = result.get(refs)
+            for idx, values in enumerate(values_list) :
+                sim.reset()
+                sim.run(self.circuit(qregs, values, refs))
+                self.assertTrue(np.allclose(sim.qubits.states[:], result.states[idx]))
+                self.assertTrue(np.allclose(sim.qubits.prob[:], result.prob[idx]))
+                self.assertTrue(np.allclose(sim.values.get(refs), [probs[0][idx], probs[1][idx]]))
+
+    def test_sweep_ordering(self) :
+        qregs = new_qregs(3)
+        param = new_parameter()
+        sim = self.create_simulator()
+        # qregs[1] is not used in the circuit.
+        sim.qubits.set_ordering([qregs[2], qregs[1], qregs[0]])
+        result = sim.sweep([Ry(param)(qregs[0]), X(qregs[2])], [{ param : np.pi }])
+        self.assertEqual([qregs[2], qregs[1], qregs[0]], result.ordering)
+        self.assertAlmostEqual(1., result.prob[0][0b101])
+
+    def test_sweep_measure(self) :
+        qregs = new_qregs(1)
+        refs = new_references(1)
+        sim = self.create_simulator()
+        with self.assertRaises(RuntimeError) :
+            sim.sweep([H(qregs[0]), measure(refs[0], qregs[0])], [{}])
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestSweep', TestSweepBase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+import qgate.simulator.cpuruntime as cpuruntime
+import numpy as np
+
+class TestThreadPoolCPU(SimulatorTestBase) :
+
+    def setUp(self) :
+        self.n_qregs = 18
+        self.n_workers = cpuruntime.get_n_workers()
+        self.pin_workers = cpuruntime.get_pin_workers()
+
+    def tearDown(self) :
+        cpuruntime.set_n_workers(self.n_workers)
+        cpuruntime.set_pin_workers(self.pin_workers)
+
+    def run_sim(self, circuit, qregs) :
+        sim = qgate.simulator.cpu(circuit_prep = qgate.prefs.one_static)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        return sim.qubits.states[:]
+
+    def create_circuit(self, qregs) :
+        circuit = [H(qreg) for qreg in qregs]
+        for idx in range(0, self.n_qregs - 1) :
+            circuit += [ctrl(qregs[idx]).Rx(0.1 * idx)(qregs[idx + 1]), T(qregs[idx])]
+        return circuit
+
+    def test_set_n_workers(self) :
+        cpuruntime.set_n_workers(3)
+        self.assertEqual(3, cpuruntime.get_n_workers())
+        cpuruntime.set_n_workers(0)
+        self.assertEqual(self.n_workers, cpuruntime.get_n_workers())
+
+    def test_n_workers(self) :
+        qregs = new_qregs(self.n_qregs)
+        circuit = self.create_circuit(qregs)
+        cpuruntime.set_n_workers(1)
+        states = self.run_sim(circuit, qregs)
+        for n_workers in [2, 4, 3] :
+            cpuruntime.set_n_workers(n_workers)
+            self.assertTrue(np.allclose(states, self.run_sim(circuit, qregs)))
+
+    def test_pin_workers(self) :
+        qregs = new_qregs(self.n_qregs)
+        circuit = self.create_circuit(qregs)
+        cpuruntime.set_n_workers(4)
+        states = self.run_sim(circuit, qregs)
+        cpuruntime.set_pin_workers(True)
+        self.assertTrue(cpuruntime.get_pin_workers())
+        for n_workers in [4, 3] :
+            cpuruntime.set_n_workers(n_workers)
+            self.assertTrue(np.allclose(states, self.run_sim(circuit, qregs)))
+        cpuruntime.set_pin_workers(False)
+        self.assertTrue(np.allclose(states, self.run_sim(circuit, qregs)))
+
+    def test_shutdown(self) :
+        qregs = new_qregs(self.n_qregs)
+        circuit = self.create_circuit(qregs)
+        cpuruntime.set_n_workers(4)
+        states = self.run_sim(circuit, qregs)
+        cpuruntime.shutdown_workers()
+        self.assertTrue(np.allclose(states, self.run_sim(circuit, qregs)))
+
+if __name__ == '__main__':
+    unittest.main()
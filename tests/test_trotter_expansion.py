@@ -0,0 +1,78 @@
+from __future__ import print_function
+from __future__ import absolute_import
+
+from tests.test_base import *
+from qgate.script import *
+from qgate.model import gate_type as gtype
+from qgate.model.expand import expand_exp, expand_exp_sequence
+import numpy as np
+
+class TestTrotterExpansionBase(SimulatorTestBase) :
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is TestTrotterExpansionBase:
+            raise unittest.SkipTest()
+        super(TestTrotterExpansionBase, cls).setUpClass()
+
+    def run_sim(self, circuit, qregs, **prefs) :
+        sim = self.create_simulator(**prefs)
+        sim.qubits.set_ordering(qregs)
+        sim.run(circuit)
+        return sim
+
+    def assert_same_states(self, circuit, qregs) :
+        sim = self.run_sim(circuit, qregs)
+        states = sim.qubits.states[:]
+        for multi_qubit_gate in [False, True] :
+            sim = self.run_sim(circuit, qregs, multi_qubit_gate = multi_qubit_gate,
+                               trotter_expansion = True)
+            self.assertTrue(np.allclose(states, sim.qubits.states[:]))
+
+    def jordan_wigner_terms(self, qregs) :
+        # hopping terms, X Z..Z X and Y Z..Z Y, and Z Z terms.
+        terms = list()
+        for idx0 in range(len(qregs)) :
+            for idx1 in range(idx0 + 1, len(qregs)) :
+                zstr = [Z(qreg) for qreg in qregs[idx0 + 1:idx1]]
+                terms.append(Expi(0.1 * idx1)(X(qregs[idx0]), *(zstr + [X(qregs[idx1])])))
+                terms.append(Expi(0.1 * idx1)(Y(qregs[idx0]), *(zstr + [Y(qregs[idx1])])))
+                terms.append(Expi(0.2 * idx0)(Z(qregs[idx0]), Z(qregs[idx1])))
+        return terms
+
+    def test_trotter_steps(self) :
+        qregs = new_qregs(5)
+        terms = self.jordan_wigner_terms(qregs)
+        circuit = [ [Ry(0.1 * idx)(qreg) for idx, qreg in enumerate(qregs)], [terms] * 3 ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_adjoint_and_identity(self) :
+        qregs = new_qregs(3)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    Expi(0.3)(X(qregs[0]), Y(qregs[2])), Expi(0.2).Adj(Y(qregs[0]), X(qregs[2])),
+                    Expi(0.4)(I(qregs[1])), Expi(0.5)(X(qregs[0]), X(qregs[0]), Z(qregs[1])),
+                    Expi(0.1).Adj(Z(qregs[0]), Z(qregs[1]), Y(qregs[2])) ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_controlled_and_other_ops(self) :
+        qregs = new_qregs(3)
+        circuit = [ [H(qreg) for qreg in qregs],
+                    Expi(0.3)(X(qregs[0]), X(qregs[1])), ctrl(qregs[2]).Expi(0.2)(Y(qregs[0]), Y(qregs[1])),
+                    Expi(0.1)(Z(qregs[0]), Z(qregs[1])), H(qregs[1]), Expi(0.4)(X(qregs[0]), X(qregs[1])) ]
+        self.assert_same_states(circuit, qregs)
+
+    def test_n_gates(self) :
+        qregs = new_qregs(6)
+        terms = self.jordan_wigner_terms(qregs)
+        n_gates = sum([len(expand_exp(term)) for term in terms])
+        expanded = expand_exp_sequence(terms)
+        self.assertEqual(len(terms), len([gate for gate in expanded
+                                          if isinstance(gate.gate_type, (gtype.ExpiI, gtype.ExpiZ))]))
+        self.assertTrue(len(expanded) < n_gates * 0.9)
+
+import sys
+this = sys.modules[__name__]
+createTestCases(this, 'TestTrotterExpansion', TestTrotterExpansionBase)
+
+if __name__ == '__main__':
+    unittest.main()